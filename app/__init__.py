@@ -12,7 +12,12 @@ def create_app():
     app.register_blueprint(analysis.bp)
 
     # Register the API blueprint
-    from .api.routes import api_bp
+    from .api.routes import api_bp, metrics_bp
     app.register_blueprint(api_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Build the shared agent team once per worker instead of per request
+    from .agents.registry import warm_up
+    warm_up()
 
     return app
@@ -1,6 +1,9 @@
 
 import json
+import os
 import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from .base_agent import ToolbeltAgent
 from .deal_memo_agent import DealMemoAgent
 from .risk_and_compliance_agent import RiskAndComplianceAgent
@@ -10,11 +13,81 @@ from .portfolio_fit_agent import PortfolioFitAgent
 from .digital_footprint_analysis_agent import DigitalFootprintAnalysisAgent
 from .communication_agent import CommunicationAgent
 from .user_preferences_agent import UserPreferencesAgent
-from app.services.conversation_manager import get_conversation_history, save_conversation_history
+from app.services.conversation_manager import append_conversation_turn, get_conversation_history
+from app.services import telemetry
+from app.services.analysis_context import AnalysisContext
+from app.services.deal_repository import DealRepository
+from app.services.deal_snapshot_cache import DealSnapshotCache
 from app.services.google_services import realtime_db
+from app.services.intent_router import IntentRouter
+from app.services.prompt_builder import STARTUP_DATA_PLACEHOLDER, PromptBuilder, format_turns
+from app.services.report_formatter import format_report
+from app.services.report_store import analysis_fingerprint, get_report_store
+from app.services.single_flight import SingleFlight
+from app.services.specialist_reports import (
+    SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS,
+    input_fingerprint,
+    is_reusable,
+    reusable_report,
+    specialist_report_store_from_env,
+)
+
+# The specialists that make up a "full analysis". The communication and user
+# preferences agents are utilities with different run() signatures and are
+# never part of the fan-out.
+SPECIALIST_AGENTS = (
+    "deal_memo",
+    "risk_and_compliance",
+    "benchmarking",
+    "market_research",
+    "portfolio_fit",
+    "digital_footprint",
+)
+
+# Default per-agent deadline (seconds) for the fan-out. Agents that do web
+# research or tool calls get more headroom than the document-only ones.
+DEFAULT_AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", "120"))
+AGENT_TIMEOUTS_SECONDS = {
+    "deal_memo": DEFAULT_AGENT_TIMEOUT_SECONDS * 1.5,
+    "market_research": DEFAULT_AGENT_TIMEOUT_SECONDS * 1.5,
+    "digital_footprint": DEFAULT_AGENT_TIMEOUT_SECONDS * 1.5,
+}
+
+# The router only needs enough context to pick an action, so it gets a
+# tighter prompt budget than the answering steps.
+ROUTER_TOKEN_BUDGET = int(os.getenv("PROMPT_ROUTER_TOKEN_BUDGET", "8000"))
+
+# A single bounded pool shared by every request in the worker. It is never
+# shut down per request, so a specialist that overruns its deadline does not
+# hold up the response; its result is simply discarded when it finishes.
+_specialist_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AGENT_FANOUT_MAX_WORKERS", "12")),
+    thread_name_prefix="specialist-agent",
+)
+
+# Actions the router can choose, used as the request metrics label.
+ROUTER_ACTIONS = (
+    "direct_answer", "chat", "run_specific_agent", "run_all_agents",
+    "send_email", "execute_email", "save_deal_note_preferences",
+)
+
+def _action_label(action):
+    """The metrics label for a router decision; free-form LLM output is bucketed as "unknown"."""
+    label = action.split(":")[0]
+    return label if label in ROUTER_ACTIONS else "unknown"
+
+def _emit(on_event, event, data):
+    """Reports a progress event to the caller, if it asked for them."""
+    if on_event:
+        on_event(event, data)
 
 class AIStartupAnalysisAgent(ToolbeltAgent):
     """Orchestrates a team of AI agents to perform a comprehensive analysis of a startup."""
+    # Routing, answers and email drafts depend on the conversation and the
+    # deal's current data, so an identical prompt must not replay an old
+    # response. Full analyses are reused through the report store instead.
+    cache_responses = False
+
     def __init__(self):
         super().__init__("AI Startup Analysis Agent")
         self.agent_team = {
@@ -27,58 +100,155 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
             "communication": CommunicationAgent(),
             "user_preferences": UserPreferencesAgent(),
         }
-
+        self.deal_repository = DealRepository(realtime_db)
+        self.deal_snapshots = DealSnapshotCache.from_env(self.deal_repository)
+        self.prompt_builder = PromptBuilder.from_env()
+        self.intent_router = IntentRouter.from_env(available_agents=SPECIALIST_AGENTS)
+        self.specialist_reports = specialist_report_store_from_env()
+        self.report_store = get_report_store()
+        # Identical loads, specialist runs and analyses already in flight in
+        # this worker are joined rather than started again.
+        self.flights = SingleFlight()
+
+    @telemetry.traced("load_deal")
     def _get_startup_data(self, deal_id):
         """
         Retrieves startup data from Firebase, including deal, startup, and key metrics.
+        Repeat calls within a conversation are served from the snapshot cache,
+        and concurrent loads of the same deal share one read.
         """
-        print(f"--- Fetching data for deal_id: {deal_id} from Firebase ---")
-
-        # 1. Query for deal information using a string for the ID.
-        deal_info_ref = realtime_db.reference('deals').order_by_child('id').equal_to(str(deal_id))
-        deal_info_dict = deal_info_ref.get()
-        if not deal_info_dict:
-            print(f"--- No deal info found for deal_id: {deal_id} ---")
-            return { "name": "Unknown Startup" }
-        deal_info = next(iter(deal_info_dict.values()), {})
-        print(f"--- Deal Info: {deal_info} ---")
-
-        # 2. Get startupId from deal and query for startup details
-        startup_id = deal_info.get('startupId')
-        if startup_id:
-            # Ensure startup_id is also a string for the query
-            startup_info_ref = realtime_db.reference('startups').order_by_child('id').equal_to(str(startup_id))
-            startup_info_dict = startup_info_ref.get()
-            if startup_info_dict:
-                startup_info = next(iter(startup_info_dict.values()), {})
-                print(f"--- Startup Info: {startup_info} ---")
-                # Map 'company' to 'name' for consistency with other agents.
-                if 'company' in startup_info:
-                    startup_info['name'] = startup_info['company']
-                if 'companyDetails' in startup_info:
-                    print(f"--- Company Details: {startup_info['companyDetails']} ---")
-                deal_info.update( startup_info)
-
-        # 3. Query for key metrics, also using a string for the ID.
-        key_metrics_ref = realtime_db.reference('keyMetrics').order_by_child('dealId').equal_to(str(deal_id))
-        key_metrics_dict = key_metrics_ref.get()
-        if key_metrics_dict:
-            key_metrics = next(iter(key_metrics_dict.values()), {})
-            print(f"--- Key Metrics: {key_metrics} ---")
-            deal_info.update(key_metrics)
-            
-        return deal_info
+        return self.flights.do(("load_deal", str(deal_id)), lambda emit: self.deal_snapshots.get(deal_id))
 
-    def _run_all_agents_and_synthesize(self, startup_data):
+    @telemetry.traced("specialists")
+    def _run_specialists_concurrently(self, startup_data, on_event=None):
         """
-        Runs all agents and synthesizes their findings into a final report.
+        Runs the specialist agents in parallel and merges whichever reports
+        arrive before their deadline. Timed-out or failed agents are reported
+        back separately instead of failing the whole analysis. Agents whose
+        inputs are unchanged since their stored report are skipped and that
+        report is reused.
         """
+        started = time.monotonic()
+        deal_id = startup_data.get('dealId')
         analysis_results = {}
-        for agent_name, agent_instance in self.agent_team.items():
+        skipped_agents = []
+        to_run = {}
+        for agent_key in SPECIALIST_AGENTS:
+            agent_instance = self.agent_team.get(agent_key)
+            if not agent_instance:
+                continue
+            fingerprint = input_fingerprint(agent_instance, startup_data)
+            report = reusable_report(self.specialist_reports, deal_id, agent_key, agent_instance, fingerprint)
+            if report is not None:
+                print(f"--- Inputs unchanged, reusing the last {agent_instance.agent_name} report ---")
+                analysis_results.update(report)
+                skipped_agents.append(agent_key)
+                _emit(on_event, "agent_report", {"agent": agent_key, "report": report, "reused": True})
+            else:
+                to_run[agent_key] = fingerprint
+
+        # The startup information and document summaries are serialized
+        # (and trimmed) once and shared by every specialist's prompt.
+        context = AnalysisContext.build(startup_data) if to_run else None
+        if context:
+            print(f"--- Shared analysis context: ~{context.tokens} tokens ---")
+        pending = {}
+        for agent_key in to_run:
+            agent_instance = self.agent_team[agent_key]
             print(f"--- Running {agent_instance.agent_name} ---")
-            result = agent_instance.run(startup_data)
-            print(f"--- Result from {agent_instance.agent_name}: {result} ---")
-            analysis_results.update(result)
+            future = telemetry.submit(_specialist_pool, self._run_specialist, agent_key, startup_data, context,
+                                      to_run[agent_key])
+            pending[future] = agent_key
+        total = len(pending)
+        failed_agents = {}
+
+        def deadline_for(agent_key):
+            return started + AGENT_TIMEOUTS_SECONDS.get(agent_key, DEFAULT_AGENT_TIMEOUT_SECONDS)
+
+        def mark_failed(agent_key, reason):
+            print(f"--- {self.agent_team[agent_key].agent_name} {reason} ---")
+            failed_agents[agent_key] = reason
+            _emit(on_event, "agent_unavailable", {"agent": agent_key, "reason": reason})
+
+        # Reports are handled in completion order so streaming clients see
+        # each one as soon as it is ready.
+        while pending:
+            now = time.monotonic()
+            for future, agent_key in list(pending.items()):
+                if deadline_for(agent_key) <= now and not future.done():
+                    future.cancel()
+                    del pending[future]
+                    mark_failed(agent_key, f"timed out after {deadline_for(agent_key) - started:.0f} seconds")
+            if not pending:
+                break
+
+            next_deadline = min(deadline_for(agent_key) for agent_key in pending.values())
+            done, _ = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                agent_key = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    mark_failed(agent_key, f"failed: {e}")
+                    continue
+                print(f"--- Result from {self.agent_team[agent_key].agent_name}: {result} ---")
+                if isinstance(result, dict):
+                    analysis_results.update(result)
+                    _emit(on_event, "agent_report", {"agent": agent_key, "report": result})
+                    if self.specialist_reports is not None and deal_id and is_reusable(result):
+                        self.specialist_reports.put(deal_id, agent_key, to_run[agent_key], result)
+
+        if context:
+            context.close()
+        print(f"--- Specialist fan-out finished in {time.monotonic() - started:.1f}s "
+              f"({total - len(failed_agents)}/{total} succeeded, {len(skipped_agents)} reused) ---")
+        return analysis_results, failed_agents, skipped_agents
+
+    def _run_specialist(self, agent_key, startup_data, context, fingerprint):
+        """Runs one specialist, joining an identical run already in flight for another request."""
+        key = ("specialist", str(startup_data.get('dealId')), agent_key, fingerprint)
+        with telemetry.agent_run(agent_key):
+            return self.flights.do(key, lambda emit: self.agent_team[agent_key].run(startup_data, context))
+
+    @telemetry.traced("run_all_agents")
+    def _run_all_agents_and_synthesize(self, startup_data, on_event=None):
+        """
+        Runs all agents and synthesizes their findings into a final report.
+        The report is saved as a new version in the report store; if the
+        latest stored version was built from the same inputs, it is returned
+        instead without calling the model. Concurrent requests for the same
+        analysis share one run and all receive its progress events.
+        """
+        deal_id = startup_data.get('dealId')
+        fingerprint = analysis_fingerprint(
+            {agent_key: input_fingerprint(self.agent_team[agent_key], startup_data)
+             for agent_key in SPECIALIST_AGENTS if agent_key in self.agent_team},
+            self.model_policy.model_for("synthesis"),
+        )
+        stored = self._reusable_analysis(deal_id, fingerprint)
+        if stored:
+            print(f"--- Inputs unchanged, returning stored report version {stored['version']} ---")
+            _emit(on_event, "token", {"text": stored["final_summary"]})
+            return dict(stored["reports"], final_summary=stored["final_summary"],
+                        skipped_agents=list(SPECIALIST_AGENTS), report_version=stored["version"])
+
+        return self.flights.do(
+            ("run_all_agents", str(deal_id), fingerprint),
+            lambda emit: self._analyze_and_synthesize(startup_data, fingerprint, emit, stream=bool(on_event)),
+            on_event=on_event,
+        )
+
+    def _analyze_and_synthesize(self, startup_data, fingerprint, on_event=None, stream=False):
+        """
+        Runs the specialists, synthesizes their reports and saves the result.
+        `on_event` receives progress events; the synthesis is only streamed
+        when `stream` is set, otherwise its text is sent as a single token.
+        """
+        deal_id = startup_data.get('dealId')
+        analysis_results, failed_agents, skipped_agents = self._run_specialists_concurrently(startup_data, on_event)
+        reports = dict(analysis_results)
+        if failed_agents:
+            analysis_results['unavailable_reports'] = failed_agents
 
         print("--- Synthesizing Final Report ---")
         final_summary_prompt = f'''
@@ -98,17 +268,99 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
         Do NOT include inline citations. Instead, list all sources in a separate "References" section at the end of your response. 
         The references should be formatted in italics and include the document name and page number.
         '''
-        final_summary = self.generate_text_with_llm(final_summary_prompt)
+        with telemetry.span("synthesis"):
+            final_summary = self._generate(final_summary_prompt, on_event if stream else None, step="synthesis")
+        if not stream:
+            # Streaming callers that joined this run still get the text.
+            _emit(on_event, "token", {"text": final_summary})
         analysis_results['final_summary'] = final_summary
+        # Added after synthesis so the prompt, and its cached response, only
+        # depend on the reports themselves.
+        analysis_results['skipped_agents'] = skipped_agents
+        if deal_id:
+            analysis_results['report_version'] = self._save_analysis(deal_id, {
+                "deal_id": str(deal_id),
+                "fingerprint": fingerprint,
+                "created_at": time.time(),
+                "model": self.model_policy.model_for("synthesis"),
+                "agent_models": {agent_key: self.agent_team[agent_key].model_name
+                                 for agent_key in SPECIALIST_AGENTS if agent_key in self.agent_team},
+                "reports": reports,
+                "unavailable_reports": failed_agents,
+                "skipped_agents": skipped_agents,
+                "final_summary": final_summary,
+            })
         return analysis_results
 
-    def _intelligent_route_query(self, query, history, startup_data):
-        """Determines the best course of action using an LLM."""
-        print("--- Using LLM to route query... ---")
+    def _reusable_analysis(self, deal_id, fingerprint):
+        """Returns the latest stored report if it is complete and built from the same inputs."""
+        if not deal_id:
+            return None
+        try:
+            stored = self.report_store.latest(deal_id)
+        except Exception as e:
+            print(f"--- Could not read stored reports for deal {deal_id}: {e} ---")
+            return None
+        if not stored or stored.get("fingerprint") != fingerprint or stored.get("unavailable_reports"):
+            return None
+        if not is_reusable({"final_summary": stored.get("final_summary")}):
+            return None
+        # Web research in the stored reports goes stale on its own.
+        live = any(not self.agent_team[agent_key].cache_responses
+                   for agent_key in SPECIALIST_AGENTS if agent_key in self.agent_team)
+        if live and time.time() - stored["created_at"] > SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS:
+            return None
+        return stored
+
+    def _save_analysis(self, deal_id, report):
+        """Saves a completed analysis as the deal's next report version, returning the version."""
+        try:
+            version = self.report_store.save(deal_id, report)
+        except Exception as e:
+            print(f"--- Could not save the report for deal {deal_id}: {e} ---")
+            return None
+        print(f"--- Saved report version {version} for deal {deal_id} ---")
+        return version
+
+    def _generate(self, prompt, on_event=None, step=None):
+        """
+        Generates a user-facing response with the model assigned to `step`.
+        When the caller is streaming, the text is produced with Gemini's
+        streaming API and forwarded chunk by chunk as `token` events.
+        """
+        if not on_event:
+            return self.generate_text_with_llm(prompt, step=step)
+        chunks = []
+        for chunk in self.stream_text_with_llm(prompt, step=step):
+            chunks.append(chunk)
+            _emit(on_event, "token", {"text": chunk})
+        return "".join(chunks)
+
+    @telemetry.traced("summarize_history")
+    def _summarize_conversation(self, previous_summary, turns):
+        """Folds conversation turns into a running summary for later prompts."""
+        new_turns = format_turns(turns)
+        prompt = f"""Summarize the following conversation between an investor and an AI investment analyst in at most 150 words.
+        Keep every figure, company name, decision and open question. Return only the summary.
+
+        **Summary So Far:**
+        {previous_summary or "None"}
+
+        **New Turns:**
+        {new_turns}
+        """
+        return self.generate_text_with_llm(prompt, step="summarize_history").strip()
 
-        formatted_history = "\n".join([f"User: {h['user']}\nAI: {h['ai']}" for h in history])
-        available_agents = list(self.agent_team.keys())
+    def _format_history(self, history):
+        """Formats history as recent turns verbatim plus a summary of older ones."""
+        return self.prompt_builder.format_history(history, self._summarize_conversation)
 
+    @telemetry.traced("router")
+    def _intelligent_route_query(self, query, history, startup_data):
+        """
+        Determines the best course of action. Obvious queries are routed
+        locally; the LLM is only asked when the local router is not confident.
+        """
         # Check if the last interaction was an email confirmation prompt
         if history and "I have drafted the following email" in history[-1].get('ai', ''):
             if query.lower() in ['yes', 'y', 'confirm', 'send it']:
@@ -117,6 +369,15 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
                 # If the user provides changes, treat it as a new email request
                 return "send_email" 
 
+        local_decision = self.intent_router.route(query, history)
+        if local_decision:
+            print(f"--- Local Router Decision: {local_decision} ---")
+            return local_decision.action
+
+        print("--- Using LLM to route query... ---")
+        formatted_history = self._format_history(history)
+        available_agents = list(self.agent_team.keys())
+
         prompt = f'''
         You are an intelligent routing agent. Your job is to determine the best course of action based on a user's query.
 
@@ -137,7 +398,7 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
 
         **Startup Data (for context):**
         ```json
-        {json.dumps(startup_data, indent=2)}
+        {STARTUP_DATA_PLACEHOLDER}
         ```
 
         **Decision Logic:**
@@ -150,12 +411,15 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
 
         **Return only the chosen action as a single string.** For example: `direct_answer`, `chat`, `run_specific_agent:deal_memo`, `run_all_agents`, `send_email`, `save_deal_note_preferences`.
         '''
-        
-        decision = self.generate_text_with_llm(prompt).strip()
+        prompt = self.prompt_builder.fit_startup_data(prompt, startup_data, token_budget=ROUTER_TOKEN_BUDGET)
+        self.prompt_builder.log("router", prompt, history=formatted_history)
+
+        decision = self.generate_text_with_llm(prompt, step="router").strip()
         print(f"--- LLM Router Decision: {decision} ---")
         return decision
 
-    def _run_direct_answer(self, query, startup_data):
+    @telemetry.traced("direct_answer")
+    def _run_direct_answer(self, query, startup_data, on_event=None):
         """Generates a direct answer from the startup data."""
         print("--- Generating direct answer... ---")
         prompt = f'''
@@ -164,35 +428,52 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
         **User Query:** "{query}"
 
         **Startup Data:**
-        {json.dumps(startup_data, indent=2)}
+        {STARTUP_DATA_PLACEHOLDER}
 
         **Your Answer:**
         Do NOT include inline citations. Instead, list all sources in a separate "References" section at the end of your response. 
         The references should be formatted in italics and include the document name and page number.
         '''
-        return self.generate_text_with_llm(prompt)
+        prompt = self.prompt_builder.fit_startup_data(prompt, startup_data)
+        self.prompt_builder.log("direct_answer", prompt)
+        return self._generate(prompt, on_event, step="direct_answer")
 
-    def _run_chat(self, query, history, startup_data):
+    @telemetry.traced("chat")
+    def _run_chat(self, query, history, startup_data, on_event=None):
         """Handles a conversational turn."""
         print("--- Handling follow-up query... ---")
-        formatted_history = "\n".join([f"User: {h['user']}\nAI: {h['ai']}" for h in history])
+        formatted_history = self._format_history(history)
         prompt = f"""You are an investment analyst continuing a conversation about the startup '{startup_data.get('name')}'.
         
         **Previous Conversation:**
         {formatted_history}
         **Startup Context (including internal document summaries):**
-        {json.dumps(startup_data, indent=2)}
+        {STARTUP_DATA_PLACEHOLDER}
         **User's New Query:** "{query}"
         Please provide a direct answer to the user's new query based on the context and history.
         Do NOT include inline citations. Instead, list all sources in a separate "References" section at the end of your response. 
         The references should be formatted in italics and include the document name and page number.
         """
-        response = self.generate_text_with_llm(prompt)
+        prompt = self.prompt_builder.fit_startup_data(prompt, startup_data)
+        self.prompt_builder.log("chat", prompt, history=formatted_history)
+        response = self._generate(prompt, on_event, step="chat")
         return { "chat_response": response }
 
-    def _format_single_agent_response(self, agent_name, agent_result, startup_name):
+    @staticmethod
+    def _run_single_agent(agent_instance, startup_data, presentation):
+        """Runs one specialist on its own, writing in the given presentation mode."""
+        context = AnalysisContext.build(startup_data, presentation=presentation)
+        try:
+            return agent_instance.run(startup_data, context)
+        finally:
+            context.close()
+
+    @telemetry.traced("format_response")
+    def _format_single_agent_response(self, agent_name, agent_result, startup_name, on_event=None):
         """
-        Formats the JSON output of a single agent into a natural, user-friendly response.
+        Formats the JSON output of a single agent into a natural, user-friendly
+        response with a second model call. Only used when a request asks for
+        `reformat`; otherwise the report is rendered by `format_report`.
         """
         print(f"--- Formatting response from {agent_name} ---")
         if not agent_result or not isinstance(agent_result, dict):
@@ -210,8 +491,9 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
         Do NOT include inline citations. Instead, list all sources in a separate "References" section at the end of your response. 
         The references should be formatted in italics and include the document name and page number.
         """
-        return self.generate_text_with_llm(prompt)
+        return self._generate(prompt, on_event, step="format_response")
 
+    @telemetry.traced("compose_email")
     def _compose_and_confirm_email(self, query, startup_data):
         """
         Composes a well-formatted email and asks the user for confirmation before sending.
@@ -231,7 +513,7 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
 
         **Startup Data (including internal document summaries):**
         ```json
-        {json.dumps(startup_data, indent=2)}
+        {STARTUP_DATA_PLACEHOLDER}
         ```
 
         **Instructions:**
@@ -255,8 +537,10 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
             "body": "Dear Founder of [Startup Name],\\n\\nMy name is {investor_name}, and I am a potential investor who is very interested in learning more about your startup. To proceed with our evaluation, could you please upload your pitch deck to the LVX platform at your earliest convenience?\\n\\nThank you for your time and cooperation.\\n\\nBest regards,\\n{investor_name}"
         }}
         '''
-        
-        email_details_str = self.generate_text_with_llm(prompt)
+        prompt = self.prompt_builder.fit_startup_data(prompt, startup_data)
+        self.prompt_builder.log("compose_email", prompt)
+
+        email_details_str = self.generate_text_with_llm(prompt, step="compose_email")
         
         try:
             # Use regex to find the JSON object within the response string
@@ -287,6 +571,7 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
         except json.JSONDecodeError:
             return "I'm sorry, I had trouble drafting the email. Please try rephrasing your request."
 
+    @telemetry.traced("send_email")
     def _execute_email(self, history):
         """
         Executes the sending of an email after user confirmation.
@@ -320,10 +605,25 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
             print(f"--- Error parsing email from history or sending email: {e} ---")
             return "I'm sorry, I couldn't retrieve the email details to send. Please try the request again."
 
-    def run(self, deal_id, query, conversation_id=None):
+    def run(self, deal_id, query, conversation_id=None, on_event=None, include_timings=False, reformat=False):
         """
         Orchestrates the analysis based on the user's query and conversation history.
+
+        If `on_event` is given, it is called as on_event(event, data) with
+        progress updates: the router decision, each specialist report as it
+        finishes, and the final response text as it streams in. With
+        `include_timings`, the result also carries the request's `timings`:
+        per-step durations, LLM and tool call totals and the full trace.
+        With `reformat`, a single specialist's report is restated by the
+        model instead of being rendered locally.
         """
+        with telemetry.trace_request("analysis", deal_id=str(deal_id)) as trace:
+            result = self._run(deal_id, query, conversation_id, on_event, reformat)
+        if include_timings:
+            result["timings"] = trace.summary()
+        return result
+
+    def _run(self, deal_id, query, conversation_id=None, on_event=None, reformat=False):
         print(f"--- STARTING ANALYSIS FOR DEAL ID: {deal_id} (Conv ID: {conversation_id}) ---")
         history = get_conversation_history(conversation_id)
         startup_data = self._get_startup_data(deal_id)
@@ -356,16 +656,18 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
             action = self._intelligent_route_query(query, history, startup_data)
 
         print(f"--- Action from router: {action} ---")
+        telemetry.set_request_attributes(action=_action_label(action))
+        _emit(on_event, "router", {"action": action})
 
         analysis_results = {}
         ai_response_for_history = ""
 
         if action == "direct_answer":
-            direct_answer = self._run_direct_answer(query, startup_data)
+            direct_answer = self._run_direct_answer(query, startup_data, on_event)
             analysis_results = { "response": direct_answer }
             ai_response_for_history = direct_answer
         elif action == "chat":
-            chat_response = self._run_chat(query, history, startup_data)
+            chat_response = self._run_chat(query, history, startup_data, on_event)
             analysis_results = { "response": chat_response.get('chat_response') }
             ai_response_for_history = chat_response.get('chat_response')
         elif action.startswith("run_specific_agent:"):
@@ -373,24 +675,45 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
             agent_instance = self.agent_team.get(agent_name)
             if agent_instance:
                 print(f"--- Running specific agent: {agent_instance.agent_name} ---")
-                raw_agent_result = agent_instance.run(startup_data)
+                # Unless a model restatement is asked for, the specialist
+                # writes for the user directly and its report is laid out
+                # locally, saving a second model round-trip.
+                presentation = "report" if reformat else "answer"
+                fingerprint = input_fingerprint(agent_instance, startup_data)
+                with telemetry.agent_run(agent_name):
+                    raw_agent_result = self.flights.do(
+                        ("run_specific_agent", str(deal_id), agent_name, fingerprint, presentation),
+                        lambda emit: self._run_single_agent(agent_instance, startup_data, presentation),
+                    )
                 print(f"--- Raw agent result: {raw_agent_result} ---")
-                formatted_response = self._format_single_agent_response(
-                    agent_name=agent_instance.agent_name,
-                    agent_result=raw_agent_result,
-                    startup_name=startup_data.get('name')
-                )
+                _emit(on_event, "agent_report", {"agent": agent_name, "report": raw_agent_result})
+                if reformat:
+                    formatted_response = self._format_single_agent_response(
+                        agent_name=agent_instance.agent_name,
+                        agent_result=raw_agent_result,
+                        startup_name=startup_data.get('name'),
+                        on_event=on_event
+                    )
+                else:
+                    formatted_response = format_report(
+                        agent_instance.agent_name, raw_agent_result, startup_data.get('name'))
+                    _emit(on_event, "token", {"text": formatted_response})
                 analysis_results = { "response": formatted_response }
                 ai_response_for_history = formatted_response
             else:
                 print(f"--- WARNING: Router returned unknown agent '{agent_name}'. ---")
                 action = "run_all_agents"
+                telemetry.set_request_attributes(action=action)
         
         if action == "run_all_agents":
             print("--- Running comprehensive analysis... ---")
-            full_analysis_dict = self._run_all_agents_and_synthesize(startup_data)
+            full_analysis_dict = self._run_all_agents_and_synthesize(startup_data, on_event)
             final_summary = full_analysis_dict.get('final_summary', "Analysis failed to generate a summary.")
-            analysis_results = { "response": final_summary }
+            analysis_results = {
+                "response": final_summary,
+                "skipped_agents": full_analysis_dict.get('skipped_agents', []),
+                "report_version": full_analysis_dict.get('report_version'),
+            }
             ai_response_for_history = final_summary
             
         elif action == "send_email":
@@ -409,13 +732,10 @@ class AIStartupAnalysisAgent(ToolbeltAgent):
             analysis_results = { "response": response.get('status') }
             ai_response_for_history = response.get('status')
 
-        # Save the state before the final response is formulated
-        if action != "execute_email":
-            history.append({"user": query, "ai": ai_response_for_history})
-        else: # for execute_email we need to update the last placeholder
-            history[-1]["ai"] = ai_response_for_history
-            
-        new_conversation_id = save_conversation_history(conversation_id, history)
+        # Save the turn before the final response is formulated
+        new_conversation_id = append_conversation_turn(
+            conversation_id, {"user": query, "ai": ai_response_for_history}
+        )
 
         print(f"--- ANALYSIS COMPLETE FOR DEAL ID: {deal_id} (Conv ID: {new_conversation_id}) ---")
         return {
@@ -1,98 +1,163 @@
-import google.generativeai as genai
-import os
-from app.tools.vector_search import vector_search
-import json
+from app.services.llm_cache import make_cache_key, response_cache
+from app.services import llm_limiter, telemetry
+from app.services.llm_clients import get_generative_model
+from app.services.llm_limiter import LLMGenerationError
+from app.services.model_policy import generate, model_policy
+from app.tools.runtime import ToolRuntime
 
 # The ToolbeltAgent is a more advanced agent that can use tools.
 # It is designed to be a drop-in replacement for the BaseAgent.
 class ToolbeltAgent:
     """Base class for agents that can use tools."""
+    # The model comes from the tier the model policy assigns to this agent's
+    # key; orchestrator steps pick their own tier with `step`.
+    policy_key = None
+    model_policy = model_policy
+    # Responses are cached by (model, prompt, tools, tool data version).
+    # Agents whose prompts depend on live web data or on the conversation
+    # opt out by setting this to False.
+    cache_responses = True
+    response_cache = response_cache
+    # The startup_data fields this agent's prompt reads. A full analysis
+    # reuses the agent's previous report while these fields are unchanged;
+    # bump report_version when the prompt changes.
+    input_fields = ()
+    report_version = 1
+
     def __init__(self, agent_name, tools=None):
         self.agent_name = agent_name
         self.tools = tools if tools else []
+        self.tier = self.model_policy.tier_for(self.policy_key)
+        self.model_name = self.tier.model
+        self.tool_runtime = ToolRuntime(self.tools, agent_name=agent_name)
         self.llm = self._init_llm()
 
     def _init_llm(self):
-        """Initializes the Google Generative AI model."""
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        """Returns the shared Google Generative AI model for this agent's tools."""
+        llm = get_generative_model(self.model_name, self.tools)
+        if llm is None:
             print("--- LLM NOT INITIALIZED: GOOGLE_API_KEY not set. --- ")
-            return None
-        genai.configure(api_key=api_key)
-        
-        # Prepare the tools for the generative model
-        model_tools = { "tools": self.tools } if self.tools else {}
+        return llm
 
-        return genai.GenerativeModel(
-            model_name='gemini-flash-latest',
-            **model_tools
-        )
+    def _model_for(self, step=None):
+        """Returns the (tier, model name, model) that answers `step`, or this agent's own."""
+        if step is None:
+            return self.tier, self.model_name, self.llm
+        tier = self.model_policy.tier_for(step)
+        if tier.model == self.model_name:
+            return tier, self.model_name, self.llm
+        return tier, tier.model, get_generative_model(tier.model, self.tools)
 
-    def generate_text_with_llm(self, prompt):
+    def data_version(self):
+        """
+        Returns the versions of the data this agent's tools read, e.g. the
+        document index for vector_search, or None for agents without such
+        tools. Tools advertise it with a `cache_version` function attribute.
+        """
+        versions = {tool.__name__: tool.cache_version() for tool in self.tools if hasattr(tool, "cache_version")}
+        return versions or None
+
+    def _cache_key(self, prompt, model_name=None):
+        """Returns the response cache key for a prompt, or None if caching is off."""
+        if not self.cache_responses or self.response_cache is None:
+            return None
+        return make_cache_key(model_name or self.model_name, prompt, self.tools, self.data_version())
+
+    def generate_text_with_llm(self, prompt, context=None, step=None):
         """
         Generates text using the configured LLM, automatically handling tool calls.
+        With an AnalysisContext, `prompt` holds only this agent's instructions
+        and is sent after the shared startup context. `step` names the
+        orchestrator step whose model tier to use. Raises
+        LLMGenerationError if the model cannot produce a response.
         """
-        if not self.llm:
+        tier, model_name, llm = self._model_for(step)
+        if not llm:
             print("--- LLM NOT INITIALIZED: Returning placeholder text. Set GOOGLE_API_KEY. ---")
             return f"[Placeholder LLM response for: {prompt[:50]}...]"
 
-        try:
-            print(f"--- CALLING LLM for {self.agent_name} with prompt: {prompt[:100]}... ---")
-            result = self.llm.generate_content(prompt)
-            
-            # This is the new tool-calling logic. If the LLM returns a tool call, we execute it.
-            # This is a recursive function that will continue to execute tools until the LLM
-            # returns a text response.
-            while result.candidates[0].content.parts[0].function_call:
-                function_call = result.candidates[0].content.parts[0].function_call
-                tool_name = function_call.name
-                tool_args = dict(function_call.args)
-                
-                # This is the new, more informative logging you requested.
-                print(f"--- AGENT: {self.agent_name} is calling TOOL: {tool_name} with args: {tool_args} ---")
-                
-                # Find and execute the corresponding tool function
-                tool_function = globals().get(tool_name)
-                if tool_function:
-                    # Note: We are using `globals()` to find the tool function. This is a simple
-                    # approach for this example. In a larger application, you would want to use a more
-                    # robust tool registry.
-                    tool_response = tool_function(**tool_args)
-                    
-                    # Send the tool's response back to the LLM
-                    result = self.llm.generate_content(
-                        [   # We are creating a conversation history to send back to the LLM
-                            result.candidates[0].content, # The original prompt
-                            # This is the corrected part. The SDK expects a "function_response"
-                            # key and a specific structure for the response payload.
-                            {
-                                "function_response": {
-                                    "name": tool_name,
-                                    "response": {"content": tool_response},
-                                }
-                            },
-                        ]
-                    )
+        instructions = prompt
+        if context is not None:
+            instructions = context.instructions(prompt)
+            prompt = context.prompt(prompt)
+
+        cache_key = self._cache_key(prompt, model_name)
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                print(f"--- LLM CACHE HIT for {self.agent_name} ---")
+                telemetry.record_cache_hit(self.agent_name)
+                return cached
+
+        with telemetry.llm_call(self.agent_name, model_name, prompt) as call:
+            try:
+                print(f"--- CALLING LLM for {self.agent_name} with prompt: {prompt[:100]}... ---")
+                cached_model = context.cached_model(model_name) if context is not None and not self.tools else None
+                if self.tools:
+                    result = self.tool_runtime.run(llm, prompt, tier=tier)
+                elif cached_model is not None:
+                    # The shared context is already on the server; send only the instructions.
+                    result = generate(cached_model, instructions, tier=tier)
+                    telemetry.record_model_response(result)
                 else:
-                    print(f"--- TOOL NOT FOUND: {tool_name} ---")
-                    # If the tool is not found, we return an error message to the LLM
-                    result = self.llm.generate_content(
-                        [
-                            result.candidates[0].content,
-                            {
-                                "function_response": {
-                                    "name": tool_name,
-                                    "response": {"content": f"Error: Tool '{tool_name}' not found."},
-                                }
-                            },
-                        ]
-                    )
-
-            return result.text
-
-        except Exception as e:
-            print(f"--- LLM GENERATION FAILED for {self.agent_name}: {e} ---")
-            return f"[LLM Generation Failed: {e}]"
+                    result = generate(llm, prompt, tier=tier)
+                    telemetry.record_model_response(result)
+
+                text = result.text
+                telemetry.record_response_text(call, text)
+                if cache_key:
+                    self.response_cache.set(cache_key, text)
+                return text
+
+            except LLMGenerationError as e:
+                print(f"--- LLM GENERATION FAILED for {self.agent_name}: {e} ---")
+                raise
+            except Exception as e:
+                print(f"--- LLM GENERATION FAILED for {self.agent_name}: {e} ---")
+                raise LLMGenerationError(f"{type(e).__name__}: {e}") from e
+
+    def stream_text_with_llm(self, prompt, step=None):
+        """
+        Generates text using Gemini's streaming API, yielding chunks of text as
+        they arrive. Intended for plain prompts; tool-using prompts should go
+        through generate_text_with_llm. Raises LLMGenerationError if the model
+        fails; only the call that opens the stream is retried, and streams
+        are neither hedged nor timed out.
+        """
+        _, model_name, llm = self._model_for(step)
+        if not llm:
+            print("--- LLM NOT INITIALIZED: Returning placeholder text. Set GOOGLE_API_KEY. ---")
+            yield f"[Placeholder LLM response for: {prompt[:50]}...]"
+            return
+
+        cache_key = self._cache_key(prompt, model_name)
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                print(f"--- LLM CACHE HIT for {self.agent_name} ---")
+                telemetry.record_cache_hit(self.agent_name)
+                yield cached
+                return
+
+        # Not made current: the consumer runs between chunks.
+        with telemetry.llm_call(self.agent_name, model_name, prompt, activate=False) as call:
+            try:
+                print(f"--- STREAMING LLM for {self.agent_name} with prompt: {prompt[:100]}... ---")
+                chunks = []
+                call.add("model_calls")
+                for chunk in llm_limiter.generate_content(llm, prompt, stream=True):
+                    if chunk.parts:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+                telemetry.record_response_text(call, "".join(chunks))
+                if cache_key:
+                    self.response_cache.set(cache_key, "".join(chunks))
+            except LLMGenerationError as e:
+                print(f"--- LLM STREAMING FAILED for {self.agent_name}: {e} ---")
+                raise
+            except Exception as e:
+                print(f"--- LLM STREAMING FAILED for {self.agent_name}: {e} ---")
+                raise LLMGenerationError(f"{type(e).__name__}: {e}") from e
 
     def run(self, *args, **kwargs):
         """
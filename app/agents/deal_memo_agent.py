@@ -1,27 +1,32 @@
-import json
+from app.services.analysis_context import CONTEXT_INPUT_FIELDS, AnalysisContext
 from .base_agent import ToolbeltAgent
 from app.tools.vector_search import vector_search
 
 class DealMemoAgent(ToolbeltAgent):
     """Generates a deal memo for a startup."""
+    # Also reads dealId to scope its vector_search calls.
+    input_fields = CONTEXT_INPUT_FIELDS + ("dealId",)
+    policy_key = "deal_memo"
+
     def __init__(self):
         super().__init__(
             agent_name="Deal Memo Agent",
             tools=[vector_search]
         )
 
-    def run(self, startup_data):
+    def run(self, startup_data, context=None):
         """
         Generates a comprehensive deal memo based on the startup's data.
         """
         
+        context = context or AnalysisContext.build(startup_data)
         prompt = f"""
         You are a world-class investment analyst, and your task is to generate a detailed investment deal memo.
 
         **Instructions:**
         1.  You have access to a `vector_search` tool that can search through a knowledge base of internal documents, such as pitch decks, call transcripts, and market research reports.
-        2.  **Crucially, you have also been provided with summaries of key internal documents in the 'Internal Document Summaries' section below. You MUST use this information as a primary source for your analysis.**
-        3.  Use the `vector_search` tool to supplement the provided summaries and gather any additional information needed about the startup\'s market, team, product, financials, and competition.
+        2.  **Crucially, you have also been provided with summaries of key internal documents in the 'Internal Document Summaries' section above. You MUST use this information as a primary source for your analysis.**
+        3.  Use the `vector_search` tool to supplement the provided summaries and gather any additional information needed about the startup\'s market, team, product, financials, and competition. Always call it with deal_id="{startup_data.get('dealId', '')}" so that it only searches this startup's documents.
         4.  Once you have gathered all the necessary information, synthesize it into a comprehensive deal memo.
         5.  The memo should be structured for an investment committee and cover the following sections in detail:
             -   Executive Summary
@@ -33,20 +38,6 @@ class DealMemoAgent(ToolbeltAgent):
             -   Use of Funds
             -   Investment Thesis
             -   Risks
-        
-        **Startup Information:**
-        - **Company Name:** {startup_data.get('company')}
-        - **Industry/Sector:** {startup_data.get('sector')}
-        - **Description:** {startup_data.get('description')}
-        - **Location:** {startup_data.get('location')}
-        - **Stage:** {startup_data.get('stage')}
-        - **Funding Goal:** {startup_data.get('fundingGoal')}
-        - **Raised so far:** {startup_data.get('raised')}
-
-        **Internal Document Summaries:**
-        ```json
-        {json.dumps(startup_data.get('companyDetails', 'No document summaries available.'), indent=2)}
-        ```
 
         Now, begin your work. Remember to prioritize the 'Internal Document Summaries' and supplement with `vector_search` to gather information before writing the memo.
 
@@ -54,5 +45,5 @@ class DealMemoAgent(ToolbeltAgent):
         The references should be formatted in italics and include the document name and page number.
         """
 
-        deal_memo = self.generate_text_with_llm(prompt)
-        return {{"deal_memo": deal_memo}}
+        deal_memo = self.generate_text_with_llm(prompt, context=context)
+        return {"deal_memo": deal_memo}
@@ -1,21 +1,27 @@
-import json
+from app.services.analysis_context import CONTEXT_INPUT_FIELDS, AnalysisContext
 from .base_agent import ToolbeltAgent
 
 class DigitalFootprintAnalysisAgent(ToolbeltAgent):
     """Analyzes a startup's digital footprint, including its founders' presence."""
+    # Relies on live web research, so responses must not be served from cache.
+    cache_responses = False
+    input_fields = CONTEXT_INPUT_FIELDS
+    policy_key = "digital_footprint"
+
     def __init__(self):
         super().__init__(
             agent_name="Digital Footprint Analysis Agent",
             tools=[]
         )
 
-    def run(self, startup_data):
+    def run(self, startup_data, context=None):
         """
         Analyzes the startup's and its founders' digital presence.
         """
         founders = startup_data.get('Founders', [])
         founder_names = ", ".join(founders) if founders else "No founders listed"
 
+        context = context or AnalysisContext.build(startup_data)
         prompt = f"""
         You are a digital marketing and branding analyst with built-in web search capabilities. Your task is to conduct a thorough analysis of a startup's digital footprint, including the online presence of its founders.
 
@@ -35,16 +41,6 @@ class DigitalFootprintAnalysisAgent(ToolbeltAgent):
             - Combine your findings into a single, comprehensive report.
             - Highlight strengths, weaknesses, and any inconsistencies between the company's intended image and its actual online presence (including its founders').
 
-        **Startup Information:**
-        - **Name:** {startup_data.get('company')}
-        - **Industry/Sector:** {startup_data.get('sector')}
-        - **Founders:** {founder_names}
-
-        **Internal Document Summaries:**
-        ```json
-        {json.dumps(startup_data.get('companyDetails', 'No document summaries available.'), indent=2)}
-        ```
-
         **Report Structure:**
         1.  **Overall Digital Presence Summary:** A high-level overview of the startup's and founders' digital footprint.
         2.  **Startup Digital Channel Analysis:** Evaluation of the company's website, social media, and other online channels.
@@ -58,5 +54,5 @@ class DigitalFootprintAnalysisAgent(ToolbeltAgent):
         The references should be formatted in italics and include the document name and page number.
         """
 
-        report = self.generate_text_with_llm(prompt)
-        return {{"digital_footprint_analysis": report}}
+        report = self.generate_text_with_llm(prompt, context=context)
+        return {"digital_footprint_analysis": report}
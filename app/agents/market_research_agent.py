@@ -1,19 +1,25 @@
-import json
+from app.services.analysis_context import CONTEXT_INPUT_FIELDS, AnalysisContext
 from .base_agent import ToolbeltAgent
 
 class MarketResearchAgent(ToolbeltAgent):
     """Conducts market research for a startup using internal documents and web search."""
+    # Relies on live web research, so responses must not be served from cache.
+    cache_responses = False
+    input_fields = CONTEXT_INPUT_FIELDS
+    policy_key = "market_research"
+
     def __init__(self):
         super().__init__(
             agent_name="Market Research Agent",
             tools=[]
         )
 
-    def run(self, startup_data):
+    def run(self, startup_data, context=None):
         """
         Conducts market research by combining the startup's internal document summaries
         with real-time external market data from the web.
         """
+        context = context or AnalysisContext.build(startup_data)
         prompt = f"""
         You are a market research analyst with built-in web search capabilities. Your task is to conduct a thorough market analysis for a startup, combining insights from its internal documents with real-time external market data.
 
@@ -32,16 +38,6 @@ class MarketResearchAgent(ToolbeltAgent):
             - Compare the startup's internal perceptions with the external reality. Highlight any gaps or misalignments.
             - Provide a clear and data-driven assessment of the market opportunity.
 
-        **Startup Information:**
-        - **Name:** {startup_data.get('company')}
-        - **Industry/Sector:** {startup_data.get('sector')}
-        - **Description:** {startup_data.get('description')}
-
-        **Internal Document Summaries:**
-        ```json
-        {json.dumps(startup_data.get('companyDetails', 'No document summaries available.'), indent=2)}
-        ```
-
         **Report Structure:**
         1.  **Executive Summary:** A high-level overview of the market and the startup's position within it.
         2.  **Market Overview:** Analysis of the market size, growth projections (including TAM, SAM, SOM if possible), and key trends based on both internal and external data.
@@ -56,5 +52,5 @@ class MarketResearchAgent(ToolbeltAgent):
         The references should be formatted in italics and include the document name and page number.
         """
 
-        report = self.generate_text_with_llm(prompt)
-        return {{"market_research_analysis": report}}
+        report = self.generate_text_with_llm(prompt, context=context)
+        return {"market_research_analysis": report}
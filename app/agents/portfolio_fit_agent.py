@@ -1,18 +1,22 @@
-import json
+from app.services.analysis_context import CONTEXT_INPUT_FIELDS, AnalysisContext
 from .base_agent import ToolbeltAgent
 
 class PortfolioFitAgent(ToolbeltAgent):
     """Analyzes how well a startup fits into an investment portfolio based on internal documents."""
+    input_fields = CONTEXT_INPUT_FIELDS
+    policy_key = "portfolio_fit"
+
     def __init__(self):
         super().__init__(
             agent_name="Portfolio Fit Agent",
             tools=[]
         )
 
-    def run(self, startup_data):
+    def run(self, startup_data, context=None):
         """
         Analyzes how well the startup aligns with a specific investment portfolio, based on its own documents.
         """
+        context = context or AnalysisContext.build(startup_data)
         prompt = f"""        You are a portfolio analyst for a venture capital firm.
 
         **Instructions:**
@@ -25,17 +29,6 @@ class PortfolioFitAgent(ToolbeltAgent):
         - **Business Model:** Strong preference for B2B models.
         - **Stage:** Early-stage (Seed, Series A).
 
-        **Startup Information:**
-        - **Name:** {startup_data.get('company')}
-        - **Industry/Sector:** {startup_data.get('sector')}
-        - **Description:** {startup_data.get('description')}
-        - **Stage:** {startup_data.get('stage')}
-
-        **Internal Document Summaries (from the Startup):**
-        ```json
-        {json.dumps(startup_data.get('companyDetails', 'No document summaries available.'), indent=2)}
-        ```
-
         **Report Structure:**
         1.  **Industry Fit**: Does the startup's self-reported sector align with our target industries?
         2.  **Business Model Fit**: Based on the documents, does the startup have a B2B model?
@@ -49,5 +42,5 @@ class PortfolioFitAgent(ToolbeltAgent):
         The references should be formatted in italics and include the document name and page number.
         """
 
-        report = self.generate_text_with_llm(prompt)
+        report = self.generate_text_with_llm(prompt, context=context)
         return { "portfolio_fit_analysis": report }
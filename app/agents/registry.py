@@ -0,0 +1,44 @@
+import threading
+import time
+from app.services import llm_clients
+from app.tools import vector_search
+
+# Process-level registry for the orchestrator. Building AIStartupAnalysisAgent
+# constructs the whole specialist team, so it is done once per worker and
+# the instance is shared across request threads. Agents keep no per-request
+# state on `self`, which is what makes sharing them safe.
+_analysis_agent = None
+_lock = threading.Lock()
+
+
+def get_analysis_agent():
+    """Returns the shared AIStartupAnalysisAgent, building it on first use."""
+    global _analysis_agent
+    if _analysis_agent is None:
+        with _lock:
+            if _analysis_agent is None:
+                # Imported lazily so importing the registry does not pull in
+                # the whole agent team.
+                from .ai_startup_analysis_agent import AIStartupAnalysisAgent
+                _analysis_agent = AIStartupAnalysisAgent()
+    return _analysis_agent
+
+
+def get_agent(agent_key):
+    """Returns a shared member of the orchestrator's agent team."""
+    return get_analysis_agent().agent_team[agent_key]
+
+
+def warm_up():
+    """
+    Builds the shared agents at startup and reports what it cost, so the
+    first request does not pay for it.
+    """
+    started = time.perf_counter()
+    agent = get_analysis_agent()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"--- Agent registry ready: {len(agent.agent_team) + 1} agents, "
+          f"{llm_clients.pool_size()} model clients built in {elapsed_ms:.1f}ms ---")
+    if vector_search.VECTOR_SEARCH_BACKEND == "local":
+        vector_search.load_index()
+    return agent
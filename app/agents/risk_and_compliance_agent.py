@@ -1,39 +1,32 @@
-import json
+from app.services.analysis_context import CONTEXT_INPUT_FIELDS, AnalysisContext
 from .base_agent import ToolbeltAgent
 
 class RiskAndComplianceAgent(ToolbeltAgent):
     """Analyzes potential risks and compliance issues for a startup based on internal documents."""
+    input_fields = CONTEXT_INPUT_FIELDS
+    policy_key = "risk_and_compliance"
+
     def __init__(self):
         super().__init__(
             agent_name="Risk and Compliance Agent",
             tools=[]
         )
 
-    def run(self, startup_data):
+    def run(self, startup_data, context=None):
         """
         Analyzes potential risks and compliance requirements for the given startup
         based on its internal document summaries.
         """
+        context = context or AnalysisContext.build(startup_data)
         prompt = f"""
         You are a specialist in risk and compliance for venture capital.
 
         **Instructions:**
-        1.  **Your analysis MUST be based solely on the 'Internal Document Summaries' provided below.**
+        1.  **Your analysis MUST be based solely on the 'Internal Document Summaries' provided above.**
         2.  Focus your analysis on the following areas as described in the documents: Intellectual Property (IP), competition, financial stability, key-person dependencies, and regulatory hurdles.
         3.  Do not use any external tools or data.
         4.  After your review, compile a detailed report for an investment committee with a moderate risk tolerance.
 
-        **Startup Information:**
-        - **Name:** {startup_data.get('company')}
-        - **Industry/Sector:** {startup_data.get('sector')}
-        - **Description:** {startup_data.get('description')}
-        - **Location:** {startup_data.get('location')}
-
-        **Internal Document Summaries:**
-        ```json
-        {json.dumps(startup_data.get('companyDetails', 'No document summaries available.'), indent=2)}
-        ```
-
         **Report Structure:**
         1.  **Intellectual Property (IP) Risks:** Are there any patent or trademark risks mentioned in the documents?
         2.  **Competitive Risks:** Who are the main competitors identified in the documents?
@@ -47,5 +40,5 @@ class RiskAndComplianceAgent(ToolbeltAgent):
         The references should be formatted in italics and include the document name and page number.
         """
 
-        report = self.generate_text_with_llm(prompt)
-        return {{"risk_and_compliance_analysis": report}}
+        report = self.generate_text_with_llm(prompt, context=context)
+        return {"risk_and_compliance_analysis": report}
@@ -1,8 +1,19 @@
-from flask import Blueprint, request, jsonify
-from app.agents.ai_startup_analysis_agent import AIStartupAnalysisAgent
+import json
+import queue
+import threading
+import time
+from flask import Blueprint, Response, request, jsonify, url_for
+from app.agents.registry import get_analysis_agent
+from app.services import telemetry
+from app.services.analysis_jobs import JobQueueFullError, get_job_queue
+from app.services.llm_limiter import LLMGenerationError
+from app.services.model_policy import model_policy
+from app.services.report_store import get_report_store
 
 # Create a Blueprint for the API
 api_bp = Blueprint('api_bp', __name__, url_prefix='/api/v1')
+# Served at the root, where Prometheus scrapers look by default.
+metrics_bp = Blueprint('metrics_bp', __name__)
 
 @api_bp.route('/analyze/<string:deal_id>', methods=['POST'])
 def analyze_startup(deal_id):
@@ -32,13 +43,34 @@ def analyze_startup(deal_id):
               type: string
               description: The ID of an ongoing conversation for follow-up questions.
               example: "a1b2c3d4-e5f6-g7h8-i9j0-k1l2m3n4o5p6"
+            async:
+              type: boolean
+              description: Run the analysis as a background job and return its id immediately.
+              example: true
+            timings:
+              type: boolean
+              description: Include per-step timings, LLM and tool call totals and the request's trace.
+              example: true
+            reformat:
+              type: boolean
+              description: >
+                When the query runs a single specialist, have the model restate
+                its report as a narrative instead of rendering it directly.
+                Costs a second model call.
+              example: false
     responses:
       200:
         description: Analysis successful
+      202:
+        description: Analysis queued as a background job (when `async` is true)
       400:
         description: Bad request (e.g., missing query)
       404:
         description: Deal ID not found
+      503:
+        description: >
+          Too many background analyses are already queued, or the model is
+          unavailable after retries (with a Retry-After header when known)
     """
     # Get the data from the request body
     data = request.get_json()
@@ -49,16 +81,237 @@ def analyze_startup(deal_id):
     # Get the optional conversation_id
     conversation_id = data.get('conversation_id')
 
-    # Initialize and run the agent
-    agent = AIStartupAnalysisAgent()
-    result = agent.run(
-        deal_id=deal_id,
-        query=query,
-        conversation_id=conversation_id
-    )
+    if data.get('async'):
+        try:
+            job = get_job_queue().submit(deal_id, query, conversation_id, reformat=bool(data.get('reformat')))
+        except JobQueueFullError as e:
+            return jsonify({'error': str(e)}), 503
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': url_for('api_bp.get_analysis_job', job_id=job['id']),
+            'events_url': url_for('api_bp.stream_analysis_job', job_id=job['id']),
+        }), 202
+
+    # Run the worker's shared agent
+    agent = get_analysis_agent()
+    try:
+        result = agent.run(
+            deal_id=deal_id,
+            query=query,
+            conversation_id=conversation_id,
+            include_timings=bool(data.get('timings')),
+            reformat=bool(data.get('reformat'))
+        )
+    except LLMGenerationError as e:
+        headers = {'Retry-After': str(max(1, round(e.retry_after)))} if e.retry_after else {}
+        return jsonify({'error': f'The model is unavailable: {e}'}), 503, headers
 
     if 'error' in result:
         # Assuming errors from the agent might be for things like 'deal not found'
         return jsonify(result), 404
 
     return jsonify(result)
+
+
+@api_bp.route('/deals/<string:deal_id>/invalidate', methods=['POST'])
+def invalidate_deal(deal_id):
+    """
+    Drops this worker's cached snapshot of a deal, and the record keys it
+    remembers for it, so the next request re-reads the deal from the
+    database. Call it after updating deal data.
+    ---
+    responses:
+      200:
+        description: Snapshot invalidated
+    """
+    get_analysis_agent().deal_snapshots.invalidate(deal_id)
+    return jsonify({'invalidated': deal_id})
+
+def _sse(event, data):
+    """Formats a single server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api_bp.route('/analyze/<string:deal_id>/stream', methods=['POST'])
+def analyze_startup_stream(deal_id):
+    """
+    Streaming variant of /analyze/<deal_id>. Takes the same request body and
+    responds with server-sent events as the analysis progresses.
+    ---
+    responses:
+      200:
+        description: >
+          A text/event-stream of `router`, `agent_report`, `agent_unavailable`
+          and `token` events, terminated by a `done` event carrying the same
+          payload as the non-streaming endpoint, or an `error` event.
+      400:
+        description: Bad request (e.g., missing query)
+    """
+    data = request.get_json()
+    if not data or 'query' not in data:
+        return jsonify({'error': 'Missing query in request body'}), 400
+
+    query = data['query']
+    conversation_id = data.get('conversation_id')
+    agent = get_analysis_agent()
+    events = queue.Queue()
+
+    def run_analysis():
+        try:
+            result = agent.run(
+                deal_id=deal_id,
+                query=query,
+                conversation_id=conversation_id,
+                on_event=lambda event, payload: events.put((event, payload)),
+                include_timings=bool(data.get('timings')),
+                reformat=bool(data.get('reformat'))
+            )
+            events.put(("error" if 'error' in result else "done", result))
+        except Exception as e:
+            print(f"--- Streaming analysis failed for deal {deal_id}: {e} ---")
+            events.put(("error", {"error": str(e)}))
+
+    threading.Thread(target=run_analysis, name=f"analyze-stream-{deal_id}", daemon=True).start()
+
+    def generate():
+        while True:
+            try:
+                event, payload = events.get(timeout=15)
+            except queue.Empty:
+                # Comment line to keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(event, payload)
+            if event in ("done", "error"):
+                return
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """
+    Returns the status and partial results of a background analysis job.
+    ---
+    responses:
+      200:
+        description: >
+          The job record: `status` (queued, running, succeeded, failed), the
+          progress `events` so far, the `partial_response` text streamed so
+          far, and the final `result` or `error`.
+      404:
+        description: Unknown or expired job
+    """
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({'error': f'No job found with ID: {job_id}'}), 404
+    return jsonify(job)
+
+@api_bp.route('/jobs/<string:job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    """
+    Subscribes to a background analysis job as server-sent events, replaying
+    the progress events so far and ending with a `done` or `error` event.
+    ---
+    responses:
+      200:
+        description: A text/event-stream of the job's progress events
+      404:
+        description: Unknown or expired job
+    """
+    job_queue = get_job_queue()
+    if not job_queue.get(job_id):
+        return jsonify({'error': f'No job found with ID: {job_id}'}), 404
+
+    def generate():
+        sent = 0
+        last_write = time.monotonic()
+        while True:
+            job = job_queue.get(job_id)
+            if not job:
+                yield _sse("error", {"error": "Job expired."})
+                return
+            for item in job["events"][sent:]:
+                yield _sse(item["event"], item["data"])
+                last_write = time.monotonic()
+            sent = len(job["events"])
+            if job["status"] == "succeeded":
+                yield _sse("done", job["result"])
+                return
+            if job["status"] == "failed":
+                yield _sse("error", {"error": job["error"]})
+                return
+            if time.monotonic() - last_write > 15:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+            time.sleep(0.5)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/reports/<string:deal_id>', methods=['GET'])
+def get_latest_report(deal_id):
+    """
+    Returns the most recent stored full analysis of a deal. No model is called.
+    ---
+    responses:
+      200:
+        description: >
+          The report: `version`, `created_at`, input `fingerprint`, `model`
+          and `agent_models`, the specialist `reports`, any
+          `unavailable_reports`, `skipped_agents` and the `final_summary`.
+      404:
+        description: No stored report for the deal
+    """
+    report = get_report_store().latest(deal_id)
+    if not report:
+        return jsonify({'error': f'No report found for deal ID: {deal_id}'}), 404
+    return jsonify(report)
+
+@api_bp.route('/reports/<string:deal_id>/versions', methods=['GET'])
+def list_report_versions(deal_id):
+    """
+    Lists the stored report versions of a deal, newest first.
+    ---
+    responses:
+      200:
+        description: The `version`, `created_at`, `fingerprint` and `model` of each version
+    """
+    return jsonify({'deal_id': deal_id, 'versions': get_report_store().versions(deal_id)})
+
+@api_bp.route('/reports/<string:deal_id>/versions/<int:version>', methods=['GET'])
+def get_report_version(deal_id, version):
+    """
+    Returns one stored version of a deal's full analysis. No model is called.
+    ---
+    responses:
+      200:
+        description: The report, as for /reports/<deal_id>
+      404:
+        description: Unknown deal or version
+    """
+    report = get_report_store().get(deal_id, version)
+    if not report:
+        return jsonify({'error': f'No version {version} of the report for deal ID: {deal_id}'}), 404
+    return jsonify(report)
+
+@api_bp.route('/models', methods=['GET'])
+def get_model_policy():
+    """
+    Returns this worker's model policy: each tier's model, timeout and
+    hedging settings with its recent latency percentiles and call counts,
+    and the tier assigned to each agent and orchestrator step.
+    ---
+    responses:
+      200:
+        description: The `tiers` and `assignments` of the model policy
+    """
+    return jsonify(model_policy.stats())
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Request, agent, LLM and tool call metrics for this worker in the
+    Prometheus text exposition format.
+    """
+    return Response(telemetry.metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,154 @@
+import datetime
+import json
+import os
+import threading
+import google.generativeai as genai
+from app.services.prompt_builder import CHARS_PER_TOKEN, count_tokens, trim_document_summaries
+
+# The startup facts and document summaries every specialist needs, built
+# once per analysis. Specialist prompts start with this shared prefix and
+# append their own instructions, so the large block is serialized and
+# trimmed once, and identical prefixes let the API reuse it across the
+# fan-out. With ANALYSIS_CONTEXT_CACHE=gemini and an SDK that supports
+# context caching, the prefix is uploaded as cached content the first time
+# a tool-free specialist asks for it, once per model since cached content
+# is bound to the model it was created for, and those specialists then
+# send only their instructions.
+ANALYSIS_CONTEXT_TOKEN_BUDGET = int(os.getenv("ANALYSIS_CONTEXT_TOKEN_BUDGET", "24000"))
+ANALYSIS_CONTEXT_CACHE = os.getenv("ANALYSIS_CONTEXT_CACHE", "local").lower()
+# The API rejects cached content below a minimum size, so smaller
+# prefixes are sent inline.
+ANALYSIS_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("ANALYSIS_CONTEXT_CACHE_MIN_TOKENS", "4096"))
+ANALYSIS_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CONTEXT_CACHE_TTL_SECONDS", "600"))
+if ANALYSIS_CONTEXT_CACHE == "gemini" and ANALYSIS_CONTEXT_CACHE_MIN_TOKENS > ANALYSIS_CONTEXT_TOKEN_BUDGET:
+    print(f"--- WARNING: ANALYSIS_CONTEXT_CACHE_MIN_TOKENS ({ANALYSIS_CONTEXT_CACHE_MIN_TOKENS}) exceeds "
+          f"ANALYSIS_CONTEXT_TOKEN_BUDGET ({ANALYSIS_CONTEXT_TOKEN_BUDGET}); context caching will never apply ---")
+
+# How specialists present their output. "report" is the internal analysis
+# the CIO synthesis reads; "answer" is written for the investor directly,
+# so a single-agent run needs no second pass to restate it.
+PRESENTATIONS = {
+    "report": "",
+    "answer": """
+**Presentation:** Your report goes straight to the investor who asked for it. Write it as a clear, easy-to-read narrative in markdown, opening with a two or three sentence summary of your findings. Do NOT include inline citations. Instead, list all sources in a separate "References" section at the end, formatted in italics with the document name and page number.
+""",
+}
+
+# Every startup_data field the shared prefix is built from.
+CONTEXT_INPUT_FIELDS = (
+    "company", "name", "sector", "description", "location", "stage",
+    "fundingGoal", "raised", "Founders", "companyDetails",
+)
+
+
+def serialize_document_summaries(company_details, token_budget):
+    """Serializes document summaries as JSON, trimmed to fit `token_budget`."""
+    serialized = json.dumps(company_details, indent=2)
+    overflow = count_tokens(serialized) - token_budget
+    # JSON escaping makes the character count approximate, so take a couple
+    # more passes if the first trim was not quite enough.
+    for _ in range(3):
+        if overflow <= 0 or not isinstance(company_details, (str, dict)):
+            break
+        company_details = trim_document_summaries(company_details, overflow * CHARS_PER_TOKEN)
+        serialized = json.dumps(company_details, indent=2)
+        overflow = count_tokens(serialized) - token_budget
+    return serialized
+
+
+class AnalysisContext:
+    """
+    Shared prompt prefix for one analysis of one startup, and the
+    presentation mode specialists write in.
+    """
+    def __init__(self, startup_data, prefix, cache="local", presentation="report"):
+        if presentation not in PRESENTATIONS:
+            raise ValueError(f"Unknown presentation mode: {presentation}")
+        self.startup_data = startup_data
+        self.prefix = prefix
+        self.cache = cache
+        self.presentation = presentation
+        self.tokens = count_tokens(prefix)
+        # Model name -> uploaded cached content, or None if it could not be created.
+        self._cached_contents = {}
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, startup_data, token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET, cache=ANALYSIS_CONTEXT_CACHE,
+              presentation="report"):
+        """Builds the shared context. `cache="gemini"` enables uploading it as cached content."""
+        founders = startup_data.get('Founders', [])
+        summaries = serialize_document_summaries(
+            startup_data.get('companyDetails', 'No document summaries available.'), token_budget
+        )
+        prefix = f"""You are part of a team of analysts at a venture capital firm evaluating the startup described below. Your specific role and instructions follow the startup information.
+
+**Startup Information:**
+- **Name:** {startup_data.get('company') or startup_data.get('name')}
+- **Industry/Sector:** {startup_data.get('sector')}
+- **Description:** {startup_data.get('description')}
+- **Location:** {startup_data.get('location')}
+- **Stage:** {startup_data.get('stage')}
+- **Funding Goal:** {startup_data.get('fundingGoal')}
+- **Raised so far:** {startup_data.get('raised')}
+- **Founders:** {", ".join(founders) if founders else "No founders listed"}
+
+**Internal Document Summaries:**
+```json
+{summaries}
+```
+"""
+        return cls(startup_data, prefix, cache=cache, presentation=presentation)
+
+    def instructions(self, instructions):
+        """Returns an agent's instructions with the presentation mode's guidance appended."""
+        return f"{instructions}{PRESENTATIONS[self.presentation]}"
+
+    def prompt(self, instructions):
+        """Returns the full prompt: the shared prefix followed by `instructions`."""
+        return f"{self.prefix}\n{self.instructions(instructions)}"
+
+    def cached_model(self, model_name):
+        """
+        Returns a `model_name` model bound to the context uploaded as cached
+        content, uploading it on first use, or None when caching is off,
+        unsupported or the context is too small.
+        """
+        if self.cache != "gemini" or self.tokens < ANALYSIS_CONTEXT_CACHE_MIN_TOKENS:
+            return None
+        with self._cache_lock:
+            if model_name not in self._cached_contents:
+                self._cached_contents[model_name] = _create_cached_content(self.prefix, self.tokens, model_name)
+            cached_content = self._cached_contents[model_name]
+        if cached_content is None:
+            return None
+        return genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+
+    def close(self):
+        """Deletes the uploaded contexts, if any. They would otherwise expire with their TTL."""
+        with self._cache_lock:
+            cached_contents, self._cached_contents = self._cached_contents, {}
+        for cached_content in cached_contents.values():
+            if cached_content is None:
+                continue
+            try:
+                cached_content.delete()
+            except Exception as e:
+                print(f"--- Could not delete cached analysis context: {e} ---")
+
+
+def _create_cached_content(prefix, tokens, model_name):
+    caching = getattr(genai, "caching", None)
+    if caching is None or not os.getenv("GOOGLE_API_KEY"):
+        return None
+    try:
+        cached_content = caching.CachedContent.create(
+            model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+            contents=[prefix],
+            ttl=datetime.timedelta(seconds=ANALYSIS_CONTEXT_CACHE_TTL_SECONDS),
+        )
+        print(f"--- Uploaded ~{tokens} token analysis context as cached content for {model_name} ---")
+        return cached_content
+    except Exception as e:
+        print(f"--- Context caching unavailable, sending the shared prefix inline: {e} ---")
+        return None
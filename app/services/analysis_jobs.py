@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.services import llm_limiter
+
+# Background execution of long-running analyses. A request enqueues a job
+# and gets its id back immediately; a bounded worker pool runs the
+# orchestrator, recording progress events as partial results that clients
+# poll or subscribe to.
+ANALYSIS_JOB_CONCURRENCY = int(os.getenv("ANALYSIS_JOB_CONCURRENCY", "2"))
+ANALYSIS_JOB_MAX_PENDING = int(os.getenv("ANALYSIS_JOB_MAX_PENDING", "50"))
+ANALYSIS_JOB_RETENTION_SECONDS = float(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", "3600"))
+# Streamed text is saved to the job record once this many characters or
+# seconds have accumulated since the last save, so pollers see the
+# response grow without a store write per token.
+ANALYSIS_JOB_PARTIAL_FLUSH_CHARS = int(os.getenv("ANALYSIS_JOB_PARTIAL_FLUSH_CHARS", "200"))
+ANALYSIS_JOB_PARTIAL_FLUSH_SECONDS = float(os.getenv("ANALYSIS_JOB_PARTIAL_FLUSH_SECONDS", "0.5"))
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class InMemoryJobStore:
+    """
+    Keeps job records in this worker, forgetting finished jobs after the
+    retention period. Past `max_jobs`, the oldest finished jobs are dropped;
+    queued and running jobs are always kept.
+    """
+    def __init__(self, max_jobs=1000, retention_seconds=ANALYSIS_JOB_RETENTION_SECONDS):
+        self.max_jobs = max_jobs
+        self.retention_seconds = retention_seconds
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = json.loads(json.dumps(job))
+            self._jobs.move_to_end(job["id"])
+            now = time.time()
+            for job_id in list(self._jobs):
+                finished_at = self._jobs[job_id].get("finished_at")
+                if not finished_at:
+                    continue
+                if now - finished_at > self.retention_seconds or len(self._jobs) > self.max_jobs:
+                    del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+
+class SQLiteJobStore:
+    """Keeps job records in a SQLite file so any worker on the host can report on them."""
+    def __init__(self, path, retention_seconds=ANALYSIS_JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_jobs ("
+            " id TEXT PRIMARY KEY, payload TEXT NOT NULL, finished_at REAL)"
+        )
+        self._db.commit()
+
+    def put(self, job):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analysis_jobs (id, payload, finished_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), job.get("finished_at")),
+            )
+            self._db.execute("DELETE FROM analysis_jobs WHERE finished_at < ?",
+                             (time.time() - self.retention_seconds,))
+            self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class AnalysisJobQueue:
+    """
+    Runs analyses on a bounded worker pool. At most `concurrency` analyses
+    run at once, and at most `max_pending` may be queued or running before
+    new submissions are rejected, so a burst of full analyses cannot starve
+    the request threads.
+    """
+    def __init__(self, runner, store=None, concurrency=ANALYSIS_JOB_CONCURRENCY,
+                 max_pending=ANALYSIS_JOB_MAX_PENDING, partial_flush_chars=ANALYSIS_JOB_PARTIAL_FLUSH_CHARS,
+                 partial_flush_seconds=ANALYSIS_JOB_PARTIAL_FLUSH_SECONDS):
+        self.runner = runner
+        self.store = store or InMemoryJobStore()
+        self.max_pending = max_pending
+        self.partial_flush_chars = partial_flush_chars
+        self.partial_flush_seconds = partial_flush_seconds
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="analysis-job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, deal_id, query, conversation_id=None, reformat=False):
+        """Enqueues an analysis and returns its job record."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"{self._pending} analyses are already queued or running.")
+            self._pending += 1
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "deal_id": deal_id,
+            "query": query,
+            "conversation_id": conversation_id,
+            "reformat": reformat,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "events": [],
+            "partial_response": "",
+            "result": None,
+            "error": None,
+        }
+        self.store.put(job)
+        self._pool.submit(self._run, job)
+        print(f"--- Queued analysis job {job['id']} for deal {deal_id} ---")
+        return job
+
+    def get(self, job_id):
+        """Returns the current job record, or None."""
+        return self.store.get(job_id)
+
+    def _run(self, job):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        self.store.put(job)
+
+        unsaved = {"chars": 0, "since": time.monotonic()}
+
+        def save():
+            self.store.put(job)
+            unsaved["chars"], unsaved["since"] = 0, time.monotonic()
+
+        def on_event(event, data):
+            # Streamed text is folded into one field instead of one event per chunk.
+            if event == "token":
+                text = data.get("text", "")
+                job["partial_response"] += text
+                unsaved["chars"] += len(text)
+                if (unsaved["chars"] >= self.partial_flush_chars
+                        or time.monotonic() - unsaved["since"] >= self.partial_flush_seconds):
+                    save()
+                return
+            job["events"].append({"event": event, "data": data, "at": time.time()})
+            save()
+
+        try:
+            # Background analyses yield model quota to interactive requests.
+            with llm_limiter.priority(llm_limiter.BATCH):
+                result = self.runner(
+                    deal_id=job["deal_id"],
+                    query=job["query"],
+                    conversation_id=job["conversation_id"],
+                    on_event=on_event,
+                    reformat=job.get("reformat", False),
+                )
+            if 'error' in result:
+                job["status"], job["error"] = "failed", result["error"]
+            else:
+                job["status"], job["result"] = "succeeded", result
+        except Exception as e:
+            print(f"--- Analysis job {job['id']} failed: {e} ---")
+            job["status"], job["error"] = "failed", str(e)
+        finally:
+            job["finished_at"] = time.time()
+            self.store.put(job)
+            with self._lock:
+                self._pending -= 1
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Returns the worker's shared job queue, creating it on first use."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                from app.agents.registry import get_analysis_agent
+                store_path = os.getenv("ANALYSIS_JOB_STORE_PATH")
+                _job_queue = AnalysisJobQueue(
+                    runner=lambda **kwargs: get_analysis_agent().run(**kwargs),
+                    store=SQLiteJobStore(store_path) if store_path else InMemoryJobStore(),
+                )
+    return _job_queue
@@ -1,25 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
 import uuid
+from collections import OrderedDict
 
-# Simple in-memory cache for conversation histories.
-# In a production environment, this would be replaced with a more robust
-# solution like Redis, a database, or a dedicated caching service.
-conversation_cache = {}
+# Conversation histories live behind a ConversationStore. Writes are
+# append-only: each turn is stored once, instead of rewriting the whole
+# history on every request. The backend is chosen with CONVERSATION_STORE:
+#   memory - bounded LRU + TTL store local to this worker (default)
+#   sqlite - shared by every worker on the host (CONVERSATION_STORE_PATH)
+#   redis  - shared across instances (CONVERSATION_STORE_URL); any server
+#            speaking the Redis protocol works
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "86400"))
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "100"))
+
+
+class ConversationStore:
+    """Interface for conversation history backends."""
+    def get_history(self, conversation_id):
+        """Returns the stored turns for a conversation, oldest first."""
+        raise NotImplementedError
+
+    def append_turn(self, conversation_id, turn):
+        """Appends a single {"user": ..., "ai": ...} turn to a conversation."""
+        raise NotImplementedError
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    Worker-local store. Keeps at most `max_conversations` conversations
+    (least recently used are evicted first) and `max_turns` turns each, and
+    forgets conversations idle for longer than `ttl_seconds`.
+    """
+    def __init__(self, max_conversations=1000, ttl_seconds=CONVERSATION_TTL_SECONDS,
+                 max_turns=CONVERSATION_MAX_TURNS):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_history(self, conversation_id):
+        with self._lock:
+            entry = self._conversations.get(conversation_id)
+            if entry is None:
+                return []
+            if time.monotonic() - entry["updated_at"] >= self.ttl_seconds:
+                del self._conversations[conversation_id]
+                return []
+            self._conversations.move_to_end(conversation_id)
+            return [dict(turn) for turn in entry["turns"]]
+
+    def append_turn(self, conversation_id, turn):
+        with self._lock:
+            entry = self._conversations.setdefault(conversation_id, {"turns": []})
+            entry["turns"].append(dict(turn))
+            del entry["turns"][:-self.max_turns]
+            entry["updated_at"] = time.monotonic()
+            self._conversations.move_to_end(conversation_id)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+
+    def __len__(self):
+        return len(self._conversations)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    Store backed by a SQLite file, so every gunicorn worker on the host sees
+    the same histories. Each turn is one row.
+    """
+    def __init__(self, path, ttl_seconds=CONVERSATION_TTL_SECONDS, max_turns=CONVERSATION_MAX_TURNS):
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._appends = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_turns ("
+            " conversation_id TEXT NOT NULL, seq INTEGER NOT NULL,"
+            " user TEXT, ai TEXT, created_at REAL NOT NULL,"
+            " PRIMARY KEY (conversation_id, seq))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS conversation_turns_created ON conversation_turns (created_at)")
+        self._db.commit()
+
+    def get_history(self, conversation_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT user, ai, created_at FROM conversation_turns WHERE conversation_id = ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (conversation_id, self.max_turns),
+            ).fetchall()
+        if not rows or time.time() - rows[0][2] >= self.ttl_seconds:
+            return []
+        return [{"user": user, "ai": ai} for user, ai, _ in reversed(rows)]
+
+    def append_turn(self, conversation_id, turn):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO conversation_turns (conversation_id, seq, user, ai, created_at)"
+                " SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM conversation_turns WHERE conversation_id = ?",
+                (conversation_id, turn.get("user"), turn.get("ai"), time.time(), conversation_id),
+            )
+            self._appends += 1
+            # Expired turns are purged periodically rather than on every write.
+            if self._appends % 100 == 0:
+                self._db.execute("DELETE FROM conversation_turns WHERE created_at < ?",
+                                 (time.time() - self.ttl_seconds,))
+            self._db.commit()
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Store backed by a Redis-protocol server, shared across instances. Each
+    conversation is a list of JSON-encoded turns with a sliding TTL.
+    """
+    def __init__(self, url, ttl_seconds=CONVERSATION_TTL_SECONDS, max_turns=CONVERSATION_MAX_TURNS):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CONVERSATION_STORE=redis requires the 'redis' package.") from e
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, conversation_id):
+        return f"conversation:{conversation_id}"
+
+    def get_history(self, conversation_id):
+        turns = self._client.lrange(self._key(conversation_id), -self.max_turns, -1)
+        return [json.loads(turn) for turn in turns]
+
+    def append_turn(self, conversation_id, turn):
+        key = self._key(conversation_id)
+        pipeline = self._client.pipeline()
+        pipeline.rpush(key, json.dumps(turn))
+        pipeline.ltrim(key, -self.max_turns, -1)
+        pipeline.expire(key, int(self.ttl_seconds))
+        pipeline.execute()
+
+
+def _store_from_env():
+    backend = os.getenv("CONVERSATION_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteConversationStore(os.getenv("CONVERSATION_STORE_PATH", "conversations.sqlite3"))
+    if backend == "redis":
+        return RedisConversationStore(os.getenv("CONVERSATION_STORE_URL", "redis://localhost:6379/0"))
+    return InMemoryConversationStore(
+        max_conversations=int(os.getenv("CONVERSATION_MAX_CONVERSATIONS", "1000"))
+    )
+
+
+conversation_store = _store_from_env()
 
 def get_conversation_history(conversation_id=None):
     """
     Retrieves the history for a given conversation_id.
     If no id is provided, it starts a new conversation.
     """
-    if conversation_id and conversation_id in conversation_cache:
-        return conversation_cache[conversation_id]
+    if conversation_id:
+        return conversation_store.get_history(conversation_id)
     return [] # Return an empty history for a new conversation
 
-def save_conversation_history(conversation_id, history):
+def append_conversation_turn(conversation_id, turn):
     """
-    Saves the updated history for a conversation.
+    Appends a turn to a conversation, starting a new one if no id is given.
+    Returns the conversation id.
     """
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
-    conversation_cache[conversation_id] = history
+    conversation_store.append_turn(conversation_id, turn)
     return conversation_id
-
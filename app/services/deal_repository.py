@@ -0,0 +1,170 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional Realtime Database node mapping each deal id to the push keys of
+# its records, e.g.
+#   /dealIndex/<deal id> = {"deal": "-Na1", "startup": "-Nb2", "keyMetrics": "-Nc3"}
+# When it is configured, a deal is loaded by direct key paths instead of
+# order_by_child queries.
+DEAL_INDEX_PATH = os.getenv("DEAL_INDEX_PATH")
+
+# Shared by every repository in the worker to run independent reads in parallel.
+_read_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DEAL_REPOSITORY_MAX_WORKERS", "8")),
+    thread_name_prefix="deal-repository",
+)
+
+
+class DealRepository:
+    """
+    Loads the data for a deal from the Realtime Database: the deal itself,
+    the startup it belongs to and its key metrics.
+
+    The first load of a deal queries `deals` and `keyMetrics` concurrently
+    and resolves the startup as soon as the deal arrives. The push keys it
+    finds are remembered (they never change), so later loads read all three
+    records by direct path in a single parallel round-trip. A record that did
+    not exist yet is queried for again on every load until it is found. With
+    an id-to-key index (DEAL_INDEX_PATH), even the first load avoids the
+    queries.
+    """
+    def __init__(self, db, index_path=DEAL_INDEX_PATH):
+        self.db = db
+        self.index_path = index_path
+        self._keys = {}
+        self._keys_lock = threading.Lock()
+
+    def load(self, deal_id):
+        """
+        Returns the assembled startup data for a deal, or
+        {"name": "Unknown Startup"} if the deal does not exist.
+        """
+        deal_id = str(deal_id)
+        print(f"--- Fetching data for deal_id: {deal_id} from Firebase ---")
+
+        records = None
+        keys = self.record_keys(deal_id)
+        if keys:
+            records = self._load_by_keys(deal_id, keys)
+        if records is None:
+            records = self._load_by_queries(deal_id)
+
+        deal_info, startup_info, key_metrics = records
+        if not deal_info:
+            print(f"--- No deal info found for deal_id: {deal_id} ---")
+            return { "name": "Unknown Startup" }
+
+        deal_info = dict(deal_info)
+        if startup_info:
+            startup_info = dict(startup_info)
+            # Map 'company' to 'name' for consistency with other agents.
+            if 'company' in startup_info:
+                startup_info['name'] = startup_info['company']
+            deal_info.update(startup_info)
+        if key_metrics:
+            deal_info.update(key_metrics)
+        # The startup's 'id' overwrites the deal's, so keep the deal id explicitly.
+        deal_info['dealId'] = deal_id
+
+        print(f"--- Loaded deal {deal_id}: startup={'found' if startup_info else 'none'}, "
+              f"key_metrics={'found' if key_metrics else 'none'}, {len(deal_info)} fields ---")
+        return deal_info
+
+    def record_keys(self, deal_id):
+        """
+        Returns the known push keys for a deal's records as a dict with a
+        'deal' entry and 'startup' and 'keyMetrics' entries for the records
+        found so far, or None.
+        """
+        deal_id = str(deal_id)
+        keys = self._keys.get(deal_id)
+        if keys is None and self.index_path:
+            keys = self.db.reference(f'{self.index_path}/{deal_id}').get()
+            if keys and keys.get('deal'):
+                self._remember_keys(deal_id, keys)
+            else:
+                keys = None
+        return keys
+
+    def forget(self, deal_id):
+        """Drops the remembered keys for a deal, forcing the query path next time."""
+        with self._keys_lock:
+            self._keys.pop(str(deal_id), None)
+
+    def _load_by_keys(self, deal_id, keys):
+        """
+        Reads a deal's records by direct path, all in parallel. Key metrics
+        with no known key, or whose key no longer holds this deal's metrics,
+        are queried for instead.
+        """
+        deal_future = _read_pool.submit(self.db.reference(f"deals/{keys['deal']}").get)
+        startup_future = None
+        if keys.get('startup'):
+            startup_future = _read_pool.submit(self.db.reference(f"startups/{keys['startup']}").get)
+        if keys.get('keyMetrics'):
+            metrics_future = _read_pool.submit(self._get_by_key, 'keyMetrics', keys['keyMetrics'])
+        else:
+            metrics_future = _read_pool.submit(self._query, 'keyMetrics', 'dealId', deal_id)
+
+        # The keys are stale if the deal vanished, was replaced by another
+        # deal, or now points at another startup; let the caller fall back
+        # to the query path.
+        deal_info = deal_future.result()
+        if not deal_info or str(deal_info.get('id')) != deal_id:
+            metrics_future.cancel()
+            return None
+        startup_info = startup_future.result() if startup_future else None
+        startup_id = deal_info.get('startupId')
+        if startup_id and (not startup_info or str(startup_info.get('id')) != str(startup_id)):
+            metrics_future.cancel()
+            return None
+
+        metrics_key, key_metrics = metrics_future.result()
+        if keys.get('keyMetrics') and (not key_metrics or str(key_metrics.get('dealId')) != deal_id):
+            metrics_key, key_metrics = self._query('keyMetrics', 'dealId', deal_id)
+        if metrics_key != keys.get('keyMetrics'):
+            self._remember_keys(deal_id, dict(keys, keyMetrics=metrics_key))
+        return deal_info, startup_info, key_metrics
+
+    def _get_by_key(self, collection, key):
+        """Returns (key, record) for one child read by direct path."""
+        record = self.db.reference(f"{collection}/{key}").get()
+        return (key, record) if record else (None, None)
+
+    def _load_by_queries(self, deal_id):
+        """
+        Finds a deal's records with order_by_child queries. The deal and its
+        key metrics are queried concurrently; the startup follows the deal.
+        """
+        deal_future = _read_pool.submit(self._query, 'deals', 'id', deal_id)
+        metrics_future = _read_pool.submit(self._query, 'keyMetrics', 'dealId', deal_id)
+
+        deal_key, deal_info = deal_future.result()
+        if not deal_info:
+            metrics_future.cancel()
+            return None, None, None
+
+        startup_key, startup_info = None, None
+        startup_id = deal_info.get('startupId')
+        if startup_id:
+            startup_key, startup_info = self._query('startups', 'id', str(startup_id))
+
+        metrics_key, key_metrics = metrics_future.result()
+        self._remember_keys(deal_id, {'deal': deal_key, 'startup': startup_key, 'keyMetrics': metrics_key})
+        return deal_info, startup_info, key_metrics
+
+    def _query(self, collection, field, value):
+        """Returns (key, record) for the first child whose `field` equals `value`."""
+        # Without an .indexOn rule for `field` this is a server-side scan,
+        # which is why it only runs the first time a deal is loaded.
+        matches = self.db.reference(collection).order_by_child(field).equal_to(str(value)).get()
+        if not matches:
+            return None, None
+        return next(iter(matches.items()))
+
+    def _remember_keys(self, deal_id, keys):
+        # Records that were not found are left out, so they are looked up
+        # again instead of being skipped for good.
+        with self._keys_lock:
+            self._keys[str(deal_id)] = {name: key for name, key in keys.items() if key}
@@ -0,0 +1,157 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class DealSnapshotCache:
+    """
+    Per-worker read-through cache of assembled `startup_data`, keyed by deal id.
+
+    Entries expire after `ttl_seconds`, the cache holds at most `max_entries`
+    deals (least recently used are evicted first), and callers always get a
+    private copy they are free to mutate. An entry is dropped early by
+    invalidate(), or, when `listen` is on, as soon as a Realtime Database
+    listener reports a change to the deal, startup or keyMetrics node it
+    was built from. `forget`, if given, is called with the deal id on an
+    explicit invalidate so the loader also drops what it remembers about
+    where the deal's records live.
+    """
+    def __init__(self, loader, max_entries=256, ttl_seconds=300, listen=False, db=None, keys_for=None,
+                 forget=None):
+        self.loader = loader
+        self.forget = forget
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.listen = listen and db is not None and keys_for is not None
+        self.db = db
+        self.keys_for = keys_for
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @classmethod
+    def from_env(cls, repository):
+        """Builds a cache in front of a DealRepository from DEAL_CACHE_* variables."""
+        return cls(
+            loader=repository.load,
+            max_entries=int(os.getenv("DEAL_CACHE_MAX_ENTRIES", "256")),
+            ttl_seconds=float(os.getenv("DEAL_CACHE_TTL_SECONDS", "300")),
+            listen=os.getenv("DEAL_CACHE_LISTEN", "false").lower() == "true",
+            db=repository.db,
+            keys_for=repository.record_keys,
+            forget=repository.forget,
+        )
+
+    def get(self, deal_id):
+        """Returns a copy of the deal's startup data, loading it on a miss."""
+        deal_id = str(deal_id)
+        with self._lock:
+            entry = self._entries.get(deal_id)
+            if entry and time.monotonic() - entry["loaded_at"] < self.ttl_seconds:
+                self._entries.move_to_end(deal_id)
+                self._stats["hits"] += 1
+                return copy.deepcopy(entry["data"])
+            if entry:
+                self._drop(deal_id)
+            self._stats["misses"] += 1
+            generation = self._generations.get(deal_id, 0)
+
+        data = self.loader(deal_id)
+        if data.get("name") == "Unknown Startup":
+            return data
+
+        registrations = self._listen_for_changes(deal_id) if self.listen else []
+        with self._lock:
+            # Only store the snapshot if nothing invalidated the deal while it
+            # was being loaded; otherwise it may already be stale.
+            if self._generations.get(deal_id, 0) == generation:
+                if deal_id in self._entries:
+                    self._drop(deal_id)
+                self._entries[deal_id] = {
+                    "data": data,
+                    "loaded_at": time.monotonic(),
+                    "registrations": registrations,
+                }
+                registrations = []
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+        _close_registrations(registrations)
+        return copy.deepcopy(data)
+
+    def invalidate(self, deal_id, forget_keys=True):
+        """
+        Drops the cached snapshot for a deal and, with `forget_keys`, the
+        loader's remembered record keys, so the next load finds the records
+        afresh.
+        """
+        deal_id = str(deal_id)
+        if forget_keys and self.forget is not None:
+            self.forget(deal_id)
+        with self._lock:
+            self._generations[deal_id] = self._generations.get(deal_id, 0) + 1
+            if deal_id in self._entries:
+                self._drop(deal_id)
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drops every cached snapshot."""
+        with self._lock:
+            for deal_id in list(self._entries):
+                self._generations[deal_id] = self._generations.get(deal_id, 0) + 1
+                self._drop(deal_id)
+
+    def stats(self):
+        """Returns hit/miss/invalidation counters and the number of cached deals."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def _drop(self, deal_id):
+        # Must be called with the lock held.
+        entry = self._entries.pop(deal_id)
+        _close_registrations(entry["registrations"])
+
+    def _listen_for_changes(self, deal_id):
+        """Registers listeners on the nodes the snapshot was assembled from."""
+        keys = self.keys_for(deal_id) or {}
+        paths = [
+            f"{collection}/{keys[name]}"
+            for name, collection in (("deal", "deals"), ("startup", "startups"), ("keyMetrics", "keyMetrics"))
+            if keys.get(name)
+        ]
+        registrations = []
+        for path in paths:
+            try:
+                registrations.append(self.db.reference(path).listen(self._change_callback(deal_id)))
+            except Exception as e:
+                print(f"--- Could not listen on {path}, relying on TTL for deal {deal_id}: {e} ---")
+        return registrations
+
+    def _change_callback(self, deal_id):
+        # A listener fires once with the current data when it connects (and
+        # again after every reconnect); the first event is that snapshot.
+        seen_initial = threading.Event()
+
+        def on_change(event):
+            if not seen_initial.is_set():
+                seen_initial.set()
+                return
+            print(f"--- Deal {deal_id} changed at {event.path}; invalidating cached snapshot ---")
+            # A change inside a record does not move it, so its key still holds.
+            self.invalidate(deal_id, forget_keys=False)
+        return on_change
+
+
+def _close_registrations(registrations):
+    """
+    Stops listeners in the background. ListenerRegistration.close() joins
+    the listener's thread, so it cannot run inside that listener's callback.
+    """
+    if registrations:
+        threading.Thread(
+            target=lambda: [registration.close() for registration in registrations],
+            name="deal-cache-listener-close",
+            daemon=True,
+        ).start()
@@ -1,5 +1,5 @@
 import json
-from app.agents.communication_agent import CommunicationAgent
+from app.agents.registry import get_agent
 
 def handle_webhook_request(data):
     """
@@ -35,7 +35,7 @@ def handle_webhook_request(data):
             else:
                 # Integration with the actual CommunicationAgent
                 print(f"--- Calling CommunicationAgent for email to {recipient} ---")
-                agent = CommunicationAgent()
+                agent = get_agent("communication")
                 agent_response_json = agent.run(recipient=recipient, subject=subject, body=body)
                 agent_response = json.loads(agent_response_json)
                 response_text = agent_response.get("message", "An error occurred while sending the email.")
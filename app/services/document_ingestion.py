@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.services.embedding_service import embed_texts
+from app.tools import vector_search
+from app.tools.vector_index import VectorIndex
+
+# Ingestion of deal documents into the vector_search index. Documents come
+# from a local directory laid out as <root>/<deal id>/<file> and/or from the
+# Realtime Database `documents` node ({"dealId", "name", "pages" or "text"}).
+# Each document is split into page-tagged chunks, embedded in batches and
+# upserted into the index. A manifest of content hashes, saved next to the
+# index, makes re-ingesting an unchanged document a no-op and records each
+# document's chunk ids so they can be removed when it changes or is deleted.
+INGEST_CHUNK_CHARS = int(os.getenv("INGEST_CHUNK_CHARS", "2000"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "200"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+MANIFEST_FILENAME = "ingestion_manifest.json"
+PAGE_BREAK = "\f"
+
+# (keyword in the document name, document_type), first match wins.
+DOCUMENT_TYPES = [
+    ("deck", "pitch_deck"),
+    ("pitch", "pitch_deck"),
+    ("transcript", "call_transcript"),
+    ("call", "call_transcript"),
+    ("financ", "financials"),
+    ("model", "financials"),
+    ("market", "market_research"),
+    ("research", "market_research"),
+]
+
+
+def content_hash(pages):
+    """Returns a stable hash of a document's page texts."""
+    digest = hashlib.sha256()
+    for page in pages:
+        digest.update(page.encode("utf-8"))
+        digest.update(PAGE_BREAK.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def chunk_pages(pages, max_chars=INGEST_CHUNK_CHARS, overlap=INGEST_CHUNK_OVERLAP):
+    """
+    Yields (page number, text) chunks. Chunks never span pages, so every
+    chunk can be cited by page; long pages are split on whitespace with
+    `overlap` characters repeated between neighbouring chunks.
+    """
+    for page_number, page in enumerate(pages, start=1):
+        text = " ".join(page.split())
+        start = 0
+        while start < len(text):
+            end = min(start + max_chars, len(text))
+            if end < len(text):
+                space = text.rfind(" ", start + max_chars // 2, end)
+                end = space if space > start else end
+            yield page_number, text[start:end]
+            if end >= len(text):
+                break
+            start = max(end - overlap, start + 1)
+
+
+def document_type(name):
+    """Infers a document's type from its name, e.g. 'Pitch Deck v3.pdf' -> 'pitch_deck'."""
+    name = name.lower()
+    for keyword, doc_type in DOCUMENT_TYPES:
+        if keyword in name:
+            return doc_type
+    return "other"
+
+
+def _read_pdf_pages(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Ingesting PDF documents requires the 'pypdf' package.") from e
+    return [page.extract_text() or "" for page in PdfReader(path).pages]
+
+
+def iter_directory_documents(root, deal_ids=None):
+    """
+    Yields documents from <root>/<deal id>/<file>. Text and markdown files
+    are split into pages on form feeds; PDFs are read page by page.
+    """
+    if not os.path.isdir(root):
+        return
+    for deal_id in sorted(deal_ids or os.listdir(root)):
+        deal_dir = os.path.join(root, str(deal_id))
+        if not os.path.isdir(deal_dir):
+            continue
+        for name in sorted(os.listdir(deal_dir)):
+            path = os.path.join(deal_dir, name)
+            extension = os.path.splitext(name)[1].lower()
+            if extension == ".pdf":
+                pages = _read_pdf_pages(path)
+            elif extension in (".txt", ".md"):
+                with open(path, encoding="utf-8") as f:
+                    pages = f.read().split(PAGE_BREAK)
+            else:
+                continue
+            yield {"deal_id": str(deal_id), "name": name, "pages": pages, "source": "directory"}
+
+
+def iter_database_documents(db, deal_ids=None, path="documents"):
+    """Yields documents stored under the Realtime Database `documents` node."""
+    if deal_ids:
+        records = {}
+        for deal_id in deal_ids:
+            records.update(db.reference(path).order_by_child("dealId").equal_to(str(deal_id)).get() or {})
+    else:
+        records = db.reference(path).get() or {}
+
+    for key, record in records.items():
+        if not isinstance(record, dict) or not record.get("dealId"):
+            continue
+        pages = record.get("pages") or str(record.get("text", "")).split(PAGE_BREAK)
+        yield {
+            "deal_id": str(record["dealId"]),
+            "name": record.get("name", key),
+            "startup_id": record.get("startupId"),
+            "document_type": record.get("type"),
+            "pages": [str(page) for page in pages],
+            "source": "database",
+        }
+
+
+class DocumentIngestor:
+    """
+    Chunks, embeds and indexes documents. Embedding batches are sent on a
+    small thread pool so that chunking and network round-trips overlap;
+    at most `embed_workers` batches are in flight at once.
+    """
+    def __init__(self, index_dir=None, embed=embed_texts, chunk_chars=INGEST_CHUNK_CHARS,
+                 chunk_overlap=INGEST_CHUNK_OVERLAP, batch_size=INGEST_BATCH_SIZE,
+                 embed_workers=INGEST_EMBED_WORKERS):
+        self.index_dir = index_dir or vector_search.VECTOR_INDEX_DIR
+        self.embed = embed
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.embed_workers = embed_workers
+        self._lock = threading.Lock()
+
+    def _load_manifest(self):
+        path = os.path.join(self.index_dir, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        path = os.path.join(self.index_dir, MANIFEST_FILENAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def _load_index(self):
+        if os.path.exists(os.path.join(self.index_dir, "manifest.json")):
+            return VectorIndex.load(self.index_dir, mmap=False)
+        return None
+
+    def ingest(self, documents, sync_sources=(), deal_ids=None):
+        """
+        Ingests an iterable of documents and returns throughput statistics.
+        Unchanged documents are skipped; changed ones have their old chunks
+        replaced. For each source in `sync_sources` (e.g. "directory") that
+        was read in full, documents it no longer has, limited to `deal_ids`
+        if given, are removed from the index.
+        """
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            # Embedded vectors are appended to a scratch file as each batch
+            # comes back, so memory holds only the batches in flight rather
+            # than every new vector until the end of the run.
+            with tempfile.TemporaryFile(dir=self.index_dir, suffix=".vectors") as spill:
+                return self._ingest(documents, spill, set(sync_sources), deal_ids)
+
+    def _ingest(self, documents, spill, sync_sources, deal_ids):
+        started = time.perf_counter()
+        manifest = self._load_manifest()
+        index = self._load_index()
+        chunking = [self.chunk_chars, self.chunk_overlap]
+        stats = {"documents": 0, "documents_skipped": 0, "documents_removed": 0, "chunks": 0,
+                 "stale_chunks_removed": 0}
+        new_ids, new_metadata, stale_ids, seen = [], [], set(), set()
+        batch_ids, batch_metadata = [], []
+        in_flight = deque()
+        dimension = None
+
+        def collect(future, ids, metadata):
+            nonlocal dimension
+            vectors = np.asarray(future.result(), dtype=np.float32)
+            dimension = vectors.shape[1]
+            spill.write(vectors.tobytes())
+            new_ids.extend(ids)
+            new_metadata.extend(metadata)
+
+        with ThreadPoolExecutor(max_workers=self.embed_workers, thread_name_prefix="ingest-embed") as pool:
+            def flush():
+                if not batch_ids:
+                    return
+                texts = [metadata["text"] for metadata in batch_metadata]
+                in_flight.append((pool.submit(self.embed, texts), list(batch_ids), list(batch_metadata)))
+                batch_ids.clear()
+                batch_metadata.clear()
+                while len(in_flight) >= self.embed_workers:
+                    collect(*in_flight.popleft())
+
+            for document in documents:
+                stats["documents"] += 1
+                document_key = f"{document['deal_id']}/{document['name']}"
+                seen.add(document_key)
+                digest = content_hash(document["pages"])
+                previous = manifest.get(document_key)
+                if (previous and previous["content_hash"] == digest
+                        and previous.get("chunking", chunking) == chunking):
+                    stats["documents_skipped"] += 1
+                    previous.setdefault("deal_id", document["deal_id"])
+                    previous.setdefault("source", document.get("source"))
+                    continue
+                if previous:
+                    # Also covers a document seen earlier in this run, whose
+                    # chunks are still in the scratch file.
+                    stale_ids.update(previous["chunk_ids"])
+
+                # Ids change with the content and chunking, so a re-ingested
+                # document never collides with its own stale chunks.
+                id_prefix = hashlib.sha256(
+                    f"{document_key}:{digest}:{self.chunk_chars}:{self.chunk_overlap}".encode("utf-8")).hexdigest()[:16]
+                chunk_ids = []
+                for chunk_number, (page, text) in enumerate(
+                        chunk_pages(document["pages"], self.chunk_chars, self.chunk_overlap)):
+                    chunk_id = f"{document['deal_id']}:{id_prefix}:{chunk_number}"
+                    chunk_ids.append(chunk_id)
+                    batch_ids.append(chunk_id)
+                    batch_metadata.append({
+                        "text": text,
+                        "deal_id": document["deal_id"],
+                        "startup_id": document.get("startup_id"),
+                        "document_type": document.get("document_type") or document_type(document["name"]),
+                        "document": document["name"],
+                        "page": page,
+                        "source": document.get("source"),
+                    })
+                    if len(batch_ids) >= self.batch_size:
+                        flush()
+                manifest[document_key] = {"content_hash": digest, "chunking": chunking, "chunk_ids": chunk_ids,
+                                          "deal_id": document["deal_id"], "source": document.get("source")}
+                stats["chunks"] += len(chunk_ids)
+
+            flush()
+            while in_flight:
+                collect(*in_flight.popleft())
+
+        wanted_deals = {str(deal_id) for deal_id in deal_ids} if deal_ids else None
+        for document_key, entry in list(manifest.items()):
+            if (document_key not in seen and entry.get("source") in sync_sources
+                    and (wanted_deals is None or entry.get("deal_id") in wanted_deals)):
+                stale_ids.update(entry["chunk_ids"])
+                del manifest[document_key]
+                stats["documents_removed"] += 1
+
+        if index is None and new_ids:
+            index = VectorIndex(dimension)
+        if index is not None and (new_ids or stale_ids):
+            index.delete(stale_ids)
+            if new_ids:
+                spill.flush()
+                vectors = np.memmap(spill, dtype=np.float32, mode="r", shape=(len(new_ids), dimension))
+                keep = [row for row, chunk_id in enumerate(new_ids) if chunk_id not in stale_ids]
+                if len(keep) < len(new_ids):
+                    vectors = vectors[keep]
+                    new_ids = [new_ids[row] for row in keep]
+                    new_metadata = [new_metadata[row] for row in keep]
+                if new_ids:
+                    index.upsert(new_ids, vectors, new_metadata)
+            index.ensure_partitions()
+            index.save(self.index_dir)
+            self._save_manifest(manifest)
+            vector_search.set_index(VectorIndex.load(self.index_dir), vector_search.saved_index_version(self.index_dir))
+            stats["stale_chunks_removed"] = len(stale_ids)
+        elif stats["documents_removed"]:
+            self._save_manifest(manifest)
+
+        stats["elapsed_seconds"] = time.perf_counter() - started
+        stats["chunks_per_second"] = stats["chunks"] / stats["elapsed_seconds"] if stats["elapsed_seconds"] else 0.0
+        stats["index_size"] = len(index) if index is not None else 0
+        print(f"--- Ingested {stats['chunks']} chunks from {stats['documents'] - stats['documents_skipped']} "
+              f"documents ({stats['documents_skipped']} unchanged) in {stats['elapsed_seconds']:.2f}s, "
+              f"{stats['chunks_per_second']:.1f} chunks/sec ---")
+        return stats
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+import google.generativeai as genai
+from app.services.llm_clients import configure_api_key
+
+# Shared embedding service for retrieval and routing. Texts are embedded in
+# batches, and vectors are memoized by content hash in an in-memory LRU and
+# an optional SQLite store (float16, half the size of float32), so a chunk
+# or query is embedded at most once. The backend is chosen with
+# EMBEDDING_BACKEND:
+#   gemini - the Gemini embedding model (EMBEDDING_MODEL, default)
+#   hash   - deterministic local feature hashing; no network, for tests and
+#            benchmarks
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+# The Gemini API accepts at most 100 texts per batch request.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class GeminiEmbeddingBackend:
+    """Embeds texts with the Gemini embedding model."""
+    def __init__(self, model=EMBEDDING_MODEL):
+        self.model = model
+        self.name = f"gemini:{model}"
+
+    def __call__(self, texts, task_type):
+        if not configure_api_key():
+            raise RuntimeError("GOOGLE_API_KEY is not set; cannot compute embeddings.")
+        result = genai.embed_content(model=self.model, content=list(texts), task_type=task_type)
+        return result["embedding"]
+
+
+class HashEmbeddingBackend:
+    """
+    Deterministic feature-hashing embeddings over words and character
+    trigrams. Similar wording gives similar vectors, but there is no notion
+    of meaning, so it stands in for the real model only offline.
+    """
+    def __init__(self, dimension=256):
+        self.dimension = dimension
+        self.name = f"hash:{dimension}"
+
+    def __call__(self, texts, task_type):
+        return [self._embed(text) for text in texts]
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        lowered = text.lower()
+        features = _WORD_PATTERN.findall(lowered) + [lowered[i:i + 3] for i in range(len(lowered) - 2)]
+        for feature in features:
+            bucket = zlib.crc32(feature.encode("utf-8"))
+            vector[bucket % self.dimension] += 1.0 if bucket & 0x80000000 else -1.0
+        return vector
+
+
+class EmbeddingService:
+    """
+    Embeds texts through a backend, batching the misses of each call and
+    caching vectors by (backend, task type, text) hash in two tiers: a
+    bounded in-memory LRU and an optional SQLite file shared by every
+    worker on the host.
+    """
+    def __init__(self, backend, max_entries=4096, sqlite_path=None, batch_size=EMBEDDING_BATCH_SIZE):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "backend_calls": 0}
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Builds the service from EMBEDDING_* environment variables."""
+        if os.getenv("EMBEDDING_BACKEND", "gemini").lower() == "hash":
+            backend = HashEmbeddingBackend(int(os.getenv("EMBEDDING_HASH_DIMENSION", "256")))
+        else:
+            backend = GeminiEmbeddingBackend()
+        return cls(
+            backend,
+            max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "4096")),
+            sqlite_path=os.getenv("EMBEDDING_CACHE_SQLITE_PATH") or None,
+        )
+
+    def _key(self, text, task_type):
+        payload = f"{self.backend.name}\0{task_type}\0{text}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def embed(self, texts, task_type="retrieval_document"):
+        """Returns a float32 matrix with one row per text."""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [self._key(text, task_type) for text in texts]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    vectors[key] = vector
+                    self._stats["memory_hits"] += 1
+            if self._db is not None:
+                missing = list({key for key in keys if key not in vectors})
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vectors[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                        self._put_memory(key, vectors[key])
+                        self._stats["disk_hits"] += 1
+
+        # Duplicate texts in one call are embedded once.
+        misses = OrderedDict((key, text) for key, text in zip(keys, texts) if key not in vectors)
+        if misses:
+            self._embed_misses(misses, task_type, vectors)
+        return np.stack([vectors[key] for key in keys])
+
+    def _embed_misses(self, misses, task_type, vectors):
+        items = list(misses.items())
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            embedded = self.backend([text for _, text in batch], task_type)
+            with self._lock:
+                self._stats["backend_calls"] += 1
+                self._stats["misses"] += len(batch)
+                for (key, _), vector in zip(batch, embedded):
+                    vectors[key] = np.asarray(vector, dtype=np.float32)
+                    self._put_memory(key, vectors[key])
+                if self._db is not None:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vectors[key].astype(np.float16).tobytes()) for key, _ in batch],
+                    )
+                    self._db.commit()
+
+    def embed_query(self, text):
+        """Embeds a single search query."""
+        return self.embed([text], task_type="retrieval_query")[0]
+
+    def _put_memory(self, key, vector):
+        # Cached vectors are shared between callers, so make them read-only.
+        vector.flags.writeable = False
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """Returns hit/miss counters and the current memory tier size."""
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
+
+
+# Shared by retrieval, ingestion and routing in the worker.
+embedding_service = EmbeddingService.from_env()
+
+
+def embed_texts(texts, task_type="retrieval_document"):
+    """Embeds a list of texts and returns a float32 matrix, one row per text."""
+    return embedding_service.embed(texts, task_type=task_type)
+
+
+def embed_query(text):
+    """Embeds a single search query."""
+    return embedding_service.embed_query(text)
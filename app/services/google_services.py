@@ -4,8 +4,8 @@ import json
 from dotenv import load_dotenv
 
 # --- Service Clients ---
-# These are initialized by initialize_services()
-generative_model = None
+# These are initialized by initialize_services(). Gemini clients are built
+# on first use by app.services.llm_clients, one per model the policy uses.
 realtime_db = None
 
 def initialize_services():
@@ -14,7 +14,7 @@ def initialize_services():
     - In a GCP environment, it loads config from Secret Manager.
     - For local development, it loads config from a .env file.
     """
-    global generative_model, realtime_db
+    global realtime_db
 
     # --- 1. Load Configuration ---
     project_id_number = os.environ.get("GOOGLE_CLOUD_PROJECT_NUMBER")
@@ -81,14 +81,7 @@ def initialize_services():
         print(f"CRITICAL: Failed to initialize Firebase Admin SDK: {e}")
         raise SystemExit(f"Could not initialize Firebase: {e}")
 
-    # Configure Google Generative AI client
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if api_key:
-        import google.generativeai as genai
-        genai.configure(api_key=api_key)
-        generative_model = genai.GenerativeModel('gemini-1.5-flash-latest')
-        print("Google Generative AI client configured successfully.")
-    else:
+    if not os.environ.get("GOOGLE_API_KEY"):
         print("Warning: GOOGLE_API_KEY not found. LLM calls will fail.")
 
 # --- Run Initialization --- 
@@ -0,0 +1,332 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+
+# Tiered local router. Obvious queries are routed by keyword rules, the rest
+# by a TF-IDF nearest-neighbour classifier over the labelled examples below.
+# Only when neither is confident does the orchestrator pay for an LLM call.
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.3"))
+# "tfidf" (default) or "embedding", which classifies with embeddings from the
+# shared embedding service at the cost of one cached embedding call per query.
+INTENT_ROUTER_CLASSIFIER = os.getenv("INTENT_ROUTER_CLASSIFIER", "tfidf").lower()
+
+# Rules only fire on requests phrased as instructions to run something
+# ("write the deal memo", "run a risk assessment"), never on a topic noun
+# alone, since "what does the deal memo say about churn?" is a question
+# about the data, not a request for a new memo.
+# (pattern, action). The first matching rule wins, so more specific intents
+# come before broader ones.
+RULES = [
+    (r"\b(save|remember|update|change) (my|these|the) (deal[- ]?notes? )?preferences?\b|"
+     r"\b(always|never) (include|put|add|start with|use)\b.*\bdeal[- ]?notes?\b|"
+     r"\b(change|update|set|switch) (the |my )?deal[- ]?notes?( format| style| template)?\b.*\bto\b|"
+     r"\bi (prefer|want|like) (shorter|longer|briefer|more detailed)? ?deal[- ]?notes?\b|"
+     r"\bfor (all )?future deals\b", "save_deal_note_preferences"),
+    (r"^(please )?(send|draft|write|compose) (an |a )?(e-?mail|mail|note) to\b|^(please )?e-?mail the founders?\b|"
+     r"^(please )?(ask|reach out to|follow up with) the founders?\b", "send_email"),
+    (r"\b(run|do|give me|perform|prepare|generate|start) (me )?(a |an |the )?(full|complete|comprehensive|"
+     r"end[- ]to[- ]end|entire|overall) (analysis|assessment|evaluation|review|diligence)\b|"
+     r"^(please )?analy[sz]e (this|the) (startup|company|deal)\b|\brun (all|every) (the )?agents\b", "run_all_agents"),
+    (r"\b(run|write|draft|prepare|generate|create|produce|give me|put together) (me )?(a |an |the )?(new )?"
+     r"(deal|investment|ic) memo\b", "run_specific_agent:deal_memo"),
+    (r"^(please )?(analy[sz]e|check|review|research|scan|look (up|at|into)|check for)\b.*"
+     r"\b(linkedin|twitter|digital footprint|online presence|social media|web presence)\b",
+     "run_specific_agent:digital_footprint"),
+    (r"^(please )?(check|assess|evaluate|analy[sz]e|run|score)\b.*\b(portfolio|thesis|mandate)\b.*\bfit\b|"
+     r"^(please )?(check|assess|evaluate|analy[sz]e|run|score)\b.*\bfit\b.*\b(portfolio|thesis|mandate)\b",
+     "run_specific_agent:portfolio_fit"),
+    (r"^(please )?(run (a |the )?benchmark\w*|benchmark (them|it|the startup|this startup|the company)|"
+     r"compare (them|it|the startup) (to|with|against) (its )?(competitors|peers))\b", "run_specific_agent:benchmarking"),
+    (r"\b(run|do|perform|prepare|generate|give me) (me )?(a |an |the )?(risk|compliance|regulatory)"
+     r"( and compliance)? (analysis|assessment|review|report|check)\b", "run_specific_agent:risk_and_compliance"),
+    # TAM/SAM/SOM only count in capitals or next to market-sizing words, so
+    # questions about a founder called Sam are not sent to market research.
+    (r"^(please )?(run|do|perform|research|analy[sz]e|size|estimate|calculate)\b.*"
+     r"\b(market (research|size|sizing|analysis|trends?|opportunity)|industry (trends?|outlook)|(?-i:TAM|SAM|SOM)|"
+     r"total addressable market)\b", "run_specific_agent:market_research"),
+]
+
+# Topic words that suggest an action without asking for it. A topic hit is
+# never enough to route on its own: it only adds TOPIC_CONFIDENCE to the
+# classifier's confidence when the classifier picks the same action, and
+# otherwise the classifier or the LLM decides.
+TOPIC_CONFIDENCE = float(os.getenv("INTENT_ROUTER_TOPIC_CONFIDENCE", "0.15"))
+TOPICS = [
+    (r"\b(deal|investment|ic) memo\b", "run_specific_agent:deal_memo"),
+    (r"\b(linkedin|twitter|digital footprint|online presence|social media|web presence)\b",
+     "run_specific_agent:digital_footprint"),
+    (r"\bportfolio\b.*\bfit\b|\bfit\b.*\b(portfolio|thesis|mandate)\b", "run_specific_agent:portfolio_fit"),
+    (r"\b(benchmark\w*|competitors?|competition|peers)\b", "run_specific_agent:benchmarking"),
+    (r"\b(risks?|compliance|regulatory|regulation)\b", "run_specific_agent:risk_and_compliance"),
+    (r"\b(market (research|size|sizing|analysis|trends?)|industry (trends?|outlook))|\b(?-i:TAM|SAM|SOM)\b|"
+     r"\b(tam|sam|som)\b.*\b(addressable|serviceable|obtainable)\b|"
+     r"\b(addressable|serviceable|obtainable)\b.*\b(tam|sam|som)\b", "run_specific_agent:market_research"),
+]
+
+# The orchestrator's confirmation message for a drafted email.
+EMAIL_DRAFT_MARKER = "I have drafted the following email"
+# Without a draft to refer to, send_email is only chosen for queries that
+# say what to email and to whom.
+_EXPLICIT_EMAIL = re.compile(r"\b(e-?mail|mail|founders?|ceo|cto)\b|@", re.IGNORECASE)
+
+LABELLED_EXAMPLES = [
+    # direct_answer: facts that live in the startup data / document summaries
+    ("what is their arr", "direct_answer"),
+    ("what's the current monthly recurring revenue", "direct_answer"),
+    ("how much have they raised so far", "direct_answer"),
+    ("what is the funding goal", "direct_answer"),
+    ("what is the burn rate", "direct_answer"),
+    ("how many months of runway do they have", "direct_answer"),
+    ("who are the founders", "direct_answer"),
+    ("where is the company located", "direct_answer"),
+    ("what stage is the company at", "direct_answer"),
+    ("what does the company do", "direct_answer"),
+    ("what sector are they in", "direct_answer"),
+    ("what is the valuation", "direct_answer"),
+    ("how many customers do they have", "direct_answer"),
+    ("what does the pitch deck say about pricing", "direct_answer"),
+    ("what is their churn", "direct_answer"),
+    ("what is the gross margin", "direct_answer"),
+    ("how many employees does the startup have", "direct_answer"),
+    ("what is the company name", "direct_answer"),
+    ("summarize the pitch deck", "direct_answer"),
+    ("what are the use of funds", "direct_answer"),
+    # ...including questions that mention a specialist's topic
+    ("what does the memo say about the team", "direct_answer"),
+    ("do they hold any licenses or certifications", "direct_answer"),
+    ("which compliance certificates are in the documents", "direct_answer"),
+    ("how much do they spend on marketing and social media", "direct_answer"),
+    ("what market size figure does the deck quote", "direct_answer"),
+    ("is there a risk section in the pitch deck", "direct_answer"),
+    ("what documents are in the data room", "direct_answer"),
+    # chat: follow-ups that lean on the conversation
+    ("tell me more about that", "chat"),
+    ("can you elaborate on the second point", "chat"),
+    ("why do you say that", "chat"),
+    ("what did you mean by that", "chat"),
+    ("can you explain that in simpler terms", "chat"),
+    ("expand on the weaknesses you mentioned", "chat"),
+    ("and what about the team", "chat"),
+    ("thanks, that helps", "chat"),
+    ("go on", "chat"),
+    ("how confident are you in that recommendation", "chat"),
+    ("shorten your previous answer", "chat"),
+    ("what was the first point again", "chat"),
+    ("summarize what we have discussed so far", "chat"),
+    ("recap our conversation", "chat"),
+    # run_all_agents
+    ("give me a full analysis of this startup", "run_all_agents"),
+    ("should we invest in this company", "run_all_agents"),
+    ("what is your overall investment recommendation", "run_all_agents"),
+    ("do a complete due diligence", "run_all_agents"),
+    ("evaluate this deal for the investment committee", "run_all_agents"),
+    ("is this a good investment", "run_all_agents"),
+    ("give me the big picture on this startup", "run_all_agents"),
+    # specialists
+    ("write the deal memo", "run_specific_agent:deal_memo"),
+    ("prepare an investment memo for the committee", "run_specific_agent:deal_memo"),
+    ("draft an ic memo", "run_specific_agent:deal_memo"),
+    ("who are the main competitors", "run_specific_agent:benchmarking"),
+    ("how do they stack up against competitors", "run_specific_agent:benchmarking"),
+    ("compare them with their peers", "run_specific_agent:benchmarking"),
+    ("analyze the competition", "run_specific_agent:benchmarking"),
+    ("what are the key risks", "run_specific_agent:risk_and_compliance"),
+    ("are there any ip or patent risks", "run_specific_agent:risk_and_compliance"),
+    ("what regulatory hurdles do they face", "run_specific_agent:risk_and_compliance"),
+    ("is there key person dependency", "run_specific_agent:risk_and_compliance"),
+    ("how big is the market", "run_specific_agent:market_research"),
+    ("what are the market trends in this sector", "run_specific_agent:market_research"),
+    ("research the market opportunity", "run_specific_agent:market_research"),
+    ("what is the total addressable market", "run_specific_agent:market_research"),
+    ("does this fit our portfolio", "run_specific_agent:portfolio_fit"),
+    ("how well does it align with our investment thesis", "run_specific_agent:portfolio_fit"),
+    ("is this a good fit for our fund", "run_specific_agent:portfolio_fit"),
+    ("check for linkedin updates", "run_specific_agent:digital_footprint"),
+    ("what is the founders online presence like", "run_specific_agent:digital_footprint"),
+    ("analyze their website and social media", "run_specific_agent:digital_footprint"),
+    ("what do people say about the founders online", "run_specific_agent:digital_footprint"),
+    # send_email
+    ("send an email to the founder asking for the pitch deck", "send_email"),
+    ("ask the founder for their financial model", "send_email"),
+    ("we need more information from the founder about churn", "send_email"),
+    ("request the cap table from the founders", "send_email"),
+    ("email them to ask for customer references", "send_email"),
+    ("follow up with the founder on the missing documents", "send_email"),
+    # save_deal_note_preferences
+    ("always include a risks section in my deal notes", "save_deal_note_preferences"),
+    ("i prefer shorter deal notes", "save_deal_note_preferences"),
+    ("change the deal note format to bullet points", "save_deal_note_preferences"),
+    ("remember to put the recommendation first in deal notes", "save_deal_note_preferences"),
+    ("save my preferences for deal notes", "save_deal_note_preferences"),
+]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was were be been of to in on for and or with this that these those it its "
+    "their they them do does did me my we our us you your i can could please".split()
+)
+
+
+def _tokenize(text):
+    words = [word for word in _TOKEN_PATTERN.findall(text.lower()) if word not in _STOPWORDS]
+    # Word bigrams capture short phrases like "deal memo" or "key risks".
+    return words + [f"{first}_{second}" for first, second in zip(words, words[1:])]
+
+
+def _has_email_draft(history):
+    return any(EMAIL_DRAFT_MARKER in (turn.get("ai") or "") for turn in history)
+
+
+class RouteDecision:
+    """The action chosen by the local router and how it was chosen."""
+    def __init__(self, action, confidence, tier):
+        self.action = action
+        self.confidence = confidence
+        self.tier = tier
+
+    def __repr__(self):
+        return f"RouteDecision({self.action!r}, confidence={self.confidence:.2f}, tier={self.tier!r})"
+
+
+class TfidfNearestNeighbourClassifier:
+    """
+    Cosine k-nearest-neighbour over TF-IDF vectors of labelled examples.
+    Confidence is the similarity-weighted vote share of the winning label,
+    scaled by how close the best example is.
+    """
+    def __init__(self, examples, k=5):
+        self.k = k
+        documents = [Counter(_tokenize(text)) for text, _ in examples]
+        document_frequency = Counter(term for document in documents for term in document)
+        self.idf = {
+            term: math.log((1 + len(documents)) / (1 + count)) + 1
+            for term, count in document_frequency.items()
+        }
+        self.labels = [label for _, label in examples]
+        self.vectors = [self._vectorize(document) for document in documents]
+        # Inverted index so a query only scores examples sharing a term.
+        self.postings = defaultdict(list)
+        for index, vector in enumerate(self.vectors):
+            for term in vector:
+                self.postings[term].append(index)
+
+    def _vectorize(self, term_counts):
+        vector = {term: count * self.idf[term] for term, count in term_counts.items() if term in self.idf}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def predict(self, text):
+        """Returns (label, confidence), or (None, 0.0) if nothing is similar."""
+        query = self._vectorize(Counter(_tokenize(text)))
+        scores = defaultdict(float)
+        for term, weight in query.items():
+            for index in self.postings.get(term, ()):
+                scores[index] += weight * self.vectors[index][term]
+        if not scores:
+            return None, 0.0
+
+        neighbours = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:self.k]
+        votes = defaultdict(float)
+        for index, score in neighbours:
+            votes[self.labels[index]] += score
+        label, vote = max(votes.items(), key=lambda item: item[1])
+        confidence = (vote / sum(votes.values())) * neighbours[0][1]
+        return label, confidence
+
+
+class EmbeddingNearestNeighbourClassifier:
+    """
+    Cosine k-nearest-neighbour over embeddings of the labelled examples,
+    scored like the TF-IDF classifier. Examples are embedded on first use,
+    and a query that cannot be embedded is left to the LLM.
+    """
+    def __init__(self, examples, embedding_service, k=5):
+        self.k = k
+        self.embedding_service = embedding_service
+        self.texts = [text for text, _ in examples]
+        self.labels = [label for _, label in examples]
+        self._vectors = None
+
+    def _embed(self, texts):
+        vectors = self.embedding_service.embed(texts, task_type="semantic_similarity")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def predict(self, text):
+        """Returns (label, confidence), or (None, 0.0) if the query cannot be embedded."""
+        try:
+            if self._vectors is None:
+                self._vectors = self._embed(self.texts)
+            query = self._embed([text])[0]
+        except Exception as e:
+            print(f"--- Embedding router unavailable: {e} ---")
+            return None, 0.0
+
+        scores = self._vectors @ query
+        neighbours = np.argsort(-scores)[:self.k]
+        votes = defaultdict(float)
+        for index in neighbours:
+            votes[self.labels[index]] += max(float(scores[index]), 0.0)
+        label, vote = max(votes.items(), key=lambda item: item[1])
+        if vote <= 0:
+            return None, 0.0
+        confidence = (vote / sum(votes.values())) * float(scores[neighbours[0]])
+        return label, confidence
+
+
+class IntentRouter:
+    """Routes queries locally, returning None when the LLM should decide."""
+    def __init__(self, examples=None, threshold=INTENT_ROUTER_THRESHOLD, available_agents=None,
+                 classifier=None):
+        self.threshold = threshold
+        self.available_agents = set(available_agents) if available_agents else None
+        self.rules = [(re.compile(pattern, re.IGNORECASE), action) for pattern, action in RULES]
+        self.topics = [(re.compile(pattern, re.IGNORECASE), action) for pattern, action in TOPICS]
+        self.classifier = classifier or TfidfNearestNeighbourClassifier(examples or LABELLED_EXAMPLES)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    @classmethod
+    def from_env(cls, available_agents=None):
+        """Builds a router with the classifier chosen by INTENT_ROUTER_CLASSIFIER."""
+        classifier = None
+        if INTENT_ROUTER_CLASSIFIER == "embedding":
+            from app.services.embedding_service import embedding_service
+            classifier = EmbeddingNearestNeighbourClassifier(LABELLED_EXAMPLES, embedding_service)
+        return cls(available_agents=available_agents, classifier=classifier)
+
+    def route(self, query, history=None):
+        """Returns a RouteDecision, or None if the query needs the LLM router."""
+        decision = self._route(query.strip(), history or [])
+        if decision and not self._is_available(decision.action):
+            decision = None
+        with self._lock:
+            self.stats[decision.tier if decision else "fallback"] += 1
+        return decision
+
+    def _route(self, query, history):
+        for pattern, action in self.rules:
+            if pattern.search(query):
+                return RouteDecision(action, 1.0, "rules")
+
+        label, confidence = self.classifier.predict(query)
+        # Follow-ups only make sense inside a conversation, and a vague
+        # "send it" only with a draft to send.
+        if label == "chat" and not history:
+            return None
+        if label == "send_email" and not _EXPLICIT_EMAIL.search(query) and not _has_email_draft(history):
+            return None
+        tier = "classifier"
+        if label and any(action == label and pattern.search(query) for pattern, action in self.topics):
+            confidence, tier = confidence + TOPIC_CONFIDENCE, "classifier+topic"
+        if label and confidence >= self.threshold:
+            return RouteDecision(label, min(confidence, 1.0), tier)
+        return None
+
+    def _is_available(self, action):
+        if self.available_agents is None or not action.startswith("run_specific_agent:"):
+            return True
+        return action.split(":", 1)[1] in self.available_agents
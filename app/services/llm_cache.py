@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(model_name, prompt, tools=None, data_version=None):
+    """
+    Content-addressed key for an LLM call: a hash of the model name, the
+    prompt, the names of the tools the model was given and, for tools that
+    read stored data, the version of that data.
+    """
+    tool_names = [getattr(tool, "__name__", repr(tool)) for tool in tools or []]
+    payload = json.dumps([model_name, prompt, tool_names, data_version], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM responses. The first tier is an in-memory LRU
+    local to the worker. The optional second tier is a SQLite file that
+    survives restarts and can be shared by every worker on the host. Both
+    tiers honour the same TTL and are bounded in size.
+    """
+    def __init__(self, max_entries=512, ttl_seconds=86400, sqlite_path=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_responses_accessed ON llm_responses (accessed_at)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Builds the cache from LLM_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+            sqlite_path=os.getenv("LLM_CACHE_SQLITE_PATH") or None,
+            max_disk_entries=int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "10000")),
+        )
+
+    def get(self, key):
+        """Returns the cached response for `key`, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] < self.ttl_seconds:
+                    self._db.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._put_memory(key, row[0], row[1])
+                    self._stats["disk_hits"] += 1
+                    return row[0]
+                if row:
+                    self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key, response):
+        """Stores a response in every configured tier."""
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, response, now)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                # Evict expired rows, then the least recently used beyond the bound.
+                self._db.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._db.execute(
+                    "DELETE FROM llm_responses WHERE key IN ("
+                    " SELECT key FROM llm_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                self._db.commit()
+
+    def _put_memory(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drops every cached response."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_responses")
+                self._db.commit()
+
+    def stats(self):
+        """Returns hit/miss counters and the current memory tier size."""
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
+
+
+# Shared by every agent in the worker.
+response_cache = LLMResponseCache.from_env()
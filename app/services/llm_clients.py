@@ -0,0 +1,62 @@
+import os
+import threading
+import google.generativeai as genai
+
+# Process-wide pool of Gemini model clients. Agents used to call
+# genai.configure and build a new GenerativeModel every time they were
+# constructed; now each (model, tools) combination is built once per worker
+# and shared by every agent and request thread.
+_models = {}
+_lock = threading.Lock()
+_configure_lock = threading.Lock()
+_configured_api_key = None
+
+
+def configure_api_key():
+    """
+    Configures the genai SDK with GOOGLE_API_KEY, once per key, and
+    returns the key, or None if it is not set. Call it before any direct
+    genai call that does not go through a shared model.
+    """
+    global _configured_api_key
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        return None
+    if _configured_api_key != api_key:
+        with _configure_lock:
+            if _configured_api_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_api_key = api_key
+    return api_key
+
+
+def _tools_key(tools):
+    return tuple(getattr(tool, "__name__", repr(tool)) for tool in tools or [])
+
+
+def get_generative_model(model_name, tools=None):
+    """
+    Returns a shared GenerativeModel for the given model name and tool set,
+    or None if GOOGLE_API_KEY is not set.
+    """
+    if not os.getenv("GOOGLE_API_KEY"):
+        return None
+
+    key = (model_name, _tools_key(tools))
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            configure_api_key()
+            model_tools = { "tools": tools } if tools else {}
+            model = genai.GenerativeModel(model_name=model_name, **model_tools)
+            _models[key] = model
+    return model
+
+
+def pool_size():
+    """Returns the number of distinct model clients built in this process."""
+    return len(_models)
@@ -0,0 +1,392 @@
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from app.services import telemetry
+from app.services.prompt_builder import count_tokens
+
+# Client-side admission control for Gemini, shared by every agent in the
+# worker. Each model gets a limiter with two token buckets, one for
+# requests and one for tokens per minute (Gemini's quotas are per model),
+# so bursts queue here instead of coming back as 429s. Calls that still
+# fail with a retryable error (429, 5xx, timeouts) are retried with
+# jittered exponential backoff, waiting at least as long as the server's
+# retry-after hint, and a run of consecutive failures opens a circuit that
+# fails calls fast until a cooldown has passed.
+#
+# Waiting calls are admitted in priority order: interactive turns go ahead
+# of queued batch analyses, and batch calls may not dip into the last
+# LLM_INTERACTIVE_RESERVE fraction of either bucket. A limit of 0 disables
+# that bucket.
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "1000"))
+GEMINI_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+LLM_INTERACTIVE_RESERVE = float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2"))
+# Response tokens are charged up front as this estimate and settled against
+# the reported usage when the response carries it.
+LLM_EXPECTED_RESPONSE_TOKENS = int(os.getenv("LLM_EXPECTED_RESPONSE_TOKENS", "1000"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("LLM_CIRCUIT_COOLDOWN_SECONDS", "30"))
+
+INTERACTIVE = 0
+BATCH = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+_RETRY_IN = re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE)
+_RETRY_DELAY = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)")
+
+
+class LLMGenerationError(Exception):
+    """Raised when a model call fails for good. `retry_after` hints when trying again may succeed."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(LLMGenerationError):
+    """Raised without calling the model: the circuit is open or the call waited too long for quota."""
+
+
+@contextmanager
+def priority(lane):
+    """Runs the block's model calls, including those submitted to pools with telemetry.submit, in `lane`."""
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Holds up to `per_minute` units, refilled continuously at per_minute/60 a
+    second. `scale` slows the refill while the server is pushing back.
+    Not thread-safe on its own; the limiter serializes access.
+    """
+    def __init__(self, per_minute, now):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.scale = 1.0
+        self.updated = now
+
+    @property
+    def unlimited(self):
+        return self.capacity <= 0
+
+    def refill(self, now):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate * self.scale)
+        self.updated = now
+
+    def wait_time(self, amount, reserve=0.0):
+        """Seconds until `amount` can be taken while leaving `reserve` of the capacity untouched."""
+        if self.unlimited:
+            return 0.0
+        needed = min(amount, self.capacity * (1 - reserve)) + self.capacity * reserve
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / (self.rate * self.scale)
+
+    def take(self, amount):
+        if not self.unlimited:
+            self.level -= amount
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `cooldown_seconds`. After the cooldown one probe call is let
+    through; its success closes the circuit, its failure re-opens it.
+    """
+    def __init__(self, failure_threshold=LLM_CIRCUIT_FAILURE_THRESHOLD,
+                 cooldown_seconds=LLM_CIRCUIT_COOLDOWN_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(self.clock())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        return "open" if now - self.opened_at < self.cooldown_seconds else "half_open"
+
+    def allow(self):
+        """Returns True if a call may go ahead, claiming the probe slot when half-open."""
+        with self._lock:
+            state = self._state(self.clock())
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_after(self):
+        """Seconds until the circuit lets a probe through."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown_seconds - self.clock())
+
+    def release(self):
+        """Gives back a claimed probe slot when the probe call was never made."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        """Counts a failure, returning True if it opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            reopen = self._probing
+            self._probing = False
+            if reopen or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                return True
+            return False
+
+
+class LLMRateLimiter:
+    """Admission, retries and circuit breaking for one model. See the module comment."""
+    def __init__(self, model_name="gemini", requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=GEMINI_TOKENS_PER_MINUTE, interactive_reserve=LLM_INTERACTIVE_RESERVE,
+                 queue_timeout_seconds=LLM_QUEUE_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES,
+                 backoff_base_seconds=LLM_BACKOFF_BASE_SECONDS, backoff_max_seconds=LLM_BACKOFF_MAX_SECONDS,
+                 breaker=None, clock=time.monotonic, sleep=time.sleep):
+        self.model_name = model_name
+        self.interactive_reserve = interactive_reserve
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, now)
+        self.tokens = TokenBucket(tokens_per_minute, now)
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def call(self, function, tokens=0):
+        """
+        Calls `function()` once quota allows, retrying retryable failures.
+        Returns its result or raises LLMGenerationError.
+        """
+        lane = _priority.get()
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise LLMUnavailableError(
+                    f"{self.model_name} is unavailable after repeated failures; not calling it for now.",
+                    retry_after=self.breaker.retry_after(),
+                )
+            try:
+                self.acquire(tokens, lane)
+            except BaseException:
+                # A probe that timed out in the queue must not keep the
+                # circuit half-open and rejecting every later call.
+                self.breaker.release()
+                raise
+            try:
+                result = function()
+            except Exception as e:
+                if not is_retryable(e):
+                    # The request itself was bad; the service is fine.
+                    self.breaker.record_success()
+                    raise
+                hint = retry_after_hint(e)
+                if self.breaker.record_failure():
+                    print(f"--- LLM CIRCUIT OPEN for {self.model_name} after {self.breaker.failures} failures ---")
+                    telemetry.LLM_CIRCUIT_OPENS.inc(model=self.model_name)
+                if _status_code(e) == 429:
+                    self.throttle(hint)
+                if attempt == self.max_retries:
+                    raise LLMGenerationError(f"{type(e).__name__}: {e}", retry_after=hint) from e
+                delay = self.backoff(attempt, hint)
+                print(f"--- LLM call to {self.model_name} failed ({type(e).__name__}); "
+                      f"retrying in {delay:.1f}s ---")
+                telemetry.LLM_RETRIES.inc(model=self.model_name, reason=_retry_reason(e))
+                _annotate("retries", 1)
+                self.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.recover()
+            return result
+
+    def acquire(self, tokens, lane=INTERACTIVE):
+        """Blocks until one request and `tokens` tokens are available to `lane`, then takes them."""
+        started = self.clock()
+        deadline = started + self.queue_timeout_seconds
+        ticket = (lane, next(self._sequence))
+        reserve = self.interactive_reserve if lane != INTERACTIVE else 0.0
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    wait = None
+                    if self._waiters[0] == ticket:
+                        wait = max(self._paused_until - now,
+                                   self.requests.wait_time(1, reserve), self.tokens.wait_time(tokens, reserve))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    if now >= deadline:
+                        raise LLMUnavailableError(
+                            f"Waited {now - started:.0f}s for {self.model_name} quota.", retry_after=wait)
+                    self._cond.wait(timeout=min(wait if wait is not None else deadline - now, deadline - now))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+        waited = self.clock() - started
+        telemetry.LLM_QUEUE_WAIT.observe(waited, model=self.model_name, lane=_PRIORITY_NAMES.get(lane, lane))
+        if waited > 0:
+            _annotate("queued_ms", round(waited * 1000, 1))
+        return waited
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Corrects the token bucket once a call's real usage is known."""
+        with self._cond:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+    def throttle(self, retry_after=None):
+        """
+        Reacts to a 429: halves the refill rate of both buckets and, given a
+        retry-after hint, holds every queued call until it has passed.
+        """
+        with self._cond:
+            for bucket in (self.requests, self.tokens):
+                bucket.scale = max(0.1, bucket.scale / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, self.clock() + retry_after)
+
+    def recover(self):
+        """Restores the refill rate additively after each success."""
+        with self._cond:
+            for bucket in (self.requests, self.tokens):
+                if bucket.scale < 1.0:
+                    bucket.scale = min(1.0, bucket.scale + 0.05)
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than the server's hint."""
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+
+def is_retryable(error):
+    """True for rate limiting, server errors, timeouts and dropped connections."""
+    code = _status_code(error)
+    if code is not None:
+        return code in (408, 429) or code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def retry_after_hint(error):
+    """Returns the seconds the server asked us to wait before retrying, if it said."""
+    hint = getattr(error, "retry_after", None)
+    if isinstance(hint, (int, float)):
+        return float(hint)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("Retry-After"):
+            return float(headers["Retry-After"])
+    except (TypeError, ValueError):
+        pass
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+    message = str(error)
+    match = _RETRY_IN.search(message) or _RETRY_DELAY.search(message)
+    return float(match.group(1)) if match else None
+
+
+def _status_code(error):
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_reason(error):
+    code = _status_code(error)
+    return str(code) if code is not None else type(error).__name__
+
+
+def _annotate(key, amount):
+    """Adds to an attribute of the current LLM span, if the call is traced."""
+    span = telemetry.current_span()
+    if span is not None and span.kind == "llm":
+        span.add(key, amount)
+
+
+def estimate_tokens(contents):
+    """Estimates the prompt tokens of a prompt string or a list of conversation contents."""
+    if isinstance(contents, str):
+        return count_tokens(contents)
+    return sum(count_tokens(item if isinstance(item, str) else str(item)) for item in contents)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model_name):
+    """Returns the worker's shared limiter for a model, creating it on first use."""
+    key = str(model_name)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(key, LLMRateLimiter(key))
+    return limiter
+
+
+def generate_content(model, contents, on_start=None, **kwargs):
+    """
+    Calls `model.generate_content` through the model's shared limiter,
+    raising LLMGenerationError once retries are exhausted. `on_start` is
+    called each time the limiter lets a try through to the model.
+    """
+    limiter = get_limiter(getattr(model, "model_name", "gemini"))
+    estimated = estimate_tokens(contents) + LLM_EXPECTED_RESPONSE_TOKENS
+
+    def call():
+        if on_start is not None:
+            on_start()
+        return model.generate_content(contents, **kwargs)
+
+    response = limiter.call(call, tokens=estimated)
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    if isinstance(prompt_tokens, int) and isinstance(response_tokens, int):
+        limiter.settle(estimated, prompt_tokens + response_tokens)
+    return response
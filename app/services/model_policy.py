@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from app.services import llm_limiter, telemetry
+from app.services.llm_limiter import LLMGenerationError, LLMUnavailableError
+
+# Which model answers which step. Every agent and orchestrator step is
+# assigned a tier, and each tier names a model, a per-call timeout and
+# whether slow calls are hedged: once a call has run past the tier's
+# recent p90 latency, an identical backup call is fired and whichever
+# answers first is used. Until a tier has HEDGE_MIN_SAMPLES latencies, its
+# configured hedge_after_seconds stands in for the p90.
+#
+# Tiers and assignments can be overridden with MODEL_TIERS, a JSON object
+# of tier name -> settings, and MODEL_POLICY, a JSON object of agent or
+# step name -> tier name.
+DEFAULT_TIERS = {
+    "fast": {"model": "gemini-flash-lite-latest", "timeout_seconds": 30, "hedge": True,
+             "hedge_after_seconds": 3},
+    "standard": {"model": "gemini-flash-latest", "timeout_seconds": 90, "hedge": True,
+                 "hedge_after_seconds": 15},
+    "deep": {"model": "gemini-flash-latest", "timeout_seconds": 180, "hedge": False,
+             "hedge_after_seconds": 60},
+}
+DEFAULT_ASSIGNMENTS = {
+    # Orchestrator steps that only classify, restate or extract.
+    "router": "fast",
+    "summarize_history": "fast",
+    "format_response": "fast",
+    "compose_email": "fast",
+    # User-facing answers.
+    "direct_answer": "standard",
+    "chat": "standard",
+    # The CIO synthesis and the long-form specialists.
+    "synthesis": "deep",
+    "deal_memo": "deep",
+    "risk_and_compliance": "standard",
+    "benchmarking": "standard",
+    "market_research": "standard",
+    "portfolio_fit": "standard",
+    "digital_footprint": "standard",
+}
+DEFAULT_TIER = "standard"
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = int(os.getenv("MODEL_LATENCY_WINDOW", "200"))
+
+# Runs the primary and backup attempts of hedged calls. A losing attempt
+# is left to finish in the background and its result discarded.
+_hedge_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HEDGE_MAX_WORKERS", "32")),
+    thread_name_prefix="model-call",
+)
+
+
+class ModelTier:
+    """One tier's model and call settings, with a rolling window of its call latencies."""
+    def __init__(self, name, model, timeout_seconds, hedge=False, hedge_after_seconds=None):
+        self.name = name
+        self.model = model
+        self.timeout_seconds = float(timeout_seconds)
+        self.hedge = hedge
+        self.hedge_after_seconds = float(hedge_after_seconds or timeout_seconds)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {"calls": 0, "errors": 0, "timeouts": 0, "hedges": 0, "hedges_won": 0}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+        telemetry.MODEL_TIER_LATENCY.observe(seconds, tier=self.name, model=self.model)
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def percentile(self, fraction):
+        """The given percentile of recent latencies, or None without enough samples."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+    def hedge_after(self):
+        """Seconds to wait for the primary before firing a backup call."""
+        p90 = self.percentile(0.9)
+        return min(p90 if p90 is not None else self.hedge_after_seconds, self.timeout_seconds)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self._counts)
+
+        def at(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 1)
+        return {
+            "model": self.model,
+            "timeout_seconds": self.timeout_seconds,
+            "hedge": self.hedge,
+            "hedge_after_seconds": round(self.hedge_after(), 3),
+            "samples": len(latencies),
+            "p50_ms": at(0.5),
+            "p90_ms": at(0.9),
+            "p99_ms": at(0.99),
+            **counts,
+        }
+
+
+class ModelPolicy:
+    """Maps agents and orchestrator steps to model tiers."""
+    def __init__(self, tiers=None, assignments=None, default_tier=DEFAULT_TIER):
+        tiers = tiers or DEFAULT_TIERS
+        self.tiers = {name: ModelTier(name, **settings) for name, settings in tiers.items()}
+        self.assignments = dict(DEFAULT_ASSIGNMENTS if assignments is None else assignments)
+        self.default_tier = default_tier
+
+    @classmethod
+    def from_env(cls):
+        """Builds the policy from the defaults, overridden by MODEL_TIERS and MODEL_POLICY."""
+        tiers = {name: dict(settings) for name, settings in DEFAULT_TIERS.items()}
+        for name, settings in json.loads(os.getenv("MODEL_TIERS", "{}")).items():
+            tiers.setdefault(name, {}).update(settings)
+        assignments = dict(DEFAULT_ASSIGNMENTS, **json.loads(os.getenv("MODEL_POLICY", "{}")))
+        return cls(tiers, assignments)
+
+    def tier_for(self, name):
+        """Returns the tier assigned to an agent key or step name."""
+        tier = self.tiers.get(self.assignments.get(name, self.default_tier))
+        return tier or self.tiers[self.default_tier]
+
+    def model_for(self, name):
+        return self.tier_for(name).model
+
+    def stats(self):
+        """Per-tier settings, latency percentiles and call counts."""
+        return {
+            "tiers": {name: tier.stats() for name, tier in self.tiers.items()},
+            "assignments": dict(self.assignments),
+        }
+
+
+def generate(model, contents, tier=None, **kwargs):
+    """
+    Calls `model.generate_content` through the rate limiter, applying the
+    tier's timeout and hedging. Streaming calls are passed through as is.
+    Raises LLMGenerationError if no attempt answers within the timeout, and
+    LLMUnavailableError if the call waits too long to start.
+    """
+    if tier is None or kwargs.get("stream"):
+        return llm_limiter.generate_content(model, contents, **kwargs)
+    # A losing attempt may still be sending the conversation while the
+    # caller appends to it.
+    if isinstance(contents, list):
+        contents = list(contents)
+
+    # The timeout and the hedge delay run from when the primary attempt gets
+    # through the rate limiter, so time spent waiting for a pool thread or
+    # for quota does not use them up. That wait is capped on its own, at the
+    # limiter's queue timeout.
+    admitted = Future()
+
+    def attempt(primary):
+        started = []
+
+        def on_start():
+            if not started:
+                started.append(time.monotonic())
+                if primary:
+                    admitted.set_result(started[0])
+
+        response = llm_limiter.generate_content(model, contents, on_start=on_start, **kwargs)
+        tier.observe(time.monotonic() - started[0])
+        return response
+
+    tier.count("calls")
+    queue_deadline = time.monotonic() + llm_limiter.LLM_QUEUE_TIMEOUT_SECONDS
+    pending = {telemetry.submit(_hedge_pool, attempt, True): "primary"}
+    deadline = hedge_at = None
+    error = None
+    while pending:
+        if deadline is None and admitted.done():
+            deadline = admitted.result() + tier.timeout_seconds
+            hedge_at = admitted.result() + tier.hedge_after() if tier.hedge else None
+        now = time.monotonic()
+        if deadline is None:
+            until, waiting_on = queue_deadline, [*pending, admitted]
+        else:
+            until, waiting_on = (min(deadline, hedge_at) if hedge_at else deadline), list(pending)
+        done, _ = wait(waiting_on, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+        done.discard(admitted)
+        for future in done:
+            label = pending.pop(future)
+            try:
+                response = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if label == "backup":
+                tier.count("hedges_won")
+                telemetry.MODEL_HEDGES.inc(tier=tier.name, outcome="won")
+            return response
+        now = time.monotonic()
+        if deadline is None:
+            if now >= queue_deadline and pending:
+                for future in pending:
+                    future.cancel()
+                tier.count("timeouts")
+                raise LLMUnavailableError(f"{tier.model} call did not start within "
+                                          f"{llm_limiter.LLM_QUEUE_TIMEOUT_SECONDS:.0f}s ({tier.name} tier).")
+            continue
+        if hedge_at and now >= hedge_at and not done and error is None:
+            print(f"--- {tier.model} has not answered after {tier.hedge_after():.1f}s; hedging ---")
+            tier.count("hedges")
+            telemetry.MODEL_HEDGES.inc(tier=tier.name, outcome="fired")
+            pending[telemetry.submit(_hedge_pool, attempt, False)] = "backup"
+            hedge_at = None
+        if now >= deadline and pending:
+            tier.count("timeouts")
+            raise LLMGenerationError(f"{tier.model} did not answer within {tier.timeout_seconds:.0f}s "
+                                     f"({tier.name} tier timeout).")
+    tier.count("errors")
+    raise error
+
+
+# Shared by every agent in the worker.
+model_policy = ModelPolicy.from_env()
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Gemini tokenizes English prose at roughly four characters per token. A
+# local estimate is used instead of model.count_tokens() because that is a
+# network round-trip of its own.
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " ...[truncated]"
+STARTUP_DATA_PLACEHOLDER = "<<STARTUP_DATA>>"
+
+
+def count_tokens(text):
+    """Estimates the number of tokens in a string."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_turns(turns):
+    """Formats conversation turns verbatim."""
+    return "\n".join([f"User: {h['user']}\nAI: {h['ai']}" for h in turns])
+
+
+class PromptBuilder:
+    """
+    Assembles the variable parts of orchestrator prompts within a token budget.
+
+    - Conversation history keeps the last `history_turns` turns verbatim and
+      folds older turns into a running summary, which is cached so each turn
+      is summarized only once per conversation.
+    - Startup data is serialized once and, when it would not fit the
+      remaining budget, the `companyDetails` document summaries are trimmed
+      proportionally.
+    """
+    def __init__(self, token_budget=30000, history_turns=6, max_cached_summaries=512):
+        self.token_budget = token_budget
+        self.history_turns = history_turns
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Builds a prompt builder from PROMPT_* environment variables."""
+        return cls(
+            token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "30000")),
+            history_turns=int(os.getenv("PROMPT_HISTORY_TURNS", "6")),
+        )
+
+    def format_history(self, history, summarize):
+        """
+        Formats conversation history for a prompt. `summarize(previous_summary,
+        turns)` is called to fold turns that fall outside the verbatim window
+        into the running summary.
+        """
+        if len(history) <= self.history_turns:
+            return format_turns(history)
+
+        older = history[:-self.history_turns] if self.history_turns else history
+        recent = history[-self.history_turns:] if self.history_turns else []
+        summary = self._running_summary(older, summarize)
+        parts = [f"Summary of earlier conversation: {summary}"]
+        if recent:
+            parts.append(format_turns(recent))
+        return "\n".join(parts)
+
+    def _running_summary(self, turns, summarize):
+        # Each prefix of the conversation has a stable hash, so the longest
+        # already-summarized prefix can be found and only the turns after it
+        # need to be summarized.
+        prefix_hashes = []
+        digest = hashlib.sha256()
+        for turn in turns:
+            digest.update(json.dumps(turn, sort_keys=True).encode("utf-8"))
+            prefix_hashes.append(digest.hexdigest())
+
+        previous_summary, start = "", 0
+        with self._lock:
+            for index in range(len(turns) - 1, -1, -1):
+                cached = self._summaries.get(prefix_hashes[index])
+                if cached is not None:
+                    self._summaries.move_to_end(prefix_hashes[index])
+                    previous_summary, start = cached, index + 1
+                    break
+        if start == len(turns):
+            return previous_summary
+
+        summary = summarize(previous_summary, turns[start:])
+        with self._lock:
+            self._summaries[prefix_hashes[-1]] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def startup_context(self, startup_data, *other_parts, token_budget=None):
+        """
+        Serializes startup data to fit whatever is left of the token budget
+        after `other_parts` (the rest of the prompt).
+        """
+        budget = token_budget if token_budget is not None else self.token_budget
+        available = budget - sum(count_tokens(part) for part in other_parts)
+        serialized = json.dumps(startup_data, indent=2)
+        overflow = count_tokens(serialized) - available
+        if overflow <= 0 or not startup_data.get('companyDetails'):
+            return serialized
+
+        # JSON escaping makes the character count approximate, so take a
+        # couple more passes if the first trim was not quite enough.
+        trimmed = dict(startup_data)
+        for _ in range(3):
+            trimmed['companyDetails'] = trim_document_summaries(
+                trimmed['companyDetails'], overflow * CHARS_PER_TOKEN
+            )
+            serialized = json.dumps(trimmed, indent=2)
+            overflow = count_tokens(serialized) - available
+            if overflow <= 0:
+                break
+        return serialized
+
+    def fit_startup_data(self, prompt, startup_data, token_budget=None):
+        """
+        Replaces STARTUP_DATA_PLACEHOLDER in `prompt` with the serialized
+        startup data, trimmed to fit the budget left by the rest of the prompt.
+        """
+        template_only = prompt.replace(STARTUP_DATA_PLACEHOLDER, "")
+        context = self.startup_context(startup_data, template_only, token_budget=token_budget)
+        return prompt.replace(STARTUP_DATA_PLACEHOLDER, context)
+
+    def log(self, label, prompt, **sections):
+        """Logs the size of an assembled prompt and its variable sections."""
+        details = ", ".join(f"{name} {count_tokens(text)}" for name, text in sections.items())
+        print(f"--- PROMPT {label}: ~{count_tokens(prompt)} tokens ({details}) ---")
+
+
+def trim_document_summaries(company_details, chars_to_remove):
+    """
+    Shortens document summaries by about `chars_to_remove` characters,
+    taking from each summary in proportion to its length so that every
+    document keeps some representation.
+    """
+    if isinstance(company_details, str):
+        company_details = company_details.removesuffix(TRUNCATION_MARKER)
+        keep = max(0, len(company_details) - chars_to_remove)
+        return company_details[:keep] + TRUNCATION_MARKER if keep < len(company_details) else company_details
+    if not isinstance(company_details, dict):
+        return company_details
+
+    lengths = {
+        key: len(value if isinstance(value, str) else json.dumps(value))
+        for key, value in company_details.items()
+    }
+    total = sum(lengths.values()) or 1
+    trimmed = {}
+    for key, value in company_details.items():
+        share = int(chars_to_remove * lengths[key] / total) + len(TRUNCATION_MARKER)
+        if not isinstance(value, str):
+            value = json.dumps(value)
+        trimmed[key] = trim_document_summaries(value, share)
+    return trimmed
@@ -0,0 +1,78 @@
+import json
+import re
+
+# Renders a specialist's report as markdown for the user without another
+# model call. Specialists return a dict with one or more keys; a string
+# value is usually already narrative and is passed through, while nested
+# dicts and lists are laid out as bullet points.
+
+INVALID_REPORT_MESSAGE = "The agent did not provide a valid response."
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*\n(.*?)\n\s*```\s*$", re.DOTALL)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def _title(key):
+    return str(key).replace("_", " ").strip().title()
+
+
+def _clean_text(text):
+    """Strips a code fence wrapping the whole text and collapses runs of blank lines."""
+    text = text.strip()
+    match = _FENCE.match(text)
+    if match:
+        text = match.group(1).strip()
+    return _BLANK_LINES.sub("\n\n", text)
+
+
+def _format_value(value, depth=0):
+    indent = "  " * depth
+    if isinstance(value, str):
+        return _clean_text(value)
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{indent}- **{_title(key)}:**")
+                lines.append(_format_value(item, depth + 1))
+            else:
+                lines.append(f"{indent}- **{_title(key)}:** {_format_scalar(item)}")
+        return "\n".join(lines)
+    if isinstance(value, list):
+        lines = []
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{indent}-")
+                lines.append(_format_value(item, depth + 1))
+            else:
+                lines.append(f"{indent}- {_format_scalar(item)}")
+        return "\n".join(lines)
+    return _format_scalar(value)
+
+
+def _format_scalar(value):
+    if value is None or value == "" or value == [] or value == {}:
+        return "n/a"
+    if isinstance(value, str):
+        return " ".join(_clean_text(value).split())
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    return json.dumps(value, default=str)
+
+
+def format_report(agent_name, agent_result, startup_name):
+    """
+    Returns `agent_result`, a specialist's report dict, as markdown headed
+    with the agent's and startup's names. Each key becomes a section.
+    """
+    if not agent_result or not isinstance(agent_result, dict):
+        return INVALID_REPORT_MESSAGE
+    heading = f"## {agent_name} — {startup_name}" if startup_name else f"## {agent_name}"
+    sections = [heading]
+    single = len(agent_result) == 1
+    for key, value in agent_result.items():
+        body = _format_value(value)
+        if not body:
+            continue
+        sections.append(body if single else f"### {_title(key)}\n\n{body}")
+    return "\n\n".join(sections)
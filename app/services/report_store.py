@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Completed full analyses, kept as numbered versions per deal so they can be
+# fetched again (from any session or worker) without an LLM call. Each
+# version holds the specialist reports, the final synthesis, the fingerprint
+# of the inputs it was generated from, its timestamp and the models used.
+# The backend is chosen with ANALYSIS_REPORT_STORE:
+#   memory - local to this worker (default)
+#   sqlite - shared by every worker on the host (ANALYSIS_REPORT_STORE_PATH)
+#   rtdb   - the app's Firebase Realtime Database, under analysisReports/
+# Every backend keeps only the newest ANALYSIS_REPORT_MAX_VERSIONS versions
+# of each deal.
+ANALYSIS_REPORT_MAX_VERSIONS = int(os.getenv("ANALYSIS_REPORT_MAX_VERSIONS", "20"))
+
+
+def analysis_fingerprint(agent_fingerprints, model_name):
+    """Combines the specialists' input fingerprints and the synthesis model into one fingerprint."""
+    serialized = json.dumps({"agents": agent_fingerprints, "model": model_name}, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def version_summary(report):
+    """The metadata listed for a version, without the report text."""
+    return {key: report.get(key) for key in ("version", "created_at", "fingerprint", "model")}
+
+
+class AnalysisReportStore:
+    """Interface for analysis report backends."""
+    def save(self, deal_id, report):
+        """Stores `report` as the deal's next version and returns its version number."""
+        raise NotImplementedError
+
+    def get(self, deal_id, version):
+        """Returns one version of the deal's report, or None."""
+        raise NotImplementedError
+
+    def latest(self, deal_id):
+        """Returns the deal's most recent report, or None."""
+        raise NotImplementedError
+
+    def versions(self, deal_id):
+        """Returns the metadata of every stored version, newest first."""
+        raise NotImplementedError
+
+
+class InMemoryAnalysisReportStore(AnalysisReportStore):
+    """
+    Worker-local store. Keeps the last `max_versions` versions for at most
+    `max_deals` deals (least recently written are evicted first).
+    """
+    def __init__(self, max_deals=256, max_versions=ANALYSIS_REPORT_MAX_VERSIONS):
+        self.max_deals = max_deals
+        self.max_versions = max_versions
+        self._deals = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, deal_id, report):
+        deal_id = str(deal_id)
+        with self._lock:
+            entry = self._deals.setdefault(deal_id, {"next_version": 1, "reports": OrderedDict()})
+            version = entry["next_version"]
+            entry["next_version"] += 1
+            entry["reports"][version] = json.loads(json.dumps(dict(report, version=version)))
+            while len(entry["reports"]) > self.max_versions:
+                entry["reports"].popitem(last=False)
+            self._deals.move_to_end(deal_id)
+            while len(self._deals) > self.max_deals:
+                self._deals.popitem(last=False)
+        return version
+
+    def get(self, deal_id, version):
+        with self._lock:
+            entry = self._deals.get(str(deal_id))
+            report = entry["reports"].get(version) if entry else None
+            return json.loads(json.dumps(report)) if report else None
+
+    def latest(self, deal_id):
+        with self._lock:
+            entry = self._deals.get(str(deal_id))
+            if not entry or not entry["reports"]:
+                return None
+            return json.loads(json.dumps(next(reversed(entry["reports"].values()))))
+
+    def versions(self, deal_id):
+        with self._lock:
+            entry = self._deals.get(str(deal_id))
+            reports = list(entry["reports"].values()) if entry else []
+        return [version_summary(report) for report in reversed(reports)]
+
+
+class SQLiteAnalysisReportStore(AnalysisReportStore):
+    """
+    Store backed by a SQLite file, so every worker on the host sees the
+    same reports. Keeps the last `max_versions` versions of each deal.
+    """
+    def __init__(self, path, max_versions=ANALYSIS_REPORT_MAX_VERSIONS):
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_reports ("
+            " deal_id TEXT NOT NULL, version INTEGER NOT NULL, fingerprint TEXT, model TEXT,"
+            " created_at REAL NOT NULL, payload TEXT NOT NULL, PRIMARY KEY (deal_id, version))"
+        )
+        self._db.commit()
+
+    def save(self, deal_id, report):
+        with self._lock:
+            # Numbering in the same statement keeps versions unique across workers.
+            cursor = self._db.execute(
+                "INSERT INTO analysis_reports (deal_id, version, fingerprint, model, created_at, payload)"
+                " SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ? FROM analysis_reports WHERE deal_id = ?",
+                (str(deal_id), report.get("fingerprint"), report.get("model"),
+                 report.get("created_at", time.time()), json.dumps(report), str(deal_id)),
+            )
+            version = self._db.execute(
+                "SELECT version FROM analysis_reports WHERE rowid = ?", (cursor.lastrowid,)
+            ).fetchone()[0]
+            self._db.execute("DELETE FROM analysis_reports WHERE deal_id = ? AND version <= ?",
+                             (str(deal_id), version - self.max_versions))
+            self._db.commit()
+        return version
+
+    def get(self, deal_id, version):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version, payload FROM analysis_reports WHERE deal_id = ? AND version = ?",
+                (str(deal_id), version),
+            ).fetchone()
+        return dict(json.loads(row[1]), version=row[0]) if row else None
+
+    def latest(self, deal_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version, payload FROM analysis_reports WHERE deal_id = ? ORDER BY version DESC LIMIT 1",
+                (str(deal_id),),
+            ).fetchone()
+        return dict(json.loads(row[1]), version=row[0]) if row else None
+
+    def versions(self, deal_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT version, created_at, fingerprint, model FROM analysis_reports"
+                " WHERE deal_id = ? ORDER BY version DESC",
+                (str(deal_id),),
+            ).fetchall()
+        return [{"version": version, "created_at": created_at, "fingerprint": fingerprint, "model": model}
+                for version, created_at, fingerprint, model in rows]
+
+
+class RealtimeDBAnalysisReportStore(AnalysisReportStore):
+    """
+    Store backed by the Realtime Database. Under analysisReports/<deal_id>,
+    `latest` holds the newest version number (allocated in a transaction),
+    `versions` the reports and `index` their metadata, so listing versions
+    does not download every report. Keeps the last `max_versions` versions
+    of each deal.
+    """
+    def __init__(self, db, path="analysisReports", max_versions=ANALYSIS_REPORT_MAX_VERSIONS):
+        self.db = db
+        self.path = path
+        self.max_versions = max_versions
+
+    def _deal(self, deal_id):
+        return self.db.reference(f"{self.path}/{deal_id}")
+
+    @staticmethod
+    def _key(version):
+        # Keys that are not plain integers keep the database from returning
+        # the versions as a sparse list.
+        return f"v{int(version):06d}"
+
+    def save(self, deal_id, report):
+        deal = self._deal(deal_id)
+        version = deal.child("latest").transaction(lambda current: (current or 0) + 1)
+        report = dict(report, version=version)
+        changes = {
+            f"versions/{self._key(version)}": report,
+            f"index/{self._key(version)}": version_summary(report),
+        }
+        # Writing None deletes; the index is small enough to read for this.
+        for summary in (deal.child("index").get() or {}).values():
+            if summary["version"] <= version - self.max_versions:
+                changes[f"versions/{self._key(summary['version'])}"] = None
+                changes[f"index/{self._key(summary['version'])}"] = None
+        deal.update(changes)
+        return version
+
+    def get(self, deal_id, version):
+        report = self._deal(deal_id).child(f"versions/{self._key(version)}").get()
+        return _with_defaults(report) if report else None
+
+    def latest(self, deal_id):
+        # `latest` is advanced before the report is written, so it can point
+        # at a version that is still being written or whose write failed;
+        # fall back to the newest version that was written.
+        version = self._deal(deal_id).child("latest").get()
+        report = self.get(deal_id, version) if version else None
+        if report is None:
+            for summary in self.versions(deal_id):
+                report = self.get(deal_id, summary["version"])
+                if report is not None:
+                    break
+        return report
+
+    def versions(self, deal_id):
+        index = self._deal(deal_id).child("index").get() or {}
+        return sorted(index.values(), key=lambda summary: summary["version"], reverse=True)
+
+
+def _with_defaults(report):
+    # The Realtime Database drops empty lists and maps.
+    report.setdefault("reports", {})
+    report.setdefault("skipped_agents", [])
+    report.setdefault("unavailable_reports", {})
+    return report
+
+
+def _store_from_env():
+    backend = os.getenv("ANALYSIS_REPORT_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteAnalysisReportStore(os.getenv("ANALYSIS_REPORT_STORE_PATH", "analysis_reports.sqlite3"))
+    if backend == "rtdb":
+        from app.services import google_services
+        return RealtimeDBAnalysisReportStore(google_services.realtime_db)
+    return InMemoryAnalysisReportStore()
+
+
+_report_store = None
+_report_store_lock = threading.Lock()
+
+def get_report_store():
+    """Returns the worker's shared analysis report store, creating it on first use."""
+    global _report_store
+    if _report_store is None:
+        with _report_store_lock:
+            if _report_store is None:
+                _report_store = _store_from_env()
+    return _report_store
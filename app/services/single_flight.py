@@ -0,0 +1,89 @@
+import copy
+import threading
+from app.services import telemetry
+
+# Request coalescing. Identical work that is already running in this
+# worker (the same deal loaded, the same specialist run on the same
+# inputs, the same full analysis) is not started again: later callers wait
+# for the running call and get a copy of its result, or its exception.
+# Progress events the running call emits are relayed to every caller,
+# including the ones it emitted before a caller joined.
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.events = []
+        self.listeners = []
+        self.relay_lock = threading.Lock()
+
+    def emit(self, event, data):
+        with self.relay_lock:
+            self.events.append((event, data))
+            for listener in self.listeners:
+                listener(event, data)
+
+    def subscribe(self, on_event):
+        with self.relay_lock:
+            for event, data in self.events:
+                on_event(event, data)
+            self.listeners.append(on_event)
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Keys are tuples whose first
+    element names the kind of work, which labels the metrics.
+    """
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, on_event=None):
+        """
+        Returns function(emit) for `key`, sharing a call already in flight.
+        `emit(event, data)` relays progress events to every caller's
+        `on_event`. Callers that joined a running call get a deep copy of
+        its result, as does the caller that ran it if anyone joined, so
+        each is free to mutate what it gets.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if on_event:
+            flight.subscribe(on_event)
+
+        if not leader:
+            print(f"--- Joining in-flight {key[0]} for {key[1:]} ---")
+            telemetry.SINGLE_FLIGHT_SHARED.inc(kind=key[0])
+            span = telemetry.current_span()
+            if span is not None:
+                span.set(coalesced=True)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            flight.result = function(flight.emit)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                shared = flight.waiters > 0
+            flight.done.set()
+        return copy.deepcopy(flight.result) if shared else flight.result
+
+    def in_flight(self):
+        """Returns the keys of the calls currently running."""
+        with self._lock:
+            return list(self._flights)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Specialist reports from earlier full analyses, keyed by deal and agent and
+# stored with a fingerprint of the startup_data fields the agent reads. A
+# later analysis reuses a report whose fingerprint is unchanged instead of
+# regenerating it, so a keyMetrics update or an unrelated edit does not
+# re-run the whole team. Reports from agents that research the live web
+# are only reused for SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS.
+SPECIALIST_REPORT_REUSE = os.getenv("SPECIALIST_REPORT_REUSE", "true").lower() == "true"
+SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS = float(os.getenv("SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS", "86400"))
+
+# Failed generations raise LLMGenerationError and never produce a report,
+# but agents without an API key return placeholder text that must not be
+# kept.
+_FAILURE_MARKERS = ("[Placeholder LLM response",)
+
+
+def input_fingerprint(agent, startup_data):
+    """
+    Hashes the startup_data fields `agent` reads, together with its class,
+    model, report version and the version of the data its tools read, so a
+    prompt or model change or a document re-ingestion also invalidates
+    stored reports.
+    """
+    payload = {
+        "agent": type(agent).__name__,
+        "model": agent.model_name,
+        "version": agent.report_version,
+        "data": agent.data_version(),
+        "inputs": {field: startup_data.get(field) for field in agent.input_fields},
+    }
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def is_reusable(report):
+    """Returns True if a specialist's result is a real report worth storing."""
+    if not isinstance(report, dict) or not report:
+        return False
+    return not any(isinstance(value, str) and value.startswith(_FAILURE_MARKERS) for value in report.values())
+
+
+class InMemorySpecialistReportStore:
+    """Keeps the latest report per (deal, agent) in this worker for up to `max_deals` deals."""
+    def __init__(self, max_deals=256):
+        self.max_deals = max_deals
+        self._deals = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, deal_id, agent_key):
+        with self._lock:
+            record = self._deals.get(str(deal_id), {}).get(agent_key)
+            return json.loads(json.dumps(record)) if record else None
+
+    def put(self, deal_id, agent_key, fingerprint, report):
+        record = {"fingerprint": fingerprint, "report": report, "created_at": time.time()}
+        with self._lock:
+            reports = self._deals.setdefault(str(deal_id), {})
+            reports[agent_key] = json.loads(json.dumps(record))
+            self._deals.move_to_end(str(deal_id))
+            while len(self._deals) > self.max_deals:
+                self._deals.popitem(last=False)
+
+    def clear(self, deal_id):
+        with self._lock:
+            self._deals.pop(str(deal_id), None)
+
+
+class SQLiteSpecialistReportStore:
+    """Keeps the latest report per (deal, agent) in a SQLite file shared by every worker on the host."""
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS specialist_reports ("
+            " deal_id TEXT NOT NULL, agent TEXT NOT NULL, fingerprint TEXT NOT NULL,"
+            " report TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (deal_id, agent))"
+        )
+        self._db.commit()
+
+    def get(self, deal_id, agent_key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, report, created_at FROM specialist_reports WHERE deal_id = ? AND agent = ?",
+                (str(deal_id), agent_key),
+            ).fetchone()
+        if not row:
+            return None
+        return {"fingerprint": row[0], "report": json.loads(row[1]), "created_at": row[2]}
+
+    def put(self, deal_id, agent_key, fingerprint, report):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO specialist_reports (deal_id, agent, fingerprint, report, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (str(deal_id), agent_key, fingerprint, json.dumps(report), time.time()),
+            )
+            self._db.commit()
+
+    def clear(self, deal_id):
+        with self._lock:
+            self._db.execute("DELETE FROM specialist_reports WHERE deal_id = ?", (str(deal_id),))
+            self._db.commit()
+
+
+def specialist_report_store_from_env():
+    """Returns the store configured by SPECIALIST_REPORT_STORE_PATH, or None if reuse is off."""
+    if not SPECIALIST_REPORT_REUSE:
+        return None
+    store_path = os.getenv("SPECIALIST_REPORT_STORE_PATH")
+    return SQLiteSpecialistReportStore(store_path) if store_path else InMemorySpecialistReportStore()
+
+
+def reusable_report(store, deal_id, agent_key, agent, fingerprint):
+    """Returns the stored report for an agent if its inputs are unchanged and it is fresh enough."""
+    if store is None or not deal_id:
+        return None
+    record = store.get(deal_id, agent_key)
+    if not record or record["fingerprint"] != fingerprint:
+        return None
+    # Reports that depend on live web research go stale on their own.
+    if not agent.cache_responses and time.time() - record["created_at"] > SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS:
+        return None
+    return record["report"]
@@ -0,0 +1,383 @@
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app.services.prompt_builder import count_tokens
+
+# Request tracing and metrics. Every analysis request is traced as a tree of
+# spans (request -> steps such as the router, specialists and synthesis ->
+# agents -> LLM and tool calls) carried in a context variable, so work
+# submitted to the shared pools through submit() joins the right tree.
+# Finished LLM calls, tool calls and requests also feed the process-wide
+# metrics exposed in Prometheus text format at /metrics.
+#
+# The SDK in use does not report token usage, so token counts are estimated
+# from text length unless a response carries usage_metadata. Costs are only
+# computed for models listed in LLM_TOKEN_PRICES, a JSON object mapping a
+# model name to [USD per million prompt tokens, USD per million response
+# tokens].
+TELEMETRY_LOG_TRACES = os.getenv("TELEMETRY_LOG_TRACES", "false").lower() == "true"
+LLM_TOKEN_PRICES = json.loads(os.getenv("LLM_TOKEN_PRICES", "{}"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 240)
+
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+
+
+class Counter:
+    """A monotonically increasing metric, one series per label combination."""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, one series per label combination."""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in self._series.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", dict(labels, le=f"{bound:g}"), cumulative))
+                samples.append((f"{self.name}_bucket", dict(labels, le="+Inf"), series["count"]))
+                samples.append((f"{self.name}_sum", labels, series["sum"]))
+                samples.append((f"{self.name}_count", labels, series["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """The process's metrics, rendered in the Prometheus text exposition format."""
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f"{name}{{{rendered}}} {value:g}" if rendered else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter("lvx_requests_total", "Analysis requests handled.", ("action", "status"))
+REQUEST_LATENCY = metrics.histogram("lvx_request_latency_seconds", "Analysis request latency.", ("action",))
+AGENT_LATENCY = metrics.histogram("lvx_agent_latency_seconds", "Specialist agent run latency.", ("agent",))
+LLM_CALLS = metrics.counter("lvx_llm_calls_total", "LLM generations.", ("agent", "action", "status"))
+LLM_LATENCY = metrics.histogram("lvx_llm_latency_seconds", "LLM generation latency, tool calls included.",
+                                ("agent", "action"))
+LLM_CACHE_HITS = metrics.counter("lvx_llm_cache_hits_total", "LLM responses served from cache.", ("agent",))
+LLM_PROMPT_TOKENS = metrics.counter("lvx_llm_prompt_tokens_total", "Prompt tokens sent.", ("agent", "model"))
+LLM_RESPONSE_TOKENS = metrics.counter("lvx_llm_response_tokens_total", "Response tokens received.",
+                                      ("agent", "model"))
+LLM_COST = metrics.counter("lvx_llm_cost_usd_total", "Estimated LLM cost in USD.", ("agent", "model"))
+LLM_RETRIES = metrics.counter("lvx_llm_retries_total", "LLM calls retried after a retryable error.",
+                              ("model", "reason"))
+LLM_QUEUE_WAIT = metrics.histogram("lvx_llm_queue_wait_seconds", "Time LLM calls waited for client-side quota.",
+                                   ("model", "lane"), buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 120))
+LLM_CIRCUIT_OPENS = metrics.counter("lvx_llm_circuit_opens_total", "Times an LLM circuit breaker opened.",
+                                    ("model",))
+MODEL_TIER_LATENCY = metrics.histogram("lvx_model_tier_latency_seconds", "Model round-trip latency per tier.",
+                                       ("tier", "model"))
+MODEL_HEDGES = metrics.counter("lvx_model_hedges_total", "Hedged model calls fired and won by the backup.",
+                               ("tier", "outcome"))
+SINGLE_FLIGHT_SHARED = metrics.counter("lvx_single_flight_shared_total",
+                                       "Calls that joined identical work already in flight.", ("kind",))
+TOOL_CALLS = metrics.counter("lvx_tool_calls_total", "Tool calls executed.", ("tool", "status"))
+TOOL_LATENCY = metrics.histogram("lvx_tool_latency_seconds", "Tool call latency.", ("tool",))
+
+
+class Span:
+    """One timed unit of work in a request's trace, with attributes and child spans."""
+    def __init__(self, name, kind, attributes, parent=None):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.parent = parent
+        self.children = []
+        self.error = None
+        self.started = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def to_dict(self):
+        with self._lock:
+            children = list(self.children)
+            span = {"name": self.name, "kind": self.kind, **self.attributes}
+        # Spans still running (e.g. a specialist past its deadline) report
+        # the time so far.
+        duration = self.duration if self.duration is not None else time.perf_counter() - self.started
+        span["duration_ms"] = round(duration * 1000, 1)
+        if self.error:
+            span["error"] = self.error
+        if children:
+            span["children"] = [child.to_dict() for child in children]
+        return span
+
+    def summary(self):
+        """Totals over the whole tree: LLM and tool calls, tokens, cost and time per step."""
+        totals = {"llm_calls": 0, "llm_cache_hits": 0, "llm_errors": 0, "tool_calls": 0,
+                  "prompt_tokens": 0, "response_tokens": 0, "cost_usd": 0.0}
+        for span in self._walk():
+            if span.kind == "llm":
+                key = "llm_cache_hits" if span.attributes.get("cache_hit") else "llm_calls"
+                totals[key] += 1
+                totals["llm_errors"] += 1 if span.error else 0
+                totals["prompt_tokens"] += span.attributes.get("prompt_tokens", 0)
+                totals["response_tokens"] += span.attributes.get("response_tokens", 0)
+                totals["cost_usd"] += span.attributes.get("cost_usd", 0.0)
+            elif span.kind == "tool":
+                totals["tool_calls"] += 1
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        tree = self.to_dict()
+        return {
+            "total_ms": tree["duration_ms"],
+            "steps": {child["name"]: child["duration_ms"] for child in tree.get("children", [])},
+            **totals,
+            "trace": tree,
+        }
+
+    def _walk(self):
+        yield self
+        with self._lock:
+            children = list(self.children)
+        for child in children:
+            yield from child._walk()
+
+
+def current_span():
+    """Returns the innermost active span, or None outside a traced request."""
+    return _current_span.get()
+
+
+def current_action():
+    """The step or agent the current work belongs to, used to label LLM metrics."""
+    span = _current_span.get()
+    while span is not None:
+        if span.kind in ("step", "agent"):
+            return span.name
+        span = span.parent
+    return "other"
+
+
+@contextmanager
+def span(name, kind="step", activate=True, on_finish=None, **attributes):
+    """
+    Times a block as a child of the current span, calling on_finish(span)
+    once it has ended. With activate=False the span is recorded but does
+    not become the current one, for use in generators, which may be
+    resumed or closed from another context.
+    """
+    parent = _current_span.get()
+    new_span = Span(name, kind, attributes, parent)
+    if parent is not None:
+        with parent._lock:
+            parent.children.append(new_span)
+    token = _current_span.set(new_span) if activate else None
+    try:
+        yield new_span
+    except Exception as e:
+        new_span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        new_span.finish()
+        if token is not None:
+            _current_span.reset(token)
+        if on_finish is not None:
+            on_finish(new_span)
+
+
+def traced(name):
+    """Decorator that runs a method inside a step span called `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace_request(name, **attributes):
+    """
+    Starts a request's trace. Set the `action` attribute on it once known;
+    it labels the request metrics.
+    """
+    token = _current_span.set(None)
+    try:
+        with span(name, kind="request", on_finish=_finish_request, **attributes) as root:
+            yield root
+    finally:
+        _current_span.reset(token)
+
+
+def _finish_request(root):
+    action = root.attributes.get("action", "unknown")
+    REQUESTS.inc(action=action, status="error" if root.error else "ok")
+    REQUEST_LATENCY.observe(root.duration, action=action)
+    if TELEMETRY_LOG_TRACES:
+        print(json.dumps({"trace": root.summary()}, default=str))
+
+
+def set_request_attributes(**attributes):
+    """Sets attributes on the current request's root span, if there is one."""
+    span = _current_span.get()
+    while span is not None and span.kind != "request":
+        span = span.parent
+    if span is not None:
+        span.set(**attributes)
+
+
+def submit(pool, function, *args, **kwargs):
+    """Submits work to a thread pool inside a copy of the caller's context, so it joins the trace."""
+    return pool.submit(contextvars.copy_context().run, function, *args, **kwargs)
+
+
+def agent_run(agent_key):
+    """Traces one specialist's run."""
+    return span(agent_key, kind="agent",
+                on_finish=lambda agent_span: AGENT_LATENCY.observe(agent_span.duration, agent=agent_key))
+
+
+def llm_call(agent_name, model, prompt, activate=True):
+    """
+    Traces one LLM generation, including any tool calls it makes. Set
+    `error` on the yielded span when the call fails without raising, and
+    pass the final text to record_response_text().
+    """
+    return span("llm", kind="llm", activate=activate, on_finish=_finish_llm_call, agent=agent_name,
+                model=model, action=current_action(), prompt_tokens=count_tokens(prompt),
+                response_tokens=0, model_calls=0, tool_calls=0)
+
+
+def _finish_llm_call(call):
+    agent, model, action = call.attributes["agent"], call.attributes["model"], call.attributes["action"]
+    LLM_CALLS.inc(agent=agent, action=action, status="error" if call.error else "ok")
+    LLM_LATENCY.observe(call.duration, agent=agent, action=action)
+    prompt_tokens, response_tokens = call.attributes["prompt_tokens"], call.attributes["response_tokens"]
+    LLM_PROMPT_TOKENS.inc(prompt_tokens, agent=agent, model=model)
+    LLM_RESPONSE_TOKENS.inc(response_tokens, agent=agent, model=model)
+    price = LLM_TOKEN_PRICES.get(model)
+    if price:
+        cost = (prompt_tokens * price[0] + response_tokens * price[1]) / 1_000_000
+        call.set(cost_usd=round(cost, 6))
+        LLM_COST.inc(cost, agent=agent, model=model)
+
+
+def record_model_response(response):
+    """
+    Counts one model round trip on the current LLM span, using the token
+    usage the response reports when there is one.
+    """
+    call = _current_span.get()
+    if call is None or call.kind != "llm":
+        return
+    call.add("model_calls")
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    if isinstance(prompt_tokens, int) and isinstance(response_tokens, int):
+        if not call.attributes.get("usage_reported"):
+            call.set(usage_reported=True, prompt_tokens=0, response_tokens=0)
+        call.add("prompt_tokens", prompt_tokens)
+        call.add("response_tokens", response_tokens)
+
+
+def record_response_text(call, text):
+    """Estimates the response tokens of an LLM span from its text if the model did not report them."""
+    if not call.attributes.get("usage_reported"):
+        call.set(response_tokens=count_tokens(text or ""))
+
+
+def record_cache_hit(agent_name):
+    """Records an LLM response served from the response cache."""
+    LLM_CACHE_HITS.inc(agent=agent_name)
+    with span("llm", kind="llm", agent=agent_name, action=current_action(), cache_hit=True):
+        pass
+
+
+def tool_call(name):
+    """Traces one tool call."""
+    parent = _current_span.get()
+    if parent is not None and parent.kind == "llm":
+        parent.add("tool_calls")
+    return span(name, kind="tool", on_finish=_finish_tool_call)
+
+
+def _finish_tool_call(call):
+    TOOL_CALLS.inc(tool=call.name, status="error" if call.error else "ok")
+    TOOL_LATENCY.observe(call.duration, tool=call.name)
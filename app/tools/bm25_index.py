@@ -0,0 +1,77 @@
+import math
+import re
+from collections import Counter, defaultdict
+import numpy as np
+from app.tools.vector_index import top_k
+
+# Keeps figures and identifiers together: "$1.2m" -> "1.2m", "US10,234,567"
+# -> "us10,234,567", so exact-match queries on them can hit.
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*[a-z]*")
+_STOPWORDS = frozenset(
+    "a an the is are was were be been of to in on for and or with this that these those it its "
+    "their they them do does did what who how which by at as from".split()
+)
+
+
+def tokenize(text):
+    """Lowercases and splits text into search terms, dropping stopwords."""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Compact in-memory BM25 index over the rows of a VectorIndex. Each term
+    maps to an array of rows and the precomputed BM25 weight of the term in
+    each row, so a query is a handful of vectorised scatter-adds.
+    """
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        term_rows = defaultdict(list)
+        term_counts = defaultdict(list)
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text or ""))
+            lengths[row] = sum(counts.values())
+            for term, count in counts.items():
+                term_rows[term].append(row)
+                term_counts[term].append(count)
+
+        average_length = float(lengths.mean()) if self.size else 0.0
+        norms = k1 * (1 - b + b * lengths / (average_length or 1.0))
+        self.postings = {}
+        for term, rows in term_rows.items():
+            rows = np.asarray(rows, dtype=np.int64)
+            counts = np.asarray(term_counts[term], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5))
+            weights = idf * counts * (k1 + 1) / (counts + norms[rows])
+            self.postings[term] = (rows, weights.astype(np.float32))
+
+    @classmethod
+    def from_index(cls, index):
+        """Builds a BM25 index over the 'text' metadata of a VectorIndex."""
+        return cls([metadata.get("text", "") for metadata in index.metadata])
+
+    def __len__(self):
+        return self.size
+
+    def search(self, query, k=5, rows=None):
+        """
+        Returns up to k (row, score) pairs, best first. `rows`, if given,
+        restricts the results to those rows (e.g. one deal's chunks).
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        if rows is not None:
+            candidates = np.asarray(rows, dtype=np.int64)
+            candidates = candidates[scores[candidates] > 0]
+        else:
+            candidates = np.flatnonzero(scores)
+        if len(candidates) == 0:
+            return []
+        candidate_scores = scores[candidates]
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in top_k(candidate_scores, k)]
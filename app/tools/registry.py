@@ -0,0 +1,51 @@
+import inspect
+
+
+class UnknownToolError(KeyError):
+    """Raised when the model calls a tool that is not registered."""
+
+
+class ToolRegistry:
+    """
+    Explicit name -> function mapping for the tools an agent advertises to
+    the model. Calls are resolved here rather than through globals(), so a
+    model can only ever invoke the functions it was given.
+    """
+    def __init__(self, tools=None):
+        self._tools = {}
+        for tool in tools or []:
+            self.register(tool)
+
+    def register(self, function, name=None):
+        """Registers a tool under its function name (or `name`) and returns it."""
+        self._tools[name or function.__name__] = (function, inspect.signature(function))
+        return function
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def __len__(self):
+        return len(self._tools)
+
+    def names(self):
+        """Returns the registered tool names."""
+        return sorted(self._tools)
+
+    def call(self, name, args):
+        """
+        Calls a tool with model-supplied arguments. Unknown arguments are
+        dropped, and numbers are converted to the annotated type, since the
+        API sends every number as a float.
+        """
+        if name not in self._tools:
+            raise UnknownToolError(name)
+        function, signature = self._tools[name]
+        kwargs = {}
+        for key, value in args.items():
+            parameter = signature.parameters.get(key)
+            if parameter is None:
+                continue
+            if parameter.annotation is int and isinstance(value, float):
+                value = int(value)
+            kwargs[key] = value
+        return function(**kwargs)
@@ -0,0 +1,116 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import google.ai.generativelanguage as glm
+from app.services import telemetry
+from app.services.model_policy import generate
+from app.tools.registry import ToolRegistry, UnknownToolError
+
+# Bounds on one tool-using generation: at most TOOL_MAX_STEPS rounds of tool
+# calls and TOOL_TIME_BUDGET_SECONDS of wall-clock time. When either runs
+# out, the model is asked to answer with what it has, with tools disabled.
+TOOL_MAX_STEPS = int(os.getenv("TOOL_MAX_STEPS", "6"))
+TOOL_TIME_BUDGET_SECONDS = float(os.getenv("TOOL_TIME_BUDGET_SECONDS", "90"))
+
+# Shared by every agent in the worker to run the function calls of a single
+# model response concurrently.
+_tool_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_MAX_WORKERS", "8")),
+    thread_name_prefix="tool-call",
+)
+
+_NO_TOOLS = {"function_calling_config": {"mode": "NONE"}}
+_BUDGET_EXHAUSTED = "Tool budget exhausted. Answer now using only the information gathered so far."
+
+
+class ToolRuntime:
+    """
+    Drives a tool-using conversation with the model. The full conversation
+    is resent on every step, every function call in a response is executed
+    (concurrently), and identical calls within one run are answered from
+    a memo instead of being executed again. Every model call goes through
+    the model's shared rate limiter and its tier's timeout and hedging.
+    """
+    def __init__(self, registry, max_steps=TOOL_MAX_STEPS, time_budget_seconds=TOOL_TIME_BUDGET_SECONDS,
+                 agent_name="agent"):
+        self.registry = registry if isinstance(registry, ToolRegistry) else ToolRegistry(registry)
+        self.max_steps = max_steps
+        self.time_budget_seconds = time_budget_seconds
+        self.agent_name = agent_name
+
+    def run(self, model, prompt, tier=None):
+        """Returns the model's final response to `prompt`, each step timed out and hedged per `tier`."""
+        started = time.monotonic()
+        contents = [glm.Content(role="user", parts=[glm.Part(text=prompt)])]
+        memo = {}
+        response = generate(model, contents, tier=tier)
+        telemetry.record_model_response(response)
+
+        for step in range(self.max_steps + 1):
+            calls = _function_calls(response)
+            if not calls:
+                return response
+            contents.append(response.candidates[0].content)
+            if step == self.max_steps or time.monotonic() - started > self.time_budget_seconds:
+                print(f"--- AGENT: {self.agent_name} hit its tool budget after {step} steps; "
+                      f"asking for a final answer ---")
+                contents.append(glm.Content(role="user", parts=[
+                    *[_function_response(name, {"error": "Tool budget exhausted."}) for name, _ in calls],
+                    glm.Part(text=_BUDGET_EXHAUSTED),
+                ]))
+                response = generate(model, contents, tier=tier, tool_config=_NO_TOOLS)
+                telemetry.record_model_response(response)
+                return response
+
+            results = self._execute(calls, memo, deadline=started + self.time_budget_seconds)
+            contents.append(glm.Content(role="user", parts=[
+                _function_response(name, result) for (name, _), result in zip(calls, results)
+            ]))
+            response = generate(model, contents, tier=tier)
+            telemetry.record_model_response(response)
+
+    def _execute(self, calls, memo, deadline):
+        keys = [(name, json.dumps(args, sort_keys=True, default=str)) for name, args in calls]
+        futures = {}
+        for key, (name, args) in zip(keys, calls):
+            if key in memo:
+                print(f"--- AGENT: {self.agent_name} reused the result of TOOL: {name} with args: {args} ---")
+            elif key not in futures:
+                print(f"--- AGENT: {self.agent_name} is calling TOOL: {name} with args: {args} ---")
+                futures[key] = telemetry.submit(_tool_pool, self._call, name, args)
+        for key, future in futures.items():
+            try:
+                memo[key] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                print(f"--- TOOL TIMED OUT: {key[0]} ---")
+                memo[key] = {"error": f"Tool '{key[0]}' did not finish within the time budget."}
+        return [memo[key] for key in keys]
+
+    def _call(self, name, args):
+        with telemetry.tool_call(name) as call:
+            try:
+                result = self.registry.call(name, args)
+            except UnknownToolError:
+                print(f"--- TOOL NOT FOUND: {name} ---")
+                call.error = "UnknownToolError"
+                return {"error": f"Tool '{name}' not found."}
+            except Exception as e:
+                print(f"--- TOOL FAILED: {name}: {e} ---")
+                call.error = f"{type(e).__name__}: {e}"
+                return {"error": f"Tool '{name}' failed: {e}"}
+            return result if isinstance(result, dict) else {"content": result}
+
+
+def _function_calls(response):
+    """Returns [(name, args)] for every function call part in a response."""
+    calls = []
+    for part in response.candidates[0].content.parts:
+        function_call = part.function_call
+        if function_call and function_call.name:
+            calls.append((function_call.name, type(function_call).to_dict(function_call).get("args") or {}))
+    return calls
+
+
+def _function_response(name, response):
+    return glm.Part(function_response=glm.FunctionResponse(name=name, response=response))
@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import numpy as np
+
+# Corpora at or above this size get an inverted-file (IVF) partitioning, so a
+# query scores only the vectors in the `nprobe` closest partitions.
+IVF_MIN_VECTORS = int(os.getenv("VECTOR_INDEX_IVF_MIN_VECTORS", "20000"))
+
+# Metadata fields with an inverted index, so a filtered search only scores
+# the matching rows. Filters on any other field are rejected.
+FILTER_FIELDS = ("deal_id", "startup_id", "document_type")
+
+
+def normalize(vectors):
+    """Scales vectors to unit length so a dot product is cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores, k):
+    """Returns the indices of the k highest scores, best first, in O(n)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def _save_array(path, array):
+    # Other processes may have the current file memory-mapped, so write a new
+    # file and swap it in rather than truncating the one they are reading.
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+class VectorIndex:
+    """
+    Dense in-process vector index. Vectors are stored L2-normalized in one
+    float32 matrix, so a search is a single matrix-vector product followed by
+    an argpartition top-k. Large corpora can additionally be partitioned with
+    k-means (IVF). Indexes are saved as .npy files and loaded memory-mapped,
+    which makes startup cost independent of corpus size.
+    """
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+        self.ids = []
+        self.metadata = []
+        self._rows = {}
+        self.centroids = None
+        self.assignments = None
+        self._lists = None
+        self._postings = None
+        self._pages = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def upsert(self, ids, vectors, metadata=None):
+        """Adds vectors, replacing any existing entries with the same ids."""
+        vectors = normalize(vectors)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}.")
+        metadata = metadata or [{} for _ in ids]
+        with self._lock:
+            existing = [i for i in ids if i in self._rows]
+            if existing:
+                self._delete_rows([self._rows[i] for i in existing])
+            self.vectors = np.vstack([self.vectors, vectors])
+            self.ids.extend(ids)
+            self.metadata.extend(metadata)
+            self._reindex_rows()
+            self._invalidate_partitions()
+
+    def delete(self, ids):
+        """Removes entries by id. Unknown ids are ignored."""
+        with self._lock:
+            rows = [self._rows[i] for i in ids if i in self._rows]
+            if rows:
+                self._delete_rows(rows)
+                self._reindex_rows()
+                self._invalidate_partitions()
+
+    def _delete_rows(self, rows):
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[rows] = False
+        self.vectors = np.asarray(self.vectors)[keep]
+        self.ids = [i for i, kept in zip(self.ids, keep) if kept]
+        self.metadata = [m for m, kept in zip(self.metadata, keep) if kept]
+
+    def _reindex_rows(self):
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._postings = None
+        self._pages = None
+
+    def _metadata_index(self):
+        # Built lazily and dropped on every write: field -> value -> sorted rows.
+        if self._postings is None:
+            postings = {field: {} for field in FILTER_FIELDS}
+            pages = np.zeros(len(self.ids), dtype=np.int32)
+            for row, metadata in enumerate(self.metadata):
+                for field in FILTER_FIELDS:
+                    value = metadata.get(field)
+                    if value is not None:
+                        postings[field].setdefault(str(value), []).append(row)
+                pages[row] = metadata.get("page") or 0
+            self._postings = {
+                field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+                for field, values in postings.items()
+            }
+            self._pages = pages
+        return self._postings, self._pages
+
+    def filter_rows(self, filters):
+        """
+        Returns the rows matching every filter, as a sorted array. Supported
+        filters are the FILTER_FIELDS (exact match) plus `page_start` and
+        `page_end` (inclusive page range).
+        """
+        postings, pages = self._metadata_index()
+        rows = None
+        for field, value in filters.items():
+            if field in ("page_start", "page_end"):
+                continue
+            if field not in postings:
+                raise ValueError(f"Cannot filter on '{field}'; filterable fields are {FILTER_FIELDS}.")
+            matches = postings[field].get(str(value), np.empty(0, dtype=np.int64))
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(self.ids))
+        if filters.get("page_start") is not None:
+            rows = rows[pages[rows] >= filters["page_start"]]
+        if filters.get("page_end") is not None:
+            rows = rows[pages[rows] <= filters["page_end"]]
+        return rows
+
+    def _invalidate_partitions(self):
+        self.centroids = None
+        self.assignments = None
+        self._lists = None
+
+    def build_partitions(self, num_lists=None, iterations=10, seed=0):
+        """Clusters the vectors into `num_lists` IVF partitions with spherical k-means."""
+        count = len(self.ids)
+        if count == 0:
+            return
+        num_lists = num_lists or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+        vectors = np.asarray(self.vectors)
+        centroids = vectors[rng.choice(count, size=min(num_lists, count), replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for list_id in range(len(centroids)):
+                members = vectors[assignments == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+            centroids = normalize(centroids)
+        self.centroids = centroids
+        self.assignments = np.argmax(vectors @ centroids.T, axis=1)
+        self._lists = None
+
+    def ensure_partitions(self):
+        """Builds IVF partitions if the corpus is large enough and they are missing."""
+        if self.centroids is None and len(self.ids) >= IVF_MIN_VECTORS:
+            self.build_partitions()
+
+    def _partition_lists(self):
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def search(self, query_vector, k=5, nprobe=8, filters=None):
+        """
+        Returns up to k (row, cosine similarity) pairs for the query, best
+        first. With `filters` (see filter_rows) only the matching rows are
+        scored; otherwise the IVF partitions are used when they have been
+        built.
+        """
+        if not self.ids:
+            return []
+        query = normalize(query_vector)[0]
+        if filters:
+            # A deal's chunks are a small slice of the corpus, so scoring
+            # them exactly is cheaper than probing partitions.
+            candidates = self.filter_rows(filters)
+            scores = np.asarray(self.vectors[candidates]) @ query
+            return [(int(candidates[i]), float(scores[i])) for i in top_k(scores, k)]
+        if self.centroids is not None:
+            probes = top_k(self.centroids @ query, nprobe)
+            lists = self._partition_lists()
+            candidates = np.concatenate([lists[p] for p in probes])
+            if len(candidates) >= k:
+                scores = np.asarray(self.vectors[candidates]) @ query
+                best = top_k(scores, k)
+                return [(int(candidates[i]), float(scores[i])) for i in best]
+
+        scores = np.asarray(self.vectors) @ query
+        return [(int(i), float(scores[i])) for i in top_k(scores, k)]
+
+    def save(self, directory):
+        """Writes the index to `directory` as .npy matrices plus a JSON manifest."""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            _save_array(os.path.join(directory, "vectors.npy"), np.asarray(self.vectors))
+            if self.centroids is not None:
+                _save_array(os.path.join(directory, "centroids.npy"), self.centroids)
+                _save_array(os.path.join(directory, "assignments.npy"), self.assignments)
+            else:
+                for name in ("centroids.npy", "assignments.npy"):
+                    path = os.path.join(directory, name)
+                    if os.path.exists(path):
+                        os.remove(path)
+            manifest_path = os.path.join(directory, "manifest.json")
+            with open(manifest_path + ".tmp", "w") as f:
+                json.dump({"dimension": self.dimension, "ids": self.ids, "metadata": self.metadata}, f)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Loads an index saved with save(); vectors are memory-mapped by default."""
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        index = cls(manifest["dimension"])
+        mmap_mode = "r" if mmap else None
+        index.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mmap_mode)
+        index.ids = manifest["ids"]
+        index.metadata = manifest["metadata"]
+        index._reindex_rows()
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+            index.assignments = np.load(os.path.join(directory, "assignments.npy"))
+        return index
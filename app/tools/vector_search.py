@@ -1,11 +1,223 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.embedding_service import embed_query
+from app.tools.bm25_index import BM25Index
+from app.tools.vector_index import VectorIndex, normalize
 
-def vector_search(query: str, num_neighbors: int = 5) -> dict:
+# Backend for the vector_search tool, chosen with VECTOR_SEARCH_BACKEND:
+#   local  - in-process VectorIndex saved under VECTOR_INDEX_DIR (default)
+#   vertex - a deployed Vertex AI Vector Search endpoint (GOOGLE_CLOUD_PROJECT,
+#            VECTOR_SEARCH_REGION, VECTOR_SEARCH_ENDPOINT_ID and
+#            VECTOR_SEARCH_DEPLOYED_INDEX_ID)
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "local").lower()
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+
+# The local backend ranks chunks with the dense index, a BM25 index over the
+# same chunks, or both merged with reciprocal-rank fusion (the default).
+# Exact figures and names (ARR, patent numbers, competitors) are where BM25
+# beats embeddings; the weights tune the blend.
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "hybrid").lower()
+RRF_K = int(os.getenv("VECTOR_SEARCH_RRF_K", "60"))
+DENSE_WEIGHT = float(os.getenv("VECTOR_SEARCH_DENSE_WEIGHT", "1.0"))
+LEXICAL_WEIGHT = float(os.getenv("VECTOR_SEARCH_LEXICAL_WEIGHT", "1.0"))
+# Each ranker contributes this many candidates per requested result.
+CANDIDATES_PER_RESULT = 4
+
+_index = None
+_lexical_index = None
+_index_version = None
+_index_lock = threading.Lock()
+_endpoint = None
+# Embedding the query is a network call, so the dense side runs here while
+# the BM25 side runs on the calling thread.
+_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vector-search")
+
+
+def load_index(directory=None):
+    """
+    Returns the local index, loading it (memory-mapped) on first use along
+    with its BM25 index. Returns None if no index has been built yet.
+    """
+    global _index, _lexical_index, _index_version
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                directory = directory or VECTOR_INDEX_DIR
+                if not os.path.exists(os.path.join(directory, "manifest.json")):
+                    print(f"--- No vector index found in '{directory}'. ---")
+                    return None
+                started = time.perf_counter()
+                index = VectorIndex.load(directory)
+                _lexical_index = BM25Index.from_index(index)
+                _index_version = saved_index_version(directory)
+                _index = index
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                print(f"--- Vector index loaded: {len(_index)} chunks in {elapsed_ms:.1f}ms ---")
+    return _index
+
+
+def set_index(index, version=None):
+    """
+    Replaces the in-process index, e.g. after ingesting new documents.
+    `version` identifies its contents (see index_version); by default a
+    new one is made up.
+    """
+    global _index, _lexical_index, _index_version
+    with _index_lock:
+        _lexical_index = BM25Index.from_index(index) if index is not None else None
+        _index_version = version or (f"set:{time.time_ns()}" if index is not None else None)
+        _index = index
+
+
+def saved_index_version(directory):
+    """The modification time of a saved index's manifest, or "none" if there is no index."""
+    try:
+        return str(os.stat(os.path.join(directory, "manifest.json")).st_mtime_ns)
+    except OSError:
+        return "none"
+
+
+def index_version():
+    """
+    Returns a string that changes whenever the searched documents change, so
+    cached responses and reports built from search results are not reused
+    after a re-ingestion. The remote backend's version is set with
+    VECTOR_SEARCH_INDEX_VERSION when a new index is deployed.
     """
-    This function is currently disabled. It would normally perform a vector search.
+    if VECTOR_SEARCH_BACKEND == "vertex":
+        return os.getenv("VECTOR_SEARCH_INDEX_VERSION", "vertex")
+    return _index_version or saved_index_version(VECTOR_INDEX_DIR)
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=RRF_K):
+    """
+    Merges ranked lists of rows into one list of (row, score), best first.
+    A row scores sum(weight / (k + rank)) over the lists it appears in.
     """
-    print(f"--- Vector Search Tool is disabled. Returning empty results for query: {query} ---")
-    
-    # Return an empty list of results as the functionality is disabled
-    return {
-        "search_results": []
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, row in enumerate(ranking, start=1):
+            scores[row] = scores.get(row, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _dense_search(index, embed, query, depth, filters):
+    query_vector = normalize(embed(query))[0]
+    return query_vector, index.search(query_vector, k=depth, filters=filters)
+
+
+def hybrid_search(index, lexical_index, query, num_neighbors, filters=None, mode=None,
+                  embed=None):
+    """
+    Ranks the rows of `index` for a query and returns [(row, score,
+    cosine similarity or None)], best first. Used by vector_search and by
+    the retrieval benchmark.
+    """
+    mode = mode or VECTOR_SEARCH_MODE
+    embed = embed or embed_query
+    depth = num_neighbors * CANDIDATES_PER_RESULT if mode == "hybrid" else num_neighbors
+    rows = index.filter_rows(filters) if filters else None
+
+    dense_future = None
+    if mode in ("hybrid", "dense"):
+        dense_future = _search_pool.submit(_dense_search, index, embed, query, depth, filters)
+    lexical = lexical_index.search(query, k=depth, rows=rows) if mode in ("hybrid", "lexical") else []
+    query_vector, dense = dense_future.result() if dense_future else (None, [])
+
+    if mode == "dense":
+        return [(row, score, score) for row, score in dense]
+    if mode == "lexical":
+        return [(row, score, None) for row, score in lexical]
+
+    similarities = dict(dense)
+    fused = reciprocal_rank_fusion(
+        [[row for row, _ in dense], [row for row, _ in lexical]], [DENSE_WEIGHT, LEXICAL_WEIGHT]
+    )[:num_neighbors]
+    results = []
+    for row, score in fused:
+        similarity = similarities.get(row)
+        if similarity is None:
+            similarity = float(index.vectors[row] @ query_vector)
+        results.append((row, score, similarity))
+    return results
+
+
+def _search_local(query, num_neighbors, filters):
+    index = load_index()
+    lexical_index = _lexical_index
+    if index is None or len(index) == 0:
+        return []
+    results = []
+    for row, score, similarity in hybrid_search(index, lexical_index, query, num_neighbors, filters):
+        metadata = dict(index.metadata[row])
+        results.append({
+            "id": index.ids[row],
+            "distance": 1.0 - similarity if similarity is not None else None,
+            "score": score,
+            "data": metadata.pop("text", None),
+            **metadata,
+        })
+    return results
+
+
+def _search_vertex(query, num_neighbors, filters):
+    global _endpoint
+    from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import Namespace
+    if _endpoint is None:
+        from google.cloud import aiplatform
+        aiplatform.init(project=os.getenv("GOOGLE_CLOUD_PROJECT"), location=os.getenv("VECTOR_SEARCH_REGION"))
+        _endpoint = aiplatform.MatchingEngineIndexEndpoint(
+            index_endpoint_name=os.getenv("VECTOR_SEARCH_ENDPOINT_ID")
+        )
+    response = _endpoint.find_neighbors(
+        deployed_index_id=os.getenv("VECTOR_SEARCH_DEPLOYED_INDEX_ID", os.getenv("VECTOR_SEARCH_INDEX_ID")),
+        queries=[embed_query(query)],
+        num_neighbors=num_neighbors,
+        # Page ranges are not indexed as restricts on the remote index.
+        filter=[
+            Namespace(name, [str(value)], [])
+            for name, value in filters.items() if name not in ("page_start", "page_end")
+        ],
+    )
+    return [
+        {"id": neighbor.id, "distance": neighbor.distance, "data": None}
+        for neighbor in (response[0] if response else [])
+    ]
+
+
+def vector_search(query: str, num_neighbors: int = 5, deal_id: str = "", startup_id: str = "",
+                  document_type: str = "", page_start: int = 0, page_end: int = 0) -> dict:
+    """
+    Searches the internal document knowledge base (pitch decks, call
+    transcripts, market research) for passages relevant to the query.
+    Returns the closest passages, most relevant first.
+
+    Set deal_id (or startup_id) to search only that startup's documents.
+    document_type narrows to one kind of document (pitch_deck,
+    call_transcript, financials, market_research, other), and page_start /
+    page_end to a page range. Empty or zero values mean no filter.
+    """
+    filters = {
+        name: value for name, value in (
+            ("deal_id", deal_id), ("startup_id", startup_id), ("document_type", document_type),
+            ("page_start", page_start), ("page_end", page_end),
+        ) if value
     }
+    try:
+        if VECTOR_SEARCH_BACKEND == "vertex":
+            results = _search_vertex(query, num_neighbors, filters)
+        else:
+            results = _search_local(query, num_neighbors, filters)
+    except Exception as e:
+        print(f"--- Vector search failed for query '{query}': {e} ---")
+        return {"search_results": [], "error": str(e)}
+
+    print(f"--- Vector search returned {len(results)} results for query: {query} ---")
+    return {"search_results": results}
+
+
+# Lets agents key cached responses on the documents the tool searched.
+vector_search.cache_version = index_version
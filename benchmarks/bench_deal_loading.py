@@ -0,0 +1,62 @@
+"""
+Benchmarks deal loading against the in-memory Realtime Database fake.
+
+    python -m benchmarks.bench_deal_loading --deals 500 --latency-ms 40
+"""
+import argparse
+import statistics
+import time
+
+from app.services.deal_repository import DealRepository
+from benchmarks.fake_realtime_db import FakeRealtimeDB, seed_deals
+
+
+def serial_queries_load(db, deal_id):
+    """The previous loading strategy: three sequential order_by_child queries."""
+    deal = db.reference('deals').order_by_child('id').equal_to(str(deal_id)).get()
+    deal_info = dict(next(iter(deal.values())))
+    startup = db.reference('startups').order_by_child('id').equal_to(deal_info['startupId']).get()
+    deal_info.update(next(iter(startup.values())))
+    metrics = db.reference('keyMetrics').order_by_child('dealId').equal_to(str(deal_id)).get()
+    deal_info.update(next(iter(metrics.values())))
+    return deal_info
+
+
+def measure(label, db, load, deal_ids):
+    db.reset_counters()
+    timings = []
+    for deal_id in deal_ids:
+        started = time.perf_counter()
+        load(deal_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<38} mean {statistics.mean(timings):8.1f}ms  "
+          f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.1f}ms  "
+          f"round-trips/load {db.round_trips / len(deal_ids):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--deals', type=int, default=500)
+    parser.add_argument('--loads', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=40.0)
+    parser.add_argument('--scan-us-per-child', type=float, default=20.0)
+    args = parser.parse_args()
+
+    db = FakeRealtimeDB(
+        seed_deals(args.deals),
+        latency=args.latency_ms / 1000,
+        scan_latency_per_child=args.scan_us_per_child / 1e6,
+    )
+    deal_ids = [str(1 + (i * 7) % args.deals) for i in range(args.loads)]
+
+    print(f"{args.deals} deals, {args.latency_ms:.0f}ms round-trip, {args.loads} loads")
+    measure("serial queries (previous)", db, lambda deal_id: serial_queries_load(db, deal_id), deal_ids)
+
+    repository = DealRepository(db, index_path=None)
+    measure("repository, cold (query path)", db, repository.load, deal_ids)
+    measure("repository, warm (resolved keys)", db, repository.load, deal_ids)
+    measure("repository, id-to-key index", db, DealRepository(db, index_path='dealIndex').load, deal_ids)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Offline accuracy and latency benchmark for the local intent router.
+
+    python -m benchmarks.bench_intent_router [--threshold 0.3]
+
+Queries in benchmarks/data/router_queries.json are held out from the
+router's training examples. Queries the router declines are counted as
+LLM fallbacks, not errors.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import Counter
+
+from app.services.intent_router import INTENT_ROUTER_THRESHOLD, IntentRouter
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "data", "router_queries.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threshold', type=float, default=INTENT_ROUTER_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=200, help="timing repetitions per query")
+    parser.add_argument('--verbose', action='store_true', help="print every misrouted or deferred query")
+    args = parser.parse_args()
+
+    with open(QUERIES_PATH) as f:
+        queries = json.load(f)
+    router = IntentRouter(threshold=args.threshold)
+    previous_turn = [{"user": "Give me a full analysis.", "ai": "Here is the analysis..."}]
+
+    outcomes = Counter()
+    by_tier = Counter()
+    timings_us = []
+    for item in queries:
+        history = previous_turn if item.get("history") else []
+        decision = router.route(item["query"], history)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            router.route(item["query"], history)
+        timings_us.append((time.perf_counter() - started) / args.repeat * 1e6)
+
+        if decision is None:
+            outcomes["fallback"] += 1
+            if args.verbose:
+                print(f"  LLM     {item['query']!r} (expected {item['action']})")
+            continue
+        correct = decision.action == item["action"]
+        outcomes["correct" if correct else "wrong"] += 1
+        by_tier[(decision.tier, correct)] += 1
+        if args.verbose and not correct:
+            print(f"  WRONG   {item['query']!r} -> {decision.action} (expected {item['action']}, {decision.tier})")
+
+    total = len(queries)
+    routed = outcomes["correct"] + outcomes["wrong"]
+    print(f"{total} labelled queries, threshold {args.threshold}")
+    print(f"  routed locally      {routed / total:6.1%}  ({routed}/{total})")
+    print(f"  local accuracy      {outcomes['correct'] / max(routed, 1):6.1%}  ({outcomes['correct']}/{routed})")
+    for tier in ("rules", "classifier", "classifier+topic"):
+        right, wrong = by_tier[(tier, True)], by_tier[(tier, False)]
+        print(f"    {tier:<16}  {right}/{right + wrong} correct")
+    print(f"  LLM fallbacks       {outcomes['fallback'] / total:6.1%}  ({outcomes['fallback']}/{total})")
+    print(f"  latency per query   p50 {statistics.median(timings_us):.0f}us  "
+          f"p99 {sorted(timings_us)[max(0, int(len(timings_us) * 0.99) - 1)]:.0f}us")
+
+
+if __name__ == '__main__':
+    main()
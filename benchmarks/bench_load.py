@@ -0,0 +1,193 @@
+"""
+Offline load test of /api/v1/analyze with a fake Gemini and a fake Realtime Database.
+
+    python -m benchmarks.bench_load [--requests 40] [--concurrency 8] [--llm-latency-ms 50] [--json out.json]
+
+Drives the Flask app in-process under concurrent load, one phase per
+action type (direct answer, chat, single specialist, full analysis), and
+reports p50/p95/p99 latency, requests per second, model calls per request
+and memory for each. Every model call goes to a deterministic fake that
+sleeps for a simulated generation time, and the deal memo agent follows a
+scripted vector_search call against a small hash-embedded index, so no
+quota is spent and runs are comparable across commits. Requests cycle
+through distinct deals, so response caches and stored reports stay cold
+unless --deals is smaller than --requests.
+"""
+import os
+
+# Settings read at import time by the app's modules.
+os.environ.setdefault("FIREBASE_DATABASE_URL", "https://offline-benchmark.firebaseio.com")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("EMBEDDING_BACKEND", "hash")
+os.environ.setdefault("VECTOR_SEARCH_BACKEND", "local")
+# The fake model has no quota; leave client-side rate limiting off unless asked.
+os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("GEMINI_TOKENS_PER_MINUTE", "0")
+
+import argparse
+import contextlib
+import gc
+import json
+import re
+import resource
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+
+from benchmarks.fake_gemini import FakeModelFactory
+from benchmarks.fake_realtime_db import FakeRealtimeDB, seed_deals
+
+# (action, query) per phase. The queries are routed locally where the
+# intent router is confident; the fake model routes the rest.
+PHASES = [
+    ("direct_answer", "What is the burn rate?"),
+    ("chat", "Can you elaborate on that?"),
+    ("run_specific_agent", "Who are the main competitors?"),
+    ("run_all_agents", "Give me a full analysis of this startup."),
+]
+ROUTER_ACTIONS = {
+    "Can you elaborate on that?": "chat",
+}
+TOOL_SCRIPT = [[("vector_search", {"query": "annual recurring revenue and burn rate", "deal_id": "{deal_id}"})]]
+
+
+def route(prompt):
+    match = re.search(r'\*\*User Query:\*\* "(.*?)"', prompt)
+    return ROUTER_ACTIONS.get(match.group(1) if match else "", "chat")
+
+
+def build_index(num_deals, chunks_per_deal=8):
+    """Indexes a few synthetic document chunks per deal with the offline embedder."""
+    from app.services.embedding_service import embed_texts
+    from app.tools import vector_search
+    from app.tools.vector_index import VectorIndex
+
+    ids, texts, metadata = [], [], []
+    for deal in range(1, num_deals + 1):
+        for chunk in range(chunks_per_deal):
+            text = (f"Startup {deal} page {chunk + 1}: ARR of ${deal}00K, monthly burn rate of $50K, "
+                    f"customers in the mid market and a roadmap of integrations.")
+            ids.append(f"{deal}:{chunk}")
+            texts.append(text)
+            metadata.append({"text": text, "deal_id": str(deal), "document": "deck.pdf", "page": chunk + 1})
+    vectors = embed_texts(texts)
+    index = VectorIndex(vectors.shape[1])
+    index.upsert(ids, np.asarray(vectors), metadata)
+    vector_search.set_index(index)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * fraction)) - 1))]
+
+
+def run_phase(app, action, query, deal_ids, concurrency, factory):
+    """Sends one request per deal id, `concurrency` at a time, and summarizes the results."""
+    def send(deal_id):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(f'/api/v1/analyze/{deal_id}', json={"query": query, "timings": True})
+        elapsed = time.perf_counter() - started
+        body = response.get_json() or {}
+        actual = (body.get("timings") or {}).get("trace", {}).get("action")
+        return elapsed, response.status_code, actual
+
+    gc.collect()
+    tracemalloc.start()
+    calls_before = factory.calls
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, deal_ids))
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [elapsed * 1000 for elapsed, _, _ in results]
+    return {
+        "action": action,
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if status != 200),
+        "misrouted": sum(1 for _, status, actual in results if status == 200 and actual != action),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "rps": round(len(results) / wall, 2),
+        "model_calls_per_request": round((factory.calls - calls_before) / len(results), 2),
+        "peak_traced_mb": round(peak / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=40, help="requests per action type")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--deals', type=int, default=200)
+    parser.add_argument('--db-latency-ms', type=float, default=5.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=50.0, help="fixed cost of every model call")
+    parser.add_argument('--prompt-tokens-per-second', type=float, default=100_000)
+    parser.add_argument('--response-tokens-per-second', type=float, default=2_000)
+    parser.add_argument('--response-tokens', type=int, default=300)
+    parser.add_argument('--actions', nargs='*', default=[action for action, _ in PHASES])
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--verbose', action='store_true', help="show the app's own logging")
+    args = parser.parse_args()
+
+    factory = FakeModelFactory(
+        rules=[("You are an intelligent routing agent", route)],
+        tool_script=TOOL_SCRIPT,
+        latency=args.llm_latency_ms / 1000,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        response_tokens_per_second=args.response_tokens_per_second,
+        response_tokens=args.response_tokens,
+    )
+    db = FakeRealtimeDB(seed_deals(args.deals), latency=args.db_latency_ms / 1000)
+
+    # The app logs with print(); keep it out of the report unless asked.
+    devnull = open(os.devnull, 'w')
+    quiet = contextlib.nullcontext if args.verbose else (lambda: contextlib.redirect_stdout(devnull))
+
+    with patch('app.agents.base_agent.get_generative_model', factory):
+        with quiet():
+            from app import create_app
+            from app.agents.registry import get_analysis_agent
+            from app.services.deal_repository import DealRepository
+            from app.services.deal_snapshot_cache import DealSnapshotCache
+
+            app = create_app()
+            agent = get_analysis_agent()
+            agent.deal_repository = DealRepository(db, index_path='dealIndex')
+            agent.deal_snapshots = DealSnapshotCache.from_env(agent.deal_repository)
+            build_index(args.deals)
+
+        print(f"{args.requests} requests per action, concurrency {args.concurrency}, {args.deals} deals, "
+              f"model latency {args.llm_latency_ms:.0f}ms + {args.response_tokens} tokens at "
+              f"{args.response_tokens_per_second:.0f}/s, db round trip {args.db_latency_ms:.0f}ms")
+        print(f"  {'action':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>7} {'calls/req':>9} "
+              f"{'peak MB':>8} {'rss MB':>7} {'errors':>6}")
+        results = []
+        offset = 0
+        for action, query in PHASES:
+            if action not in args.actions:
+                continue
+            deal_ids = [str(1 + (offset + i) % args.deals) for i in range(args.requests)]
+            offset += args.requests
+            with quiet():
+                result = run_phase(app, action, query, deal_ids, args.concurrency, factory)
+            results.append(result)
+            print(f"  {action:<20} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+                  f"{result['p99_ms']:>7.1f}ms {result['rps']:>7.2f} {result['model_calls_per_request']:>9.2f} "
+                  f"{result['peak_traced_mb']:>8.2f} {result['max_rss_mb']:>7.1f} "
+                  f"{result['errors'] + result['misrouted']:>6}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Offline recall@k and latency benchmark for vector_search retrieval.
+
+    python -m benchmarks.bench_retrieval [--deals 200] [--k 5] [--dense-weight 1.0] [--lexical-weight 1.0]
+
+Builds a synthetic multi-deal corpus in which each deal has a few chunks
+carrying exact facts (ARR, burn rate, patent number, competitors) among
+generic filler, and asks for those facts both by exact terms and, within
+the deal, by paraphrase. Embeddings come from a local feature-hashing
+embedder, so no Gemini calls are made; it has no notion of synonyms, so
+paraphrase recall is far lower than with real embeddings, but the blend
+can be compared and tuned.
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from app.services.embedding_service import HashEmbeddingBackend
+from app.tools import vector_search
+from app.tools.bm25_index import BM25Index
+from app.tools.vector_index import VectorIndex
+
+FILLER = (
+    "The team iterated on onboarding and shipped a redesigned dashboard. Customer interviews highlighted "
+    "reporting needs. The go to market plan targets mid market finance teams through partnerships. Hiring "
+    "focuses on engineering and sales leadership. The product roadmap covers integrations and analytics. "
+    "Revenue growth depends on enterprise expansion. The burn multiple should improve next year. "
+    "Competitors are expanding into the segment. Recurring contracts renew annually"
+).split(". ")
+COMPETITORS = ["Zyphra", "Quantix", "Borealis", "Nimbly", "Caldera", "Vantora", "Ostrich", "Lumio"]
+
+
+def build_corpus(num_deals, filler_chunks, seed):
+    """Returns (ids, texts, metadata, queries). Each query is (text, deal_id, relevant id, kind)."""
+    rng = random.Random(seed)
+    ids, texts, metadata, queries = [], [], [], []
+
+    def add(deal_id, text, page):
+        chunk_id = f"{deal_id}:{len(ids)}"
+        ids.append(chunk_id)
+        texts.append(text)
+        metadata.append({"text": text, "deal_id": deal_id, "page": page, "document": "deck.pdf"})
+        return chunk_id
+
+    for deal in range(num_deals):
+        deal_id = str(deal)
+        name = f"Startup{deal}"
+        arr, burn = rng.randint(100, 9000), rng.randint(20, 900)
+        patent = f"US{rng.randint(10_000_000, 11_999_999)}"
+        competitors = rng.sample(COMPETITORS, 2)
+        for page in range(filler_chunks):
+            add(deal_id, ". ".join(rng.sample(FILLER, 3)) + f". {name} update.", page + 1)
+        finance = add(deal_id, f"{name} financials: ARR of ${arr}K with a monthly burn rate of ${burn}K.", 12)
+        ip = add(deal_id, f"{name} holds patent {patent} covering its ledger reconciliation engine.", 14)
+        market = add(deal_id, f"{name} competes with {competitors[0]} and {competitors[1]} in the mid market.", 9)
+        queries += [
+            (f"What is the ARR of {name}?", deal_id, finance, "exact"),
+            (f"burn rate {name}", deal_id, finance, "exact"),
+            (f"patent {patent}", deal_id, ip, "exact"),
+            (f"Does {name} compete with {competitors[0]}?", deal_id, market, "exact"),
+            # Paraphrases do not name the startup, so they are only
+            # answerable within the deal.
+            ("How much annual recurring revenue does the company make?", deal_id, finance, "paraphrase"),
+            ("What intellectual property protects the product?", deal_id, ip, "paraphrase"),
+            ("Who are the main rivals?", deal_id, market, "paraphrase"),
+        ]
+    return ids, texts, metadata, queries
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * fraction) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--deals', type=int, default=200)
+    parser.add_argument('--filler-chunks', type=int, default=20, help="generic chunks per deal")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--dense-weight', type=float, default=vector_search.DENSE_WEIGHT)
+    parser.add_argument('--lexical-weight', type=float, default=vector_search.LEXICAL_WEIGHT)
+    parser.add_argument('--max-queries', type=int, default=700)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ids, texts, metadata, queries = build_corpus(args.deals, args.filler_chunks, args.seed)
+    queries = random.Random(args.seed).sample(queries, min(args.max_queries, len(queries)))
+
+    embedder = HashEmbeddingBackend(256)
+    embed_query = lambda text: embedder([text], "retrieval_query")[0]
+    started = time.perf_counter()
+    index = VectorIndex(embedder.dimension)
+    index.upsert(ids, np.stack(embedder(texts, "retrieval_document")), metadata)
+    lexical_index = BM25Index.from_index(index)
+    print(f"{len(ids)} chunks from {args.deals} deals indexed in {time.perf_counter() - started:.2f}s; "
+          f"{len(queries)} queries, k={args.k}, weights dense {args.dense_weight} / lexical {args.lexical_weight}")
+
+    vector_search.DENSE_WEIGHT, vector_search.LEXICAL_WEIGHT = args.dense_weight, args.lexical_weight
+    print(f"  {'mode':<8} {'filter':<7} {'recall exact':>12} {'paraphrase':>11} {'all':>7}   latency p50 / p95")
+    for mode in ("dense", "lexical", "hybrid"):
+        for filtered in (False, True):
+            hits, totals, timings_ms = {}, {}, []
+            for text, deal_id, relevant, kind in queries:
+                if kind == "paraphrase" and not filtered:
+                    continue
+                filters = {"deal_id": deal_id} if filtered else None
+                query_started = time.perf_counter()
+                results = vector_search.hybrid_search(index, lexical_index, text, args.k, filters=filters,
+                                                      mode=mode, embed=embed_query)
+                timings_ms.append((time.perf_counter() - query_started) * 1000)
+                found = any(index.ids[row] == relevant for row, _, _ in results)
+                hits[kind] = hits.get(kind, 0) + found
+                totals[kind] = totals.get(kind, 0) + 1
+            recall = {kind: f"{hits[kind] / totals[kind]:.1%}" for kind in totals}
+            overall = sum(hits.values()) / sum(totals.values())
+            print(f"  {mode:<8} {'deal' if filtered else 'none':<7} {recall.get('exact', '-'):>12} "
+                  f"{recall.get('paraphrase', '-'):>11} {overall:>7.1%}   "
+                  f"{statistics.median(timings_ms):.2f}ms / {percentile(timings_ms, 0.95):.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import google.ai.generativelanguage as glm
+
+from app.services.prompt_builder import count_tokens
+
+WORDS = (
+    "revenue growth market team product customers retention pipeline margin runway competition "
+    "enterprise pricing expansion regulatory risk founders traction partnerships roadmap valuation "
+    "churn acquisition segment strategy"
+).split()
+
+
+class FakeGenerativeModel:
+    """
+    Deterministic stand-in for `genai.GenerativeModel` for offline tests and
+    benchmarks. Responses are derived from a hash of the prompt, so the same
+    prompt always gets the same text, and each call sleeps for a simulated
+    generation time:
+
+        latency + prompt tokens / prompt_tokens_per_second
+                + response tokens / response_tokens_per_second
+
+    `rules` is a list of (substring, response) pairs checked in order; a
+    response may be a string or a callable taking the prompt. A model built
+    with tools follows `tool_script`, a list of steps, each a list of
+    (tool name, args) calls made before the model answers in text. String
+    args are formatted with the deal_id found in the prompt.
+    """
+    def __init__(self, model_name="fake-gemini", tools=None, rules=None, tool_script=None,
+                 latency=0.05, prompt_tokens_per_second=100_000, response_tokens_per_second=2_000,
+                 response_tokens=300, stream_chunks=8):
+        self.model_name = model_name
+        self.tool_names = {getattr(tool, "__name__", repr(tool)) for tool in tools or []}
+        self.rules = rules or []
+        self.tool_script = [
+            [(name, args) for name, args in step if name in self.tool_names]
+            for step in (tool_script or [])
+        ] if tools else []
+        self.latency = latency
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.response_tokens_per_second = response_tokens_per_second
+        self.response_tokens = response_tokens
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, tools=None, tool_config=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        prompt, step = _prompt_and_step(contents)
+        tools_enabled = not (tool_config and tool_config.get("function_calling_config", {}).get("mode") == "NONE")
+
+        if tools_enabled and step < len(self.tool_script) and self.tool_script[step]:
+            parts = [glm.Part(function_call=glm.FunctionCall(name=name, args=_format_args(args, prompt)))
+                     for name, args in self.tool_script[step]]
+            response_tokens = 20 * len(parts)
+        else:
+            text = self._text(prompt)
+            parts = [glm.Part(text=text)]
+            response_tokens = count_tokens(text)
+
+        prompt_tokens = count_tokens(prompt)
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=response_tokens)
+        generation_time = (self.latency + prompt_tokens / self.prompt_tokens_per_second
+                           + response_tokens / self.response_tokens_per_second)
+        if stream and len(parts) == 1 and parts[0].text:
+            return self._stream(parts[0].text, usage, generation_time)
+        time.sleep(generation_time)
+        return FakeResponse(glm.Content(role="model", parts=parts), usage)
+
+    def _stream(self, text, usage, generation_time):
+        words = text.split(" ")
+        size = max(1, len(words) // self.stream_chunks)
+        chunks = [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+        # The first chunk carries the latency; the rest arrive at the response rate.
+        time.sleep(self.latency)
+        per_chunk = (generation_time - self.latency) / len(chunks)
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            yield FakeResponse(glm.Content(role="model", parts=[glm.Part(text=chunk)]), usage)
+
+    def _text(self, prompt):
+        for substring, response in self.rules:
+            if substring in prompt:
+                return response(prompt) if callable(response) else response
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        words, tokens = [], 0
+        while tokens < self.response_tokens:
+            word = rng.choice(WORDS)
+            words.append(word)
+            tokens += (len(word) + 1) / 4
+        return " ".join(words).capitalize() + "."
+
+
+class FakeResponse:
+    """The parts of `GenerateContentResponse` the agents use."""
+    def __init__(self, content, usage_metadata):
+        self.candidates = [glm.Candidate(content=content)]
+        self.usage_metadata = usage_metadata
+
+    @property
+    def parts(self):
+        return self.candidates[0].content.parts
+
+    @property
+    def text(self):
+        texts = [part.text for part in self.parts if part.text]
+        if not texts:
+            raise ValueError("The response contains no text, only function calls.")
+        return "".join(texts)
+
+
+class FakeModelFactory:
+    """
+    Builds one FakeGenerativeModel per (model, tools) with shared settings,
+    as a drop-in for `get_generative_model`, and totals their calls.
+    """
+    def __init__(self, **settings):
+        self.settings = settings
+        self.models = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name, tools=None):
+        model = FakeGenerativeModel(model_name, tools, **self.settings)
+        with self._lock:
+            self.models.append(model)
+        return model
+
+    @property
+    def calls(self):
+        return sum(model.calls for model in self.models)
+
+
+def _prompt_and_step(contents):
+    """Returns the prompt text and how many model turns the conversation already has."""
+    if isinstance(contents, str):
+        return contents, 0
+    texts, step = [], 0
+    for content in contents:
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        if content.role == "model":
+            step += 1
+        texts.extend(part.text for part in content.parts if part.text)
+    return "\n".join(texts), step
+
+
+def _format_args(args, prompt):
+    match = re.search(r'deal_id="([^"]*)"', prompt)
+    fields = {"deal_id": match.group(1) if match else ""}
+    return {key: value.format(**fields) if isinstance(value, str) else value for key, value in args.items()}
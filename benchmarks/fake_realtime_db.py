@@ -0,0 +1,173 @@
+import copy
+import threading
+import time
+
+
+class FakeRealtimeDB:
+    """
+    In-memory stand-in for `firebase_admin.db` for offline benchmarks and
+    tests. It supports the subset of the Reference API the app uses and
+    simulates network cost: every read or write sleeps `latency` seconds,
+    and order_by_child queries additionally sleep `scan_latency_per_child`
+    for each child scanned (an unindexed query is a server-side scan).
+    """
+    def __init__(self, data=None, latency=0.0, scan_latency_per_child=0.0):
+        self.data = copy.deepcopy(data) if data else {}
+        self.latency = latency
+        self.scan_latency_per_child = scan_latency_per_child
+        self.round_trips = 0
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def reference(self, path='/'):
+        return FakeReference(self, path)
+
+    def reset_counters(self):
+        with self._lock:
+            self.round_trips = 0
+
+    def _round_trip(self, extra=0.0):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def _segments(self, path):
+        return [segment for segment in path.strip('/').split('/') if segment]
+
+    def _get(self, path):
+        node = self.data
+        for segment in self._segments(path):
+            if not isinstance(node, dict) or segment not in node:
+                return None
+            node = node[segment]
+        return copy.deepcopy(node)
+
+    def _set(self, path, value):
+        segments = self._segments(path)
+        with self._lock:
+            if not segments:
+                self.data = copy.deepcopy(value) if value is not None else {}
+                return
+            node = self.data
+            for segment in segments[:-1]:
+                node = node.setdefault(segment, {})
+            if value is None:
+                node.pop(segments[-1], None)
+            else:
+                node[segments[-1]] = copy.deepcopy(value)
+            listeners = list(self._listeners)
+        changed = '/' + '/'.join(segments)
+        for listen_path, callback in listeners:
+            if changed.startswith(listen_path) or listen_path.startswith(changed):
+                callback(FakeEvent('put', changed[len(listen_path):] or '/', value))
+
+
+class FakeReference:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = '/' + '/'.join(db._segments(path))
+        self.key = db._segments(path)[-1] if db._segments(path) else None
+
+    def child(self, path):
+        return FakeReference(self._db, f"{self.path}/{path}")
+
+    def get(self):
+        self._db._round_trip()
+        return self._db._get(self.path)
+
+    def set(self, value):
+        self._db._round_trip()
+        self._db._set(self.path, value)
+
+    def update(self, value):
+        self._db._round_trip()
+        for key, child_value in value.items():
+            self._db._set(f"{self.path}/{key}", child_value)
+
+    def push(self, value=''):
+        with self._db._lock:
+            key = f"-fake{len(self._db._get(self.path) or {}):08d}"
+        ref = self.child(key)
+        ref.set(value)
+        return ref
+
+    def transaction(self, transaction_update):
+        self._db._round_trip()
+        with self._db._lock:
+            value = transaction_update(self._db._get(self.path))
+            self._db._set(self.path, value)
+        return value
+
+    def delete(self):
+        self._db._round_trip()
+        self._db._set(self.path, None)
+
+    def order_by_child(self, field):
+        return FakeQuery(self, field)
+
+    def listen(self, callback):
+        """Calls `callback` with the current data now and on every later write under this path."""
+        listener = (self.path, callback)
+        with self._db._lock:
+            self._db._listeners.append(listener)
+        callback(FakeEvent('put', '/', self._db._get(self.path)))
+        return FakeListenerRegistration(self._db, listener)
+
+
+class FakeEvent:
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class FakeListenerRegistration:
+    def __init__(self, db, listener):
+        self._db = db
+        self._listener = listener
+
+    def close(self):
+        with self._db._lock:
+            if self._listener in self._db._listeners:
+                self._db._listeners.remove(self._listener)
+
+
+class FakeQuery:
+    def __init__(self, reference, field):
+        self._reference = reference
+        self._field = field
+        self._value = None
+
+    def equal_to(self, value):
+        self._value = value
+        return self
+
+    def get(self):
+        db = self._reference._db
+        children = db._get(self._reference.path) or {}
+        db._round_trip(extra=db.scan_latency_per_child * len(children))
+        return {
+            key: child for key, child in children.items()
+            if isinstance(child, dict) and child.get(self._field) == self._value
+        }
+
+
+def seed_deals(num_deals, company_details_size=2000):
+    """Builds a Realtime Database tree with `num_deals` deals, startups and key metrics."""
+    data = {'deals': {}, 'startups': {}, 'keyMetrics': {}, 'dealIndex': {}}
+    for i in range(1, num_deals + 1):
+        deal_key, startup_key, metrics_key = f"-deal{i:06d}", f"-startup{i:06d}", f"-metrics{i:06d}"
+        data['deals'][deal_key] = {'id': str(i), 'startupId': str(i), 'stage': 'Seed', 'fundingGoal': '$2M'}
+        data['startups'][startup_key] = {
+            'id': str(i),
+            'company': f"Startup {i}",
+            'sector': ['FinTech', 'HealthTech', 'B2B SaaS'][i % 3],
+            'description': f"Startup {i} builds software.",
+            'location': 'Bengaluru',
+            'Founders': [f"Founder {i}A", f"Founder {i}B"],
+            'companyDetails': {'pitch_deck': 'x' * company_details_size},
+        }
+        data['keyMetrics'][metrics_key] = {'dealId': str(i), 'arr': f"${i}00K", 'burnRate': '$50K'}
+        data['dealIndex'][str(i)] = {'deal': deal_key, 'startup': startup_key, 'keyMetrics': metrics_key}
+    return data
@@ -0,0 +1,53 @@
+import argparse
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from app.services.document_ingestion import DocumentIngestor, iter_database_documents, iter_directory_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk, embed and index deal documents for vector_search.")
+    parser.add_argument("--deal-id", action="append", dest="deal_ids",
+                        help="Only ingest documents for this deal (repeatable). Defaults to all deals.")
+    parser.add_argument("--source-dir", help="Directory laid out as <deal id>/<document>.")
+    parser.add_argument("--from-db", action="store_true",
+                        help="Also ingest documents from the Realtime Database 'documents' node.")
+    parser.add_argument("--index-dir", help="Where the vector index is stored (defaults to VECTOR_INDEX_DIR).")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="Keep indexed documents that are no longer in the sources read.")
+    args = parser.parse_args()
+
+    if not args.source_dir and not args.from_db:
+        parser.error("Give --source-dir, --from-db or both.")
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("ERROR: GOOGLE_API_KEY is not set.")
+        print("Please set your API key in the .env file.")
+        return
+
+    def documents():
+        if args.source_dir:
+            yield from iter_directory_documents(args.source_dir, args.deal_ids)
+        if args.from_db:
+            from app.services.google_services import realtime_db
+            yield from iter_database_documents(realtime_db, args.deal_ids)
+
+    # Each source is read in full (for the given deals), so documents that
+    # have gone from it can be dropped from the index.
+    sources = []
+    if not args.keep_missing:
+        if args.source_dir:
+            sources.append("directory")
+        if args.from_db:
+            sources.append("database")
+    stats = DocumentIngestor(index_dir=args.index_dir).ingest(documents(), sync_sources=sources,
+                                                              deal_ids=args.deal_ids)
+    print("\n--- INGESTION RESULTS ---")
+    for name, value in stats.items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.agents import registry
+from app.services import llm_clients
+from app.tools.vector_search import vector_search
+
+
+class TestAgentRegistry(unittest.TestCase):
+    """Tests the process-wide agent registry and model client pool."""
+
+    def setUp(self):
+        registry._analysis_agent = None
+        llm_clients._models.clear()
+
+    def test_orchestrator_is_built_once_across_threads(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            agents = list(pool.map(lambda _: registry.get_analysis_agent(), range(16)))
+        self.assertTrue(all(agent is agents[0] for agent in agents))
+        self.assertIs(registry.get_agent("deal_memo"), agents[0].agent_team["deal_memo"])
+
+    @patch.dict('os.environ', {'GOOGLE_API_KEY': 'test_key'})
+    def test_model_clients_are_shared_per_tool_set(self):
+        plain = llm_clients.get_generative_model('gemini-flash-latest')
+        self.assertIs(plain, llm_clients.get_generative_model('gemini-flash-latest', []))
+        with_tools = llm_clients.get_generative_model('gemini-flash-latest', [vector_search])
+        self.assertIsNot(plain, with_tools)
+        self.assertEqual(llm_clients.pool_size(), 2)
+
+    @patch.dict('os.environ', {'GOOGLE_API_KEY': ''})
+    def test_no_model_without_api_key(self):
+        self.assertIsNone(llm_clients.get_generative_model('gemini-flash-latest'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.agents.benchmarking_agent import BenchmarkingAgent
+from app.agents.portfolio_fit_agent import PortfolioFitAgent
+from app.services import analysis_context
+from app.services.analysis_context import AnalysisContext, serialize_document_summaries
+from app.services.llm_cache import LLMResponseCache
+from app.services.prompt_builder import TRUNCATION_MARKER, count_tokens
+
+
+class TestAnalysisContext(unittest.TestCase):
+    """Tests the shared per-analysis prompt prefix."""
+
+    def setUp(self):
+        self.startup_data = {
+            "company": "Terra Food Co.",
+            "sector": "FoodTech",
+            "Founders": ["Asha", "Ravi"],
+            "companyDetails": {"pitch_deck": "p" * 40000, "call_notes": "c" * 4000},
+        }
+
+    def test_document_summaries_are_trimmed_to_budget(self):
+        serialized = serialize_document_summaries(self.startup_data["companyDetails"], token_budget=2000)
+        self.assertLessEqual(count_tokens(serialized), 2000)
+        summaries = json.loads(serialized)
+        self.assertTrue(all(value.endswith(TRUNCATION_MARKER) for value in summaries.values()))
+        self.assertGreater(len(summaries["pitch_deck"]), len(summaries["call_notes"]))
+
+    def test_specialists_send_the_same_prefix(self):
+        context = AnalysisContext.build(self.startup_data, token_budget=2000)
+        prompts = []
+        for agent_class in (BenchmarkingAgent, PortfolioFitAgent):
+            agent = agent_class()
+            agent.llm = MagicMock()
+            agent.llm.generate_content.return_value.text = "report"
+            agent.response_cache = LLMResponseCache()
+            agent.run(self.startup_data, context=context)
+            prompts.append(agent.llm.generate_content.call_args[0][0])
+
+        for prompt in prompts:
+            self.assertTrue(prompt.startswith(context.prefix))
+            self.assertEqual(prompt.count("\"pitch_deck\""), 1)
+        self.assertIn("Asha, Ravi", context.prefix)
+        self.assertNotEqual(prompts[0], prompts[1])
+
+    def test_cached_content_is_used_for_tool_free_agents(self):
+        context = AnalysisContext.build(self.startup_data, token_budget=2000)
+        cached_model = MagicMock()
+        cached_model.generate_content.return_value.text = "from cache"
+        context.cached_model = MagicMock(return_value=cached_model)
+        agent = BenchmarkingAgent()
+        agent.llm = MagicMock()
+        agent.response_cache = LLMResponseCache()
+
+        report = agent.run(self.startup_data, context=context)
+
+        self.assertEqual(report, {"benchmarking_analysis": "from cache"})
+        agent.llm.generate_content.assert_not_called()
+        self.assertNotIn(context.prefix, cached_model.generate_content.call_args[0][0])
+        context.cached_model.assert_called_once_with(agent.model_name)
+
+    def test_context_is_uploaded_once_per_model(self):
+        context = AnalysisContext.build(self.startup_data, token_budget=2000, cache="gemini")
+        caching = MagicMock()
+        with patch.object(analysis_context, "ANALYSIS_CONTEXT_CACHE_MIN_TOKENS", 1000), \
+                patch.object(analysis_context.genai, "caching", caching, create=True), \
+                patch.object(analysis_context.genai.GenerativeModel, "from_cached_content", create=True) as from_cached, \
+                patch.dict("os.environ", {"GOOGLE_API_KEY": "test_key"}):
+            for model_name in ("gemini-flash-latest", "gemini-flash-latest", "models/gemini-pro-latest"):
+                self.assertIs(context.cached_model(model_name), from_cached.return_value)
+            context.close()
+
+        models = [call.kwargs["model"] for call in caching.CachedContent.create.call_args_list]
+        self.assertEqual(models, ["models/gemini-flash-latest", "models/gemini-pro-latest"])
+        self.assertEqual(caching.CachedContent.create.return_value.delete.call_count, 2)
+
+    def test_small_contexts_are_not_uploaded(self):
+        context = AnalysisContext.build(self.startup_data, token_budget=2000, cache="gemini")
+        with patch.object(analysis_context, "_create_cached_content") as create:
+            self.assertIsNone(context.cached_model("gemini-flash-latest"))
+        create.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.services import analysis_jobs
+from app.services.analysis_jobs import AnalysisJobQueue, InMemoryJobStore, JobQueueFullError, SQLiteJobStore
+
+
+def _wait_for(job_queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {job}")
+
+
+class TestAnalysisJobQueue(unittest.TestCase):
+    """Tests the background analysis job queue."""
+
+    def test_job_records_progress_and_result(self):
+        def runner(deal_id, query, conversation_id=None, on_event=None, reformat=False):
+            on_event("router", {"action": "run_all_agents"})
+            on_event("token", {"text": "Final "})
+            on_event("token", {"text": "report."})
+            return {"conversation_id": "c1", "analysis": {"response": "Final report."}}
+
+        job_queue = AnalysisJobQueue(runner, concurrency=1)
+        job = job_queue.submit("1", "full analysis")
+        job = _wait_for(job_queue, job["id"], "succeeded")
+        self.assertEqual([item["event"] for item in job["events"]], ["router"])
+        self.assertEqual(job["partial_response"], "Final report.")
+        self.assertEqual(job["result"]["analysis"]["response"], "Final report.")
+
+    def test_partial_response_is_saved_while_tokens_stream(self):
+        streamed = threading.Event()
+        release = threading.Event()
+
+        def runner(on_event=None, **kwargs):
+            on_event("token", {"text": "Final "})
+            on_event("token", {"text": "rep"})
+            streamed.set()
+            release.wait(5)
+            on_event("token", {"text": "ort."})
+            return {"analysis": {"response": "Final report."}}
+
+        job_queue = AnalysisJobQueue(runner, concurrency=1, partial_flush_chars=5, partial_flush_seconds=60)
+        job = job_queue.submit("1", "full analysis")
+        streamed.wait(5)
+        # The first chunk reached the threshold and was saved; the second has not yet.
+        self.assertEqual(job_queue.get(job["id"])["partial_response"], "Final ")
+        release.set()
+        self.assertEqual(_wait_for(job_queue, job["id"], "succeeded")["partial_response"], "Final report.")
+
+    def test_concurrency_and_pending_limits(self):
+        release = threading.Event()
+        running = []
+
+        def runner(**kwargs):
+            running.append(kwargs["deal_id"])
+            release.wait(5)
+            return {"analysis": {}}
+
+        job_queue = AnalysisJobQueue(runner, concurrency=1, max_pending=2)
+        first = job_queue.submit("1", "q")
+        second = job_queue.submit("2", "q")
+        with self.assertRaises(JobQueueFullError):
+            job_queue.submit("3", "q")
+        _wait_for(job_queue, first["id"], "running")
+        self.assertEqual(job_queue.get(second["id"])["status"], "queued")
+        release.set()
+        _wait_for(job_queue, second["id"], "succeeded")
+        self.assertEqual(running, ["1", "2"])
+
+    def test_failures_are_recorded(self):
+        job_queue = AnalysisJobQueue(lambda **kwargs: {"error": "No data found for deal ID: 9"})
+        job = _wait_for(job_queue, job_queue.submit("9", "q")["id"], "failed")
+        self.assertEqual(job["error"], "No data found for deal ID: 9")
+
+    def test_in_memory_store_only_evicts_finished_jobs(self):
+        store = InMemoryJobStore(max_jobs=2, retention_seconds=60)
+        now = time.time()
+        store.put({"id": "running", "finished_at": None})
+        store.put({"id": "expired", "finished_at": now - 120})
+        store.put({"id": "done", "finished_at": now})
+        store.put({"id": "new", "finished_at": None})
+
+        # The running job is kept although it is the oldest, the expired
+        # job behind it is purged, and the oldest finished job makes room.
+        self.assertIsNotNone(store.get("running"))
+        self.assertIsNone(store.get("expired"))
+        self.assertIsNone(store.get("done"))
+        self.assertIsNotNone(store.get("new"))
+
+    def test_sqlite_store_is_readable_from_another_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jobs.sqlite3")
+            job_queue = AnalysisJobQueue(lambda **kwargs: {"analysis": {"response": "ok"}},
+                                         store=SQLiteJobStore(path))
+            job = _wait_for(job_queue, job_queue.submit("1", "q")["id"], "succeeded")
+            self.assertEqual(SQLiteJobStore(path).get(job["id"])["result"]["analysis"]["response"], "ok")
+
+
+class TestAsyncAnalyzeEndpoint(unittest.TestCase):
+    """Tests job submission and polling through the API."""
+
+    def test_submit_then_poll(self):
+        job_queue = AnalysisJobQueue(lambda **kwargs: {"analysis": {"response": "done"}})
+        with patch.object(analysis_jobs, "_job_queue", job_queue):
+            client = create_app().test_client()
+            response = client.post('/api/v1/analyze/1', json={"query": "full analysis", "async": True})
+            self.assertEqual(response.status_code, 202)
+            job_id = response.get_json()["job_id"]
+            _wait_for(job_queue, job_id, "succeeded")
+            job = client.get(f'/api/v1/jobs/{job_id}').get_json()
+            self.assertEqual(job["result"]["analysis"]["response"], "done")
+            events = client.get(f'/api/v1/jobs/{job_id}/events').get_data(as_text=True)
+            self.assertIn("event: done", events)
+            self.assertEqual(client.get('/api/v1/jobs/missing').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
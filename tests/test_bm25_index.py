@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.tools import vector_search
+from app.tools.bm25_index import BM25Index, tokenize
+from app.tools.vector_index import VectorIndex
+
+
+class TestBM25Index(unittest.TestCase):
+    """Tests lexical retrieval and its fusion with dense retrieval."""
+
+    TEXTS = [
+        "The company reports ARR of $1.2M and a burn rate of $80K.",
+        "Founders previously built a payments startup.",
+        "Granted patent US10,234,567 covers the reconciliation engine.",
+        "Main competitors are Zyphra and Quantix.",
+    ]
+
+    def test_tokenize_keeps_figures_and_identifiers(self):
+        self.assertEqual(tokenize("ARR of $1.2M"), ["arr", "1.2m"])
+        self.assertIn("us10,234,567", tokenize("patent US10,234,567."))
+
+    def test_exact_terms_rank_first(self):
+        index = BM25Index(self.TEXTS)
+        self.assertEqual(index.search("what is the ARR", k=1)[0][0], 0)
+        self.assertEqual(index.search("patent US10,234,567", k=1)[0][0], 2)
+        self.assertEqual(index.search("Zyphra", k=5), [(3, index.search("Zyphra")[0][1])])
+        self.assertEqual(index.search("nothing matches"), [])
+
+    def test_search_restricted_to_rows(self):
+        index = BM25Index(self.TEXTS)
+        self.assertEqual(index.search("ARR competitors", rows=[3]), [(3, index.search("competitors")[0][1])])
+
+    def test_reciprocal_rank_fusion(self):
+        fused = vector_search.reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60)
+        self.assertEqual([row for row, _ in fused][:2], [3, 1])
+        self.assertAlmostEqual(fused[0][1], 1 / 63 + 1 / 61)
+
+    def test_hybrid_search_surfaces_exact_match_missed_by_embeddings(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(4, 8)).astype(np.float32)
+        index = VectorIndex(8)
+        index.upsert([str(i) for i in range(4)], vectors, [{"text": text} for text in self.TEXTS])
+        lexical_index = BM25Index.from_index(index)
+        # The query embedding is closest to the founders chunk.
+        embed = lambda _: vectors[1]
+
+        dense = vector_search.hybrid_search(index, lexical_index, "patent US10,234,567", 1, mode="dense", embed=embed)
+        hybrid = vector_search.hybrid_search(index, lexical_index, "patent US10,234,567", 2, embed=embed)
+
+        self.assertEqual(dense[0][0], 1)
+        self.assertEqual(sorted(row for row, _, _ in hybrid), [1, 2])
+        self.assertTrue(all(similarity is not None for _, _, similarity in hybrid))
+
+    def test_set_index_builds_lexical_index(self):
+        index = VectorIndex(8)
+        index.upsert(["a"], np.ones((1, 8)), [{"text": "burn rate"}])
+        try:
+            vector_search.set_index(index)
+            with patch.object(vector_search, "embed_query", return_value=np.ones(8)):
+                response = vector_search.vector_search("burn rate")
+            self.assertEqual(response["search_results"][0]["id"], "a")
+            self.assertGreater(response["search_results"][0]["score"], 0)
+        finally:
+            vector_search.set_index(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
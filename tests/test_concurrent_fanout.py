@@ -0,0 +1,135 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from app.agents import ai_startup_analysis_agent
+from app.agents.ai_startup_analysis_agent import AIStartupAnalysisAgent, SPECIALIST_AGENTS
+from app.services.report_store import InMemoryAnalysisReportStore
+
+
+class TestConcurrentFanout(unittest.TestCase):
+    """Tests the parallel specialist fan-out used for full analyses."""
+
+    def setUp(self):
+        self.agent = AIStartupAnalysisAgent()
+        self.agent.report_store = InMemoryAnalysisReportStore()
+        self.startup_data = {"id": "1", "name": "Terra Food Co.", "company": "Terra Food Co."}
+
+    def _patch_specialists(self, delay=0.2, slow_agent=None, slow_delay=0.0, failing_agent=None):
+        self.contexts = []
+
+        def make_run(agent_key):
+            def run(startup_data, context=None):
+                self.contexts.append(context)
+                if agent_key == failing_agent:
+                    raise RuntimeError("boom")
+                time.sleep(slow_delay if agent_key == slow_agent else delay)
+                return {f"{agent_key}_report": f"{agent_key} done"}
+            return run
+        for agent_key in SPECIALIST_AGENTS:
+            patcher = patch.object(self.agent.agent_team[agent_key], "run", side_effect=make_run(agent_key))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_specialists_run_in_parallel(self):
+        self._patch_specialists(delay=0.2)
+        started = time.monotonic()
+        results, failed, skipped = self.agent._run_specialists_concurrently(self.startup_data)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(failed, {})
+        self.assertEqual(skipped, [])
+        self.assertEqual(len(results), len(SPECIALIST_AGENTS))
+        # Six agents sleeping 0.2s each would take ~1.2s if run serially.
+        self.assertLess(elapsed, 0.2 * len(SPECIALIST_AGENTS) / 2)
+
+    def test_specialists_share_one_analysis_context(self):
+        self._patch_specialists(delay=0.0)
+        self.agent._run_specialists_concurrently(dict(self.startup_data, companyDetails={"deck": "Pitch deck text"}))
+
+        self.assertEqual(len(self.contexts), len(SPECIALIST_AGENTS))
+        self.assertTrue(all(context is self.contexts[0] for context in self.contexts))
+        self.assertIn("Pitch deck text", self.contexts[0].prefix)
+
+    def test_slow_and_failing_agents_do_not_block_the_rest(self):
+        self._patch_specialists(delay=0.0, slow_agent="market_research", slow_delay=1.0,
+                                failing_agent="benchmarking")
+        with patch.dict(ai_startup_analysis_agent.AGENT_TIMEOUTS_SECONDS, {"market_research": 0.1}):
+            results, failed, skipped = self.agent._run_specialists_concurrently(self.startup_data)
+
+        self.assertIn("market_research", failed)
+        self.assertIn("benchmarking", failed)
+        self.assertNotIn("market_research_report", results)
+        self.assertIn("deal_memo_report", results)
+        self.assertEqual(len(results), len(SPECIALIST_AGENTS) - 2)
+
+    def test_synthesis_receives_merged_reports(self):
+        self._patch_specialists(delay=0.0)
+        with patch.object(AIStartupAnalysisAgent, "generate_text_with_llm", return_value="Final report.") as mock_llm:
+            results = self.agent._run_all_agents_and_synthesize(self.startup_data)
+
+        mock_llm.assert_called_once()
+        self.assertEqual(results["final_summary"], "Final report.")
+        self.assertIn("deal_memo done", mock_llm.call_args[0][0])
+
+    def test_unchanged_agents_are_skipped_on_the_next_analysis(self):
+        self._patch_specialists(delay=0.0)
+        startup_data = dict(self.startup_data, dealId="deal-1", keyMetrics={"arr": 100})
+        self.agent._run_specialists_concurrently(startup_data)
+        self.assertEqual(len(self.contexts), len(SPECIALIST_AGENTS))
+
+        # keyMetrics is not read by any specialist, so nothing re-runs.
+        self.contexts.clear()
+        results, failed, skipped = self.agent._run_specialists_concurrently(
+            dict(startup_data, keyMetrics={"arr": 250}))
+        self.assertEqual(self.contexts, [])
+        self.assertEqual(sorted(skipped), sorted(SPECIALIST_AGENTS))
+        self.assertEqual(len(results), len(SPECIALIST_AGENTS))
+
+    def test_only_agents_whose_inputs_changed_are_rerun(self):
+        self._patch_specialists(delay=0.0)
+        startup_data = dict(self.startup_data, dealId="deal-1", stage="Seed", description="Grocery delivery")
+        with patch.object(self.agent.agent_team["portfolio_fit"], "input_fields", ("stage",)), \
+                patch.object(AIStartupAnalysisAgent, "generate_text_with_llm", return_value="Final report."):
+            self.agent._run_all_agents_and_synthesize(startup_data)
+            self.contexts.clear()
+            results = self.agent._run_all_agents_and_synthesize(dict(startup_data, description="Meal kits"))
+
+        self.assertEqual(len(self.contexts), len(SPECIALIST_AGENTS) - 1)
+        self.assertEqual(results["skipped_agents"], ["portfolio_fit"])
+        self.assertIn("portfolio_fit_report", results)
+        self.assertEqual(results["final_summary"], "Final report.")
+
+    def test_full_analysis_is_saved_and_reused_without_model_calls(self):
+        self._patch_specialists(delay=0.0)
+        startup_data = dict(self.startup_data, dealId="deal-1")
+        with patch.object(AIStartupAnalysisAgent, "generate_text_with_llm", return_value="Final report.") as mock_llm:
+            first = self.agent._run_all_agents_and_synthesize(startup_data)
+            self.contexts.clear()
+            second = self.agent._run_all_agents_and_synthesize(startup_data)
+
+        self.assertEqual(first["report_version"], 1)
+        stored = self.agent.report_store.latest("deal-1")
+        self.assertEqual(stored["final_summary"], "Final report.")
+        self.assertIn("deal_memo_report", stored["reports"])
+        self.assertEqual(stored["agent_models"]["deal_memo"], self.agent.agent_team["deal_memo"].model_name)
+
+        mock_llm.assert_called_once()
+        self.assertEqual(self.contexts, [])
+        self.assertEqual(second["report_version"], 1)
+        self.assertEqual(second["final_summary"], "Final report.")
+        self.assertEqual(sorted(second["skipped_agents"]), sorted(SPECIALIST_AGENTS))
+
+    def test_failed_reports_are_not_reused(self):
+        self._patch_specialists(delay=0.0, failing_agent="benchmarking")
+        startup_data = dict(self.startup_data, dealId="deal-1")
+        self.agent._run_specialists_concurrently(startup_data)
+        _, failed, skipped = self.agent._run_specialists_concurrently(startup_data)
+
+        self.assertIn("benchmarking", failed)
+        self.assertNotIn("benchmarking", skipped)
+        self.assertEqual(len(skipped), len(SPECIALIST_AGENTS) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.services import conversation_manager
+from app.services.conversation_manager import InMemoryConversationStore, SQLiteConversationStore
+
+
+class TestInMemoryConversationStore(unittest.TestCase):
+    """Tests the bounded worker-local conversation store."""
+
+    def test_turns_are_appended_and_bounded(self):
+        store = InMemoryConversationStore(max_turns=3)
+        for i in range(5):
+            store.append_turn("c1", {"user": f"q{i}", "ai": f"a{i}"})
+        self.assertEqual([turn["user"] for turn in store.get_history("c1")], ["q2", "q3", "q4"])
+
+    def test_least_recently_used_conversation_is_evicted(self):
+        store = InMemoryConversationStore(max_conversations=2)
+        store.append_turn("c1", {"user": "q", "ai": "a"})
+        store.append_turn("c2", {"user": "q", "ai": "a"})
+        store.get_history("c1")
+        store.append_turn("c3", {"user": "q", "ai": "a"})
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get_history("c2"), [])
+        self.assertEqual(len(store.get_history("c1")), 1)
+
+    def test_idle_conversations_expire(self):
+        store = InMemoryConversationStore(ttl_seconds=60)
+        with patch("app.services.conversation_manager.time.monotonic", return_value=0.0):
+            store.append_turn("c1", {"user": "q", "ai": "a"})
+        with patch("app.services.conversation_manager.time.monotonic", return_value=61.0):
+            self.assertEqual(store.get_history("c1"), [])
+
+
+class TestSQLiteConversationStore(unittest.TestCase):
+    """Tests the SQLite store shared between workers."""
+
+    def test_history_is_shared_between_store_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "conversations.sqlite3")
+            worker_a = SQLiteConversationStore(path, max_turns=2)
+            worker_b = SQLiteConversationStore(path, max_turns=2)
+            worker_a.append_turn("c1", {"user": "q1", "ai": "a1"})
+            worker_b.append_turn("c1", {"user": "q2", "ai": "a2"})
+            worker_a.append_turn("c1", {"user": "q3", "ai": "a3"})
+            self.assertEqual(worker_b.get_history("c1"),
+                             [{"user": "q2", "ai": "a2"}, {"user": "q3", "ai": "a3"}])
+            self.assertEqual(worker_b.get_history("unknown"), [])
+
+
+class TestConversationManager(unittest.TestCase):
+    """Tests the module-level conversation API used by the orchestrator."""
+
+    def test_new_conversation_gets_an_id(self):
+        with patch.object(conversation_manager, "conversation_store", InMemoryConversationStore()):
+            conversation_id = conversation_manager.append_conversation_turn(None, {"user": "q", "ai": "a"})
+            self.assertTrue(conversation_id)
+            self.assertEqual(conversation_manager.get_conversation_history(conversation_id),
+                             [{"user": "q", "ai": "a"}])
+            self.assertEqual(conversation_manager.get_conversation_history(None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
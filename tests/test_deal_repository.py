@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+
+from app.services.deal_repository import DealRepository
+from benchmarks.fake_realtime_db import FakeQuery, FakeRealtimeDB, seed_deals
+
+
+class TestDealRepository(unittest.TestCase):
+    """Tests deal loading against the in-memory Realtime Database fake."""
+
+    def setUp(self):
+        self.db = FakeRealtimeDB(seed_deals(5, company_details_size=10))
+        self.repository = DealRepository(self.db, index_path=None)
+
+    def test_load_assembles_deal_startup_and_metrics(self):
+        data = self.repository.load(3)
+        self.assertEqual(data['name'], "Startup 3")
+        self.assertEqual(data['stage'], "Seed")
+        self.assertEqual(data['arr'], "$300K")
+        self.assertEqual(data['Founders'], ["Founder 3A", "Founder 3B"])
+        self.assertEqual(data['dealId'], "3")
+
+    def test_unknown_deal(self):
+        self.assertEqual(self.repository.load("404"), {"name": "Unknown Startup"})
+
+    def test_second_load_reads_by_key_without_queries(self):
+        first = self.repository.load("2")
+        with patch.object(FakeQuery, 'get', side_effect=AssertionError("query issued")):
+            second = self.repository.load("2")
+        self.assertEqual(first, second)
+
+    def test_stale_keys_fall_back_to_queries(self):
+        self.repository.load("2")
+        deal = self.db.data['deals'].pop('-deal000002')
+        self.db.data['deals']['-moved'] = deal
+        self.assertEqual(self.repository.load("2")['name'], "Startup 2")
+        self.assertEqual(self.repository.record_keys("2")['deal'], '-moved')
+
+    def test_records_added_after_the_first_load_are_found(self):
+        metrics = self.db.data['keyMetrics'].pop('-metrics000002')
+        self.assertNotIn('arr', self.repository.load("2"))
+        self.assertNotIn('keyMetrics', self.repository.record_keys("2"))
+
+        self.db.reference('keyMetrics/-late').set(metrics)
+        self.assertEqual(self.repository.load("2")['arr'], "$200K")
+        self.assertEqual(self.repository.record_keys("2")['keyMetrics'], '-late')
+
+    def test_records_reused_by_another_deal_are_not_used(self):
+        self.repository.load("2")
+        self.db.data['keyMetrics']['-metrics000002'] = {'dealId': "5", 'arr': "$5M"}
+        self.db.data['keyMetrics']['-moved'] = {'dealId': "2", 'arr': "$250K"}
+        self.assertEqual(self.repository.load("2")['arr'], "$250K")
+
+        self.db.data['deals']['-deal000002'] = dict(self.db.data['deals']['-deal000002'], id="9")
+        self.db.data['deals']['-deal2b'] = {'id': "2", 'startupId': "2", 'stage': "Series A"}
+        self.assertEqual(self.repository.load("2")['stage'], "Series A")
+
+    def test_index_avoids_queries_on_first_load(self):
+        repository = DealRepository(self.db, index_path='dealIndex')
+        with patch.object(FakeQuery, 'get', side_effect=AssertionError("query issued")):
+            data = repository.load("4")
+        self.assertEqual(data['name'], "Startup 4")
+        self.assertEqual(data['arr'], "$400K")
+
+
+if __name__ == '__main__':
+    unittest.main()
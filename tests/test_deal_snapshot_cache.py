@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch
+
+from app.services.deal_repository import DealRepository
+from app.services.deal_snapshot_cache import DealSnapshotCache
+from benchmarks.fake_realtime_db import FakeRealtimeDB, seed_deals
+
+
+class TestDealSnapshotCache(unittest.TestCase):
+    """Tests the read-through deal snapshot cache."""
+
+    def setUp(self):
+        self.db = FakeRealtimeDB(seed_deals(5, company_details_size=10))
+        self.repository = DealRepository(self.db, index_path=None)
+
+    def _cache(self, **kwargs):
+        return DealSnapshotCache(loader=self.repository.load, db=self.db,
+                                 keys_for=self.repository.record_keys, forget=self.repository.forget, **kwargs)
+
+    def test_repeat_reads_skip_the_database_and_return_copies(self):
+        cache = self._cache()
+        first = cache.get("1")
+        first["query"] = "mutated by a request"
+        self.db.reset_counters()
+        second = cache.get("1")
+        self.assertEqual(self.db.round_trips, 0)
+        self.assertNotIn("query", second)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_ttl_and_size_bound(self):
+        cache = self._cache(max_entries=2, ttl_seconds=60)
+        with patch("app.services.deal_snapshot_cache.time.monotonic", return_value=0.0):
+            for deal_id in ("1", "2", "3"):
+                cache.get(deal_id)
+        self.assertEqual(cache.stats()["entries"], 2)
+        with patch("app.services.deal_snapshot_cache.time.monotonic", return_value=61.0):
+            self.db.reset_counters()
+            cache.get("3")
+        self.assertGreater(self.db.round_trips, 0)
+
+    def test_explicit_invalidate(self):
+        cache = self._cache()
+        cache.get("2")
+        self.db.reference('keyMetrics/-metrics000002/arr').set("$9M")
+        self.assertEqual(cache.get("2")["arr"], "$200K")
+        cache.invalidate("2")
+        self.assertEqual(cache.get("2")["arr"], "$9M")
+
+    def test_explicit_invalidate_forgets_record_keys(self):
+        cache = self._cache()
+        cache.get("2")
+        metrics = self.db.data['keyMetrics'].pop('-metrics000002')
+        self.db.data['keyMetrics']['-moved'] = dict(metrics, arr="$9M")
+        cache.invalidate("2")
+        self.assertIsNone(self.repository._keys.get("2"))
+        self.assertEqual(cache.get("2")["arr"], "$9M")
+
+    def test_listener_invalidates_on_change(self):
+        cache = self._cache(listen=True)
+        cache.get("2")
+        self.db.reference('startups/-startup000002/company').set("Renamed Co")
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertEqual(cache.get("2")["name"], "Renamed Co")
+
+    def test_unknown_deals_are_not_cached(self):
+        cache = self._cache()
+        cache.get("404")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
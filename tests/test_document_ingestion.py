@@ -0,0 +1,157 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.document_ingestion import (
+    DocumentIngestor, chunk_pages, iter_database_documents, iter_directory_documents,
+)
+from app.tools import vector_search
+from app.tools.vector_index import VectorIndex
+from benchmarks.fake_realtime_db import FakeRealtimeDB
+
+
+class CountingEmbedder:
+    """Deterministic stand-in for the embedding model that counts texts embedded."""
+    def __init__(self):
+        self.texts = 0
+
+    def __call__(self, texts):
+        self.texts += len(texts)
+        return [
+            np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest(), dtype=np.uint8).astype(np.float32)
+            for text in texts
+        ]
+
+
+class TestDocumentIngestion(unittest.TestCase):
+    """Tests chunking, incremental ingestion and document sources."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.directory.name, "index")
+        self.embed = CountingEmbedder()
+        self.ingestor = DocumentIngestor(index_dir=self.index_dir, embed=self.embed,
+                                         chunk_chars=100, chunk_overlap=20, batch_size=4, embed_workers=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        vector_search.set_index(None)
+
+    def _document(self, name="deck.txt", pages=None):
+        pages = pages or ["Founders: Asha and Ravi. " * 10, "Revenue grew to $1M ARR. " * 3]
+        return {"deal_id": "1", "name": name, "pages": pages, "source": "directory"}
+
+    def test_chunks_stay_on_their_page_and_respect_size(self):
+        chunks = list(chunk_pages(["word " * 100, "short page"], max_chars=60, overlap=10))
+        self.assertTrue(all(len(text) <= 60 for _, text in chunks))
+        self.assertEqual(chunks[-1], (2, "short page"))
+        self.assertEqual({page for page, _ in chunks[:-1]}, {1})
+
+    def test_ingest_indexes_chunks_with_page_metadata(self):
+        stats = self.ingestor.ingest([self._document()])
+
+        index = VectorIndex.load(self.index_dir)
+        self.assertEqual(len(index), stats["chunks"])
+        self.assertEqual(stats["chunks"], self.embed.texts)
+        self.assertGreater(stats["chunks_per_second"], 0)
+        self.assertEqual({m["page"] for m in index.metadata}, {1, 2})
+        self.assertEqual(index.metadata[0]["document"], "deck.txt")
+        self.assertEqual(index.metadata[0]["document_type"], "pitch_deck")
+        self.assertEqual(len(vector_search.load_index()), len(index))
+
+    def test_unchanged_document_is_a_no_op(self):
+        self.ingestor.ingest([self._document()])
+        embedded = self.embed.texts
+
+        stats = self.ingestor.ingest([self._document()])
+
+        self.assertEqual(stats["documents_skipped"], 1)
+        self.assertEqual(stats["chunks"], 0)
+        self.assertEqual(self.embed.texts, embedded)
+
+    def test_changed_document_replaces_its_chunks(self):
+        self.ingestor.ingest([self._document(), self._document(name="notes.txt", pages=["Call notes."])])
+
+        stats = self.ingestor.ingest([self._document(pages=["Updated deck."])])
+
+        index = VectorIndex.load(self.index_dir)
+        self.assertGreater(stats["stale_chunks_removed"], 0)
+        self.assertEqual(sorted(m["text"] for m in index.metadata), ["Call notes.", "Updated deck."])
+
+    def test_new_vectors_are_written_in_batches_not_buffered(self):
+        ingestor = DocumentIngestor(index_dir=self.index_dir, embed=self.embed,
+                                    chunk_chars=100, chunk_overlap=20, batch_size=1, embed_workers=1)
+        documents = [self._document(name=f"doc{i}.txt", pages=[f"Document {i}."]) for i in range(5)]
+        writes = []
+        real_temporary_file = tempfile.TemporaryFile
+
+        def spy(*args, **kwargs):
+            spill = real_temporary_file(*args, **kwargs)
+            write = spill.write
+            spill.write = lambda data: writes.append(len(data)) or write(data)
+            return spill
+
+        with patch("app.services.document_ingestion.tempfile.TemporaryFile", side_effect=spy):
+            stats = ingestor.ingest(documents)
+
+        self.assertEqual(len(writes), 5)
+        self.assertEqual(set(writes), {32 * 4})
+        self.assertEqual(len(VectorIndex.load(self.index_dir)), stats["chunks"])
+
+    def test_document_repeated_in_one_run_keeps_only_its_last_chunks(self):
+        self.ingestor.ingest([self._document(pages=["First draft."]), self._document(pages=["Final deck."])])
+
+        index = VectorIndex.load(self.index_dir)
+        self.assertEqual([m["text"] for m in index.metadata], ["Final deck."])
+
+    def test_changed_chunking_reingests_unchanged_documents(self):
+        self.ingestor.ingest([self._document()])
+        rechunked = DocumentIngestor(index_dir=self.index_dir, embed=self.embed,
+                                     chunk_chars=60, chunk_overlap=10, batch_size=4, embed_workers=2)
+
+        stats = rechunked.ingest([self._document()])
+
+        index = VectorIndex.load(self.index_dir)
+        self.assertEqual(stats["documents_skipped"], 0)
+        self.assertEqual(len(index), stats["chunks"])
+        self.assertTrue(all(len(m["text"]) <= 60 for m in index.metadata))
+
+    def test_documents_gone_from_a_synced_source_are_removed(self):
+        self.ingestor.ingest([self._document(), self._document(name="notes.txt", pages=["Call notes."]),
+                              dict(self._document(name="memo.txt", pages=["From the database."]),
+                                   source="database"),
+                              dict(self._document(name="other.txt", pages=["Another deal."]), deal_id="2")])
+
+        stats = self.ingestor.ingest([self._document()], sync_sources=["directory"], deal_ids=["1"])
+
+        index = VectorIndex.load(self.index_dir)
+        self.assertEqual(stats["documents_removed"], 1)
+        self.assertNotIn("Call notes.", [m["text"] for m in index.metadata])
+        self.assertEqual({m["document"] for m in index.metadata}, {"deck.txt", "memo.txt", "other.txt"})
+
+    def test_directory_and_database_sources(self):
+        deal_dir = os.path.join(self.directory.name, "docs", "7")
+        os.makedirs(deal_dir)
+        with open(os.path.join(deal_dir, "deck.txt"), "w") as f:
+            f.write("Page one\fPage two")
+        with open(os.path.join(deal_dir, "logo.png"), "w") as f:
+            f.write("not a document")
+        db = FakeRealtimeDB({"documents": {
+            "-doc1": {"dealId": "7", "name": "transcript", "pages": ["Hello"]},
+            "-doc2": {"dealId": "8", "name": "other", "text": "A\fB"},
+        }})
+
+        from_directory = list(iter_directory_documents(os.path.join(self.directory.name, "docs")))
+        from_database = list(iter_database_documents(db, deal_ids=["8"]))
+
+        self.assertEqual([(d["deal_id"], d["name"], d["pages"]) for d in from_directory],
+                         [("7", "deck.txt", ["Page one", "Page two"])])
+        self.assertEqual([(d["deal_id"], d["pages"]) for d in from_database], [("8", ["A", "B"])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services import llm_clients
+from app.services.embedding_service import EmbeddingService, GeminiEmbeddingBackend, HashEmbeddingBackend
+from app.services.intent_router import EmbeddingNearestNeighbourClassifier, IntentRouter
+
+
+class RecordingBackend(HashEmbeddingBackend):
+    """Hash backend that records the batches it is asked to embed."""
+    def __init__(self):
+        super().__init__(dimension=32)
+        self.batches = []
+
+    def __call__(self, texts, task_type):
+        self.batches.append(list(texts))
+        return super().__call__(texts, task_type)
+
+
+class TestEmbeddingService(unittest.TestCase):
+    """Tests batching and the two cache tiers of the embedding service."""
+
+    def test_hash_backend_is_deterministic(self):
+        backend = HashEmbeddingBackend(64)
+        first, again, other = backend(["burn rate", "burn rate", "patent"], "retrieval_query")
+        np.testing.assert_array_equal(first, again)
+        self.assertFalse(np.array_equal(first, other))
+
+    def test_misses_are_batched_and_deduplicated(self):
+        backend = RecordingBackend()
+        service = EmbeddingService(backend, batch_size=2)
+
+        vectors = service.embed(["a", "b", "a", "c"])
+
+        self.assertEqual(vectors.shape, (4, 32))
+        np.testing.assert_array_equal(vectors[0], vectors[2])
+        self.assertEqual(backend.batches, [["a", "b"], ["c"]])
+
+    def test_memory_tier_serves_repeats(self):
+        backend = RecordingBackend()
+        service = EmbeddingService(backend, max_entries=2)
+        service.embed(["a", "b"])
+        service.embed(["b", "a"])
+        service.embed(["c"])
+        service.embed(["b"])  # least recently used, so evicted by "c"
+
+        self.assertEqual(backend.batches, [["a", "b"], ["c"], ["b"]])
+        self.assertEqual(service.stats()["memory_hits"], 2)
+
+    def test_task_type_is_part_of_the_key(self):
+        backend = RecordingBackend()
+        service = EmbeddingService(backend)
+        service.embed(["burn rate"])
+        service.embed_query("burn rate")
+        self.assertEqual(len(backend.batches), 2)
+
+    def test_gemini_backend_configures_the_sdk_once(self):
+        backend = GeminiEmbeddingBackend()
+        with patch.dict(os.environ, {"GOOGLE_API_KEY": "embedding-test-key"}), \
+                patch.object(llm_clients, "_configured_api_key", None), \
+                patch.object(llm_clients.genai, "configure") as configure, \
+                patch("app.services.embedding_service.genai.embed_content",
+                      return_value={"embedding": [[0.1, 0.2]]}) as embed_content:
+            backend(["burn rate"], "retrieval_query")
+            backend(["churn"], "retrieval_query")
+        configure.assert_called_once_with(api_key="embedding-test-key")
+        self.assertEqual(embed_content.call_count, 2)
+
+    def test_disk_tier_survives_restart_as_float16(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "embeddings.sqlite3")
+            first = EmbeddingService(RecordingBackend(), sqlite_path=path).embed(["pitch deck"])
+
+            backend = RecordingBackend()
+            restarted = EmbeddingService(backend, sqlite_path=path)
+            second = restarted.embed(["pitch deck"])
+
+            self.assertEqual(backend.batches, [])
+            self.assertEqual(restarted.stats()["disk_hits"], 1)
+            np.testing.assert_allclose(second, first, rtol=1e-3)
+
+
+class TestEmbeddingRouter(unittest.TestCase):
+    """Tests the embedding-backed classifier of the intent router."""
+
+    def test_routes_close_paraphrases(self):
+        service = EmbeddingService(HashEmbeddingBackend(512))
+        examples = [("what is the burn rate", "direct_answer"), ("write the deal memo", "run_specific_agent:deal_memo")]
+        router = IntentRouter(classifier=EmbeddingNearestNeighbourClassifier(examples, service, k=1), threshold=0.5)
+
+        decision = router.route("what's the burn rate?")
+
+        self.assertEqual(decision.action, "direct_answer")
+        self.assertEqual(decision.tier, "classifier")
+
+    def test_embedding_failure_defers_to_llm(self):
+        class FailingBackend(HashEmbeddingBackend):
+            def __call__(self, texts, task_type):
+                raise RuntimeError("GOOGLE_API_KEY is not set")
+
+        classifier = EmbeddingNearestNeighbourClassifier([("go on", "chat")], EmbeddingService(FailingBackend()))
+        self.assertEqual(classifier.predict("hello"), (None, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from benchmarks.fake_gemini import FakeGenerativeModel, FakeModelFactory
+
+
+def vector_search(query, deal_id):
+    return []
+
+
+class TestFakeGemini(unittest.TestCase):
+
+    def test_text_is_deterministic_per_prompt(self):
+        model = FakeGenerativeModel(latency=0, response_tokens=50)
+        first = model.generate_content("Summarize the deal").text
+        self.assertEqual(first, model.generate_content("Summarize the deal").text)
+        self.assertNotEqual(first, model.generate_content("Summarize another deal").text)
+        self.assertEqual(model.calls, 3)
+
+    def test_rules_take_precedence(self):
+        model = FakeGenerativeModel(latency=0, rules=[("routing agent", lambda prompt: "chat")])
+        self.assertEqual(model.generate_content("You are a routing agent.").text, "chat")
+
+    def test_tool_script_then_text(self):
+        model = FakeGenerativeModel(
+            tools=[vector_search], latency=0,
+            tool_script=[[("vector_search", {"query": "arr", "deal_id": "{deal_id}"})]],
+        )
+        prompt = 'Use deal_id="42" for document lookups.'
+        response = model.generate_content([prompt])
+        call = response.parts[0].function_call
+        self.assertEqual(call.name, "vector_search")
+        self.assertEqual(call.args["deal_id"], "42")
+        with self.assertRaises(ValueError):
+            response.text
+
+        answer = model.generate_content([prompt, response.candidates[0].content])
+        self.assertTrue(answer.text)
+
+    def test_streaming_reassembles_to_the_full_text(self):
+        model = FakeGenerativeModel(latency=0, response_tokens=80)
+        chunks = [chunk.text for chunk in model.generate_content("Stream this", stream=True)]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks).strip(), model.generate_content("Stream this").text)
+
+    def test_factory_totals_calls(self):
+        factory = FakeModelFactory(latency=0)
+        factory("gemini-a").generate_content("one")
+        factory("gemini-b").generate_content("two")
+        self.assertEqual(factory.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
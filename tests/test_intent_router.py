@@ -0,0 +1,79 @@
+import unittest
+
+from app.services.intent_router import IntentRouter
+
+
+class TestIntentRouter(unittest.TestCase):
+    """Tests the tiered local intent router."""
+
+    def setUp(self):
+        self.router = IntentRouter(threshold=0.3)
+
+    def test_rules_route_obvious_queries(self):
+        decision = self.router.route("Give me a full analysis of this startup.")
+        self.assertEqual(decision.action, "run_all_agents")
+        self.assertEqual(decision.tier, "rules")
+        self.assertEqual(self.router.route("check for linkedin updates").action,
+                         "run_specific_agent:digital_footprint")
+        self.assertEqual(self.router.route("Send an email to the founder for the deck").action, "send_email")
+
+    def test_market_sizing_acronyms_are_not_names(self):
+        for query in ("Estimate the TAM", "Estimate SAM and SOM", "what's the tam, i.e. total addressable market"):
+            self.assertEqual(self.router.route(query).action, "run_specific_agent:market_research", query)
+        for query in ("What is Sam's background?", "Has som of the team left?"):
+            decision = self.router.route(query)
+            self.assertNotEqual(decision and decision.action, "run_specific_agent:market_research", query)
+
+    def test_topic_mentions_do_not_start_specialists(self):
+        cases = [
+            ("What does the deal memo say about churn?", "run_specific_agent:deal_memo"),
+            ("Are there any compliance documents in the data room?", "run_specific_agent:risk_and_compliance"),
+            ("Do they have a regulatory license?", "run_specific_agent:risk_and_compliance"),
+            ("What is their social media budget?", "run_specific_agent:digital_footprint"),
+            ("What market size is in the pitch deck?", "run_specific_agent:market_research"),
+            ("What did the full analysis say about the team?", "run_all_agents"),
+        ]
+        for query, wrong_action in cases:
+            decision = self.router.route(query)
+            self.assertNotEqual(decision and decision.action, wrong_action, query)
+            self.assertNotEqual(decision and decision.tier, "rules", query)
+
+    def test_requests_to_run_a_specialist_use_the_rules(self):
+        for query, action in (("Generate a new deal memo", "run_specific_agent:deal_memo"),
+                              ("Run a risk assessment", "run_specific_agent:risk_and_compliance"),
+                              ("Analyze their social media", "run_specific_agent:digital_footprint")):
+            decision = self.router.route(query)
+            self.assertEqual((decision.action, decision.tier), (action, "rules"), query)
+
+    def test_conversation_summaries_need_history(self):
+        decision = self.router.route("Summarize our conversation")
+        self.assertIsNone(decision)
+
+    def test_vague_send_requests_need_a_draft(self):
+        self.assertIsNone(self.router.route("send it"))
+        draft = [{"user": "email the founder for the deck", "ai": "I have drafted the following email for you: ..."}]
+        self.assertEqual(self.router.route("send it", draft).action, "send_email")
+
+    def test_classifier_routes_paraphrases(self):
+        decision = self.router.route("What's their annual recurring revenue?")
+        self.assertEqual(decision.action, "direct_answer")
+        self.assertEqual(decision.tier, "classifier")
+        self.assertEqual(self.router.route("Who are their competitors?").action,
+                         "run_specific_agent:benchmarking")
+
+    def test_unfamiliar_queries_fall_back_to_the_llm(self):
+        self.assertIsNone(self.router.route("zebra quantum lasagna"))
+        self.assertEqual(self.router.stats["fallback"], 1)
+
+    def test_follow_ups_need_history(self):
+        self.assertIsNone(self.router.route("Tell me more about that"))
+        history = [{"user": "full analysis", "ai": "..."}]
+        self.assertEqual(self.router.route("Tell me more about that", history).action, "chat")
+
+    def test_unavailable_agents_are_not_returned(self):
+        router = IntentRouter(threshold=0.3, available_agents=["benchmarking"])
+        self.assertIsNone(router.route("write the deal memo"))
+
+
+if __name__ == '__main__':
+    unittest.main()
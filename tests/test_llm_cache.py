@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.services.llm_cache import LLMResponseCache, make_cache_key
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    """Tests the two-tier LLM response cache."""
+
+    def test_key_depends_on_model_prompt_and_tools(self):
+        def vector_search():
+            pass
+        base = make_cache_key("gemini-flash-latest", "prompt")
+        self.assertEqual(base, make_cache_key("gemini-flash-latest", "prompt", []))
+        self.assertNotEqual(base, make_cache_key("gemini-pro", "prompt"))
+        self.assertNotEqual(base, make_cache_key("gemini-flash-latest", "prompt 2"))
+        self.assertNotEqual(base, make_cache_key("gemini-flash-latest", "prompt", [vector_search]))
+        self.assertNotEqual(make_cache_key("gemini-flash-latest", "prompt", [vector_search], {"vector_search": "1"}),
+                            make_cache_key("gemini-flash-latest", "prompt", [vector_search], {"vector_search": "2"}))
+
+    def test_memory_tier_is_lru_bounded(self):
+        cache = LLMResponseCache(max_entries=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")
+        cache.set("c", "C")
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["memory_hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = LLMResponseCache(ttl_seconds=10)
+        with patch("app.services.llm_cache.time.time", return_value=1000.0):
+            cache.set("a", "A")
+        with patch("app.services.llm_cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.get("a"))
+
+    def test_sqlite_tier_survives_a_new_cache_and_is_bounded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "llm_cache.sqlite3")
+            first = LLMResponseCache(sqlite_path=path, max_disk_entries=2)
+            first.set("a", "A")
+            first.set("b", "B")
+            first.set("c", "C")
+
+            second = LLMResponseCache(sqlite_path=path, max_disk_entries=2)
+            self.assertEqual(second.get("c"), "C")
+            self.assertEqual(second.get("c"), "C")
+            self.assertIsNone(second.get("a"))
+            self.assertEqual(second.stats()["disk_hits"], 1)
+            self.assertEqual(second.stats()["memory_hits"], 1)
+
+
+class TestToolbeltAgentCaching(unittest.TestCase):
+    """Tests the cache integration in ToolbeltAgent.generate_text_with_llm."""
+
+    def _agent(self, agent_class):
+        agent = agent_class()
+        agent.llm = MagicMock()
+        agent.llm.generate_content.return_value.candidates[0].content.parts[0].function_call = None
+        agent.llm.generate_content.return_value.text = "report"
+        agent.response_cache = LLMResponseCache()
+        return agent
+
+    def test_repeated_prompt_is_served_from_cache(self):
+        from app.agents.benchmarking_agent import BenchmarkingAgent
+        agent = self._agent(BenchmarkingAgent)
+        self.assertEqual(agent.generate_text_with_llm("same prompt"), "report")
+        self.assertEqual(agent.generate_text_with_llm("same prompt"), "report")
+        agent.llm.generate_content.assert_called_once()
+
+    def test_web_research_agents_opt_out(self):
+        from app.agents.market_research_agent import MarketResearchAgent
+        agent = self._agent(MarketResearchAgent)
+        agent.generate_text_with_llm("same prompt")
+        agent.generate_text_with_llm("same prompt")
+        self.assertEqual(agent.llm.generate_content.call_count, 2)
+
+    def test_conversational_steps_are_not_cached(self):
+        from app.agents.ai_startup_analysis_agent import AIStartupAnalysisAgent
+        self.assertFalse(AIStartupAnalysisAgent.cache_responses)
+
+    def test_reingesting_documents_invalidates_search_backed_responses(self):
+        from app.agents.deal_memo_agent import DealMemoAgent
+        from app.tools import vector_search
+        agent = self._agent(DealMemoAgent)
+        with patch.object(vector_search, "VECTOR_SEARCH_BACKEND", "local"), \
+                patch.object(vector_search, "_index_version", "v1"):
+            agent.generate_text_with_llm("same prompt")
+            agent.generate_text_with_llm("same prompt")
+            self.assertEqual(agent.llm.generate_content.call_count, 1)
+            vector_search._index_version = "v2"
+            agent.generate_text_with_llm("same prompt")
+        self.assertEqual(agent.llm.generate_content.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from google.api_core import exceptions as api_exceptions
+
+from app import create_app
+from app.agents.base_agent import ToolbeltAgent
+from app.services import llm_limiter
+from app.services.llm_limiter import (
+    BATCH,
+    INTERACTIVE,
+    CircuitBreaker,
+    LLMGenerationError,
+    LLMRateLimiter,
+    LLMUnavailableError,
+    retry_after_hint,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(**settings):
+    settings.setdefault("requests_per_minute", 0)
+    settings.setdefault("tokens_per_minute", 0)
+    settings.setdefault("sleep", lambda seconds: None)
+    return LLMRateLimiter("test-model", **settings)
+
+
+class TestAdmission(unittest.TestCase):
+    """Tests the request and token buckets and the priority lanes."""
+
+    def test_requests_beyond_the_per_minute_limit_wait(self):
+        limiter = _limiter(requests_per_minute=6, queue_timeout_seconds=0.05)
+        for _ in range(6):
+            self.assertLess(limiter.acquire(0), 0.01)
+        with self.assertRaises(LLMUnavailableError) as raised:
+            limiter.acquire(0)
+        self.assertAlmostEqual(raised.exception.retry_after, 10, delta=0.5)
+
+    def test_tokens_are_counted_and_settled(self):
+        limiter = _limiter(tokens_per_minute=1000, queue_timeout_seconds=0.05)
+        limiter.acquire(800)
+        with self.assertRaises(LLMUnavailableError):
+            limiter.acquire(800)
+        # The call used far fewer tokens than estimated.
+        limiter.settle(800, 100)
+        limiter.acquire(800)
+
+    def test_batch_calls_leave_a_reserve_for_interactive_ones(self):
+        limiter = _limiter(requests_per_minute=10, interactive_reserve=0.2, queue_timeout_seconds=0.05)
+        limiter.requests.level = 2
+        with self.assertRaises(LLMUnavailableError):
+            limiter.acquire(0, BATCH)
+        limiter.acquire(0, INTERACTIVE)
+
+    def test_interactive_calls_are_admitted_before_queued_batch_calls(self):
+        limiter = _limiter(requests_per_minute=600, interactive_reserve=0.0)
+        limiter.requests.level = 0
+        admitted = []
+
+        def acquire(lane):
+            limiter.acquire(0, lane)
+            admitted.append(lane)
+
+        batch = threading.Thread(target=acquire, args=(BATCH,))
+        batch.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=acquire, args=(INTERACTIVE,))
+        interactive.start()
+        batch.join(5)
+        interactive.join(5)
+        self.assertEqual(admitted, [INTERACTIVE, BATCH])
+
+    def test_priority_follows_the_context(self):
+        limiter = _limiter()
+        with patch.object(limiter, "acquire", wraps=limiter.acquire) as acquire:
+            with llm_limiter.priority(BATCH):
+                limiter.call(lambda: "ok")
+            limiter.call(lambda: "ok")
+        self.assertEqual([call.args[1] for call in acquire.call_args_list], [BATCH, INTERACTIVE])
+
+
+class TestRetries(unittest.TestCase):
+    """Tests retries, backoff and the circuit breaker."""
+
+    def test_retries_rate_limits_waiting_at_least_the_hint(self):
+        sleeps = []
+        limiter = _limiter(sleep=sleeps.append, backoff_base_seconds=0.01)
+        outcomes = iter([
+            api_exceptions.ResourceExhausted("Quota exceeded. Please retry in 0.1s."),
+            api_exceptions.ServiceUnavailable("overloaded"),
+            "response",
+        ])
+        called_at = []
+
+        def function():
+            called_at.append(time.monotonic())
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(limiter.call(function), "response")
+        self.assertEqual(len(called_at), 3)
+        self.assertEqual(sleeps[0], 0.1)
+        self.assertLess(sleeps[1], 0.05)
+        # The 429 slowed the refill and held the queue for the hinted time.
+        self.assertLess(limiter.requests.scale, 1.0)
+        self.assertGreaterEqual(called_at[1] - called_at[0], 0.1)
+
+    def test_bad_requests_are_not_retried(self):
+        limiter = _limiter()
+        function = MagicMock(side_effect=api_exceptions.InvalidArgument("bad prompt"))
+        with self.assertRaises(api_exceptions.InvalidArgument):
+            limiter.call(function)
+        self.assertEqual(function.call_count, 1)
+        self.assertEqual(limiter.breaker.failures, 0)
+
+    def test_gives_up_after_max_retries(self):
+        limiter = _limiter(max_retries=2)
+        function = MagicMock(side_effect=api_exceptions.InternalServerError("boom"))
+        with self.assertRaises(LLMGenerationError):
+            limiter.call(function)
+        self.assertEqual(function.call_count, 3)
+
+    def test_circuit_opens_then_probes_after_the_cooldown(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=30, clock=clock)
+        limiter = _limiter(max_retries=0, breaker=breaker)
+        failing = MagicMock(side_effect=api_exceptions.ServiceUnavailable("down"))
+        for _ in range(2):
+            with self.assertRaises(LLMGenerationError):
+                limiter.call(failing)
+        self.assertEqual(breaker.state, "open")
+
+        healthy = MagicMock(return_value="response")
+        with self.assertRaises(LLMUnavailableError) as raised:
+            limiter.call(healthy)
+        self.assertEqual(raised.exception.retry_after, 30)
+        healthy.assert_not_called()
+
+        clock.now += 30
+        self.assertEqual(breaker.state, "half_open")
+        self.assertEqual(limiter.call(healthy), "response")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_failed_probe_reopens_the_circuit(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+    def test_probe_that_times_out_in_the_queue_is_released(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=10, clock=clock)
+        limiter = _limiter(requests_per_minute=1, queue_timeout_seconds=0.05, breaker=breaker)
+        limiter.acquire(0)
+        breaker.record_failure()
+        clock.now += 10
+
+        healthy = MagicMock(return_value="response")
+        with self.assertRaises(LLMUnavailableError):
+            limiter.call(healthy)
+        healthy.assert_not_called()
+        # The next call may still probe once quota is back.
+        limiter.requests.level = 1
+        self.assertEqual(limiter.call(healthy), "response")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_retry_after_hints(self):
+        error = api_exceptions.ResourceExhausted("quota", response=MagicMock(headers={"Retry-After": "7"}))
+        self.assertEqual(retry_after_hint(error), 7.0)
+        self.assertEqual(retry_after_hint(Exception("retry_delay { seconds: 12 }")), 12.0)
+        self.assertIsNone(retry_after_hint(Exception("no hint")))
+
+
+class TestGenerationErrors(unittest.TestCase):
+    """Tests that failed generations surface as errors instead of report text."""
+
+    def test_agent_raises_instead_of_returning_failure_text(self):
+        agent = ToolbeltAgent("Test Agent")
+        agent.cache_responses = False
+        agent.llm = MagicMock(model_name="error-model")
+        agent.llm.generate_content.side_effect = ValueError("blocked by safety settings")
+        with self.assertRaises(LLMGenerationError):
+            agent.generate_text_with_llm("Write a memo.")
+
+    def test_analyze_endpoint_returns_503_with_retry_after(self):
+        client = create_app().test_client()
+        error = LLMUnavailableError("circuit open", retry_after=12.4)
+        with patch('app.agents.ai_startup_analysis_agent.AIStartupAnalysisAgent.run', side_effect=error):
+            response = client.post('/api/v1/analyze/1', json={"query": "full analysis"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "12")
+
+
+if __name__ == '__main__':
+    unittest.main()
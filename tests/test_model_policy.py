@@ -0,0 +1,115 @@
+import itertools
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from app import create_app
+from app.agents.base_agent import ToolbeltAgent
+from app.services.llm_limiter import LLMGenerationError, LLMUnavailableError
+from app.services.model_policy import HEDGE_MIN_SAMPLES, ModelPolicy, ModelTier, generate
+
+
+class SlowFirstModel:
+    """Answers its first call after `first_delay` seconds and later calls immediately."""
+    def __init__(self, first_delay):
+        self.model_name = "slow-first-model"
+        self.first_delay = first_delay
+        self.calls = itertools.count()
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            call = next(self.calls)
+        if call == 0:
+            time.sleep(self.first_delay)
+            return "primary"
+        return "backup"
+
+
+class TestModelPolicy(unittest.TestCase):
+    """Tests tier assignment, timeouts and hedged calls."""
+
+    def test_steps_and_agents_map_to_tiers(self):
+        policy = ModelPolicy()
+        self.assertEqual(policy.tier_for("router").name, "fast")
+        self.assertEqual(policy.tier_for("deal_memo").name, "deep")
+        self.assertEqual(policy.tier_for("unassigned_step").name, "standard")
+        self.assertEqual(policy.tier_for(None).name, "standard")
+
+    def test_environment_overrides(self):
+        with patch.dict(os.environ, {"MODEL_TIERS": '{"fast": {"model": "tiny-model"}}',
+                                     "MODEL_POLICY": '{"chat": "fast"}'}):
+            policy = ModelPolicy.from_env()
+        self.assertEqual(policy.model_for("chat"), "tiny-model")
+        self.assertEqual(policy.tiers["fast"].timeout_seconds, 30)
+
+    def test_slow_calls_are_hedged(self):
+        tier = ModelTier("test", "slow-first-model", timeout_seconds=5, hedge=True, hedge_after_seconds=0.05)
+        started = time.monotonic()
+        self.assertEqual(generate(SlowFirstModel(first_delay=1.0), "prompt", tier=tier), "backup")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual((tier.stats()["hedges"], tier.stats()["hedges_won"]), (1, 1))
+
+    def test_fast_calls_are_not_hedged(self):
+        tier = ModelTier("test", "slow-first-model", timeout_seconds=5, hedge=True, hedge_after_seconds=1)
+        self.assertEqual(generate(SlowFirstModel(first_delay=0.0), "prompt", tier=tier), "primary")
+        self.assertEqual(tier.stats()["hedges"], 0)
+
+    def test_calls_past_the_tier_timeout_fail(self):
+        tier = ModelTier("test", "slow-first-model", timeout_seconds=0.1, hedge=False)
+        with self.assertRaises(LLMGenerationError):
+            generate(SlowFirstModel(first_delay=1.0), "prompt", tier=tier)
+        self.assertEqual(tier.stats()["timeouts"], 1)
+
+    def test_time_queued_for_a_pool_thread_does_not_count_against_the_timeout(self):
+        tier = ModelTier("test", "slow-first-model", timeout_seconds=0.3, hedge=False)
+        release = threading.Event()
+        with patch("app.services.model_policy._hedge_pool", ThreadPoolExecutor(max_workers=1)) as pool:
+            pool.submit(release.wait)
+            threading.Timer(0.5, release.set).start()
+            started = time.monotonic()
+            self.assertEqual(generate(SlowFirstModel(first_delay=0.1), "prompt", tier=tier), "primary")
+        self.assertGreater(time.monotonic() - started, 0.5)
+        self.assertEqual(tier.stats()["timeouts"], 0)
+
+    def test_calls_that_never_start_give_up_after_the_queue_timeout(self):
+        tier = ModelTier("test", "slow-first-model", timeout_seconds=5, hedge=False)
+        release = threading.Event()
+        with patch("app.services.model_policy._hedge_pool", ThreadPoolExecutor(max_workers=1)) as pool, \
+                patch("app.services.llm_limiter.LLM_QUEUE_TIMEOUT_SECONDS", 0.1):
+            pool.submit(release.wait)
+            model = SlowFirstModel(first_delay=0.0)
+            with self.assertRaises(LLMUnavailableError):
+                generate(model, "prompt", tier=tier)
+            release.set()
+        self.assertEqual(next(model.calls), 0)
+
+    def test_hedge_deadline_follows_the_observed_p90(self):
+        tier = ModelTier("test", "model", timeout_seconds=30, hedge=True, hedge_after_seconds=10)
+        self.assertEqual(tier.hedge_after(), 10)
+        for latency in [0.1] * (HEDGE_MIN_SAMPLES - 2) + [0.4, 5.0]:
+            tier.observe(latency)
+        self.assertEqual(tier.hedge_after(), 0.4)
+        self.assertEqual(tier.stats()["p50_ms"], 100.0)
+
+    def test_agent_uses_the_model_of_each_step(self):
+        agent = ToolbeltAgent("Test Agent")
+        with patch('app.agents.base_agent.get_generative_model', return_value=MagicMock()) as get_model:
+            tier, model_name, _ = agent._model_for("router")
+        self.assertEqual(tier.name, "fast")
+        self.assertEqual(model_name, agent.model_policy.model_for("router"))
+        get_model.assert_called_once_with(model_name, [])
+
+    def test_stats_endpoint(self):
+        response = create_app().test_client().get('/api/v1/models')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertIn("p90_ms", body["tiers"]["fast"])
+        self.assertEqual(body["assignments"]["router"], "fast")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from app.services.prompt_builder import (
+    STARTUP_DATA_PLACEHOLDER, TRUNCATION_MARKER, PromptBuilder, count_tokens, trim_document_summaries,
+)
+
+
+def _turns(count):
+    return [{"user": f"question {i}", "ai": f"answer {i}"} for i in range(count)]
+
+
+class TestHistoryWindowing(unittest.TestCase):
+    """Tests verbatim windowing and the cached running summary."""
+
+    def test_short_history_is_verbatim(self):
+        builder = PromptBuilder(history_turns=3)
+        summarize = MagicMock()
+        text = builder.format_history(_turns(3), summarize)
+        self.assertIn("User: question 0", text)
+        summarize.assert_not_called()
+
+    def test_older_turns_are_summarized_once(self):
+        builder = PromptBuilder(history_turns=2)
+        summarize = MagicMock(side_effect=lambda previous, turns: f"{previous}+{len(turns)}")
+        history = _turns(4)
+
+        text = builder.format_history(history, summarize)
+        self.assertIn("Summary of earlier conversation: +2", text)
+        self.assertNotIn("question 1\n", text)
+        self.assertIn("User: question 3", text)
+
+        # The same conversation one turn later only summarizes the new turn.
+        history.append({"user": "question 4", "ai": "answer 4"})
+        text = builder.format_history(history, summarize)
+        self.assertIn("Summary of earlier conversation: +2+1", text)
+        self.assertEqual(summarize.call_count, 2)
+        self.assertEqual(summarize.call_args[0][1], [history[2]])
+
+        builder.format_history(history, summarize)
+        self.assertEqual(summarize.call_count, 2)
+
+
+class TestStartupContextBudget(unittest.TestCase):
+    """Tests trimming document summaries to the token budget."""
+
+    def setUp(self):
+        self.startup_data = {
+            "name": "TestCo",
+            "arr": "$1M",
+            "companyDetails": {"pitch_deck": "p" * 8000, "financials": "f" * 4000},
+        }
+
+    def test_small_data_is_untouched(self):
+        builder = PromptBuilder(token_budget=100000)
+        self.assertEqual(json.loads(builder.startup_context(self.startup_data)), self.startup_data)
+
+    def test_company_details_are_trimmed_to_fit(self):
+        builder = PromptBuilder(token_budget=1500)
+        prompt = builder.fit_startup_data(f"Question?\n{STARTUP_DATA_PLACEHOLDER}\nAnswer:", self.startup_data)
+        self.assertLessEqual(count_tokens(prompt), 1500)
+        context = json.loads(prompt.split("\n", 1)[1].rsplit("\n", 1)[0])
+        self.assertEqual(context["arr"], "$1M")
+        details = context["companyDetails"]
+        self.assertTrue(details["pitch_deck"].endswith(TRUNCATION_MARKER))
+        self.assertGreater(len(details["pitch_deck"]), len(details["financials"]))
+
+    def test_retrimming_does_not_stack_markers(self):
+        once = trim_document_summaries("x" * 100, 50)
+        twice = trim_document_summaries(once, 10)
+        self.assertEqual(twice.count(TRUNCATION_MARKER), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from app.services.analysis_context import AnalysisContext
+from app.services.report_formatter import INVALID_REPORT_MESSAGE, format_report
+
+
+class TestReportFormatter(unittest.TestCase):
+    """Tests local rendering of specialist reports."""
+
+    def test_narrative_reports_are_passed_through(self):
+        report = {"deal_memo": "```markdown\n# Memo\n\n\n\nStrong team.\n```"}
+        self.assertEqual(format_report("Deal Memo Agent", report, "Terra Food Co."),
+                         "## Deal Memo Agent — Terra Food Co.\n\n# Memo\n\nStrong team.")
+
+    def test_structured_reports_become_sections(self):
+        report = {
+            "market_size": {"tam_usd": 5000000, "sources": ["Deck p.4", "Report p.2"]},
+            "risks": ["Churn", None],
+        }
+        self.assertEqual(format_report("Market Research Agent", report, "Terra Food Co."), "\n".join([
+            "## Market Research Agent — Terra Food Co.",
+            "",
+            "### Market Size",
+            "",
+            "- **Tam Usd:** 5000000",
+            "- **Sources:**",
+            "  - Deck p.4",
+            "  - Report p.2",
+            "",
+            "### Risks",
+            "",
+            "- Churn",
+            "- n/a",
+        ]))
+
+    def test_invalid_reports(self):
+        self.assertEqual(format_report("Deal Memo Agent", None, "Terra Food Co."), INVALID_REPORT_MESSAGE)
+        self.assertEqual(format_report("Deal Memo Agent", "text", "Terra Food Co."), INVALID_REPORT_MESSAGE)
+
+    def test_answer_presentation_asks_for_user_ready_output(self):
+        report = AnalysisContext({}, "PREFIX")
+        answer = AnalysisContext({}, "PREFIX", presentation="answer")
+        self.assertEqual(report.prompt("Analyze."), "PREFIX\nAnalyze.")
+        self.assertTrue(answer.prompt("Analyze.").startswith("PREFIX\nAnalyze.\n"))
+        self.assertIn("References", answer.instructions("Analyze."))
+        with self.assertRaises(ValueError):
+            AnalysisContext({}, "PREFIX", presentation="slides")
+
+
+if __name__ == '__main__':
+    unittest.main()
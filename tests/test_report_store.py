@@ -0,0 +1,132 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.services.report_store import (
+    InMemoryAnalysisReportStore,
+    RealtimeDBAnalysisReportStore,
+    SQLiteAnalysisReportStore,
+)
+from benchmarks.fake_realtime_db import FakeRealtimeDB
+
+
+def _report(summary, fingerprint="f1"):
+    return {
+        "deal_id": "deal-1",
+        "fingerprint": fingerprint,
+        "created_at": time.time(),
+        "model": "gemini-flash-latest",
+        "reports": {"deal_memo": "Memo."},
+        "unavailable_reports": {},
+        "skipped_agents": [],
+        "final_summary": summary,
+    }
+
+
+class TestAnalysisReportStores(unittest.TestCase):
+    """Tests that each backend numbers, lists and returns report versions the same way."""
+
+    def _check_store(self, store):
+        self.assertIsNone(store.latest("deal-1"))
+        self.assertEqual(store.versions("deal-1"), [])
+
+        self.assertEqual(store.save("deal-1", _report("First.")), 1)
+        self.assertEqual(store.save("deal-1", _report("Second.", fingerprint="f2")), 2)
+        self.assertEqual(store.save("deal-2", _report("Other deal.")), 1)
+
+        latest = store.latest("deal-1")
+        self.assertEqual((latest["version"], latest["final_summary"]), (2, "Second."))
+        self.assertEqual(latest["reports"], {"deal_memo": "Memo."})
+        self.assertEqual(latest["skipped_agents"], [])
+        self.assertEqual(store.get("deal-1", 1)["final_summary"], "First.")
+        self.assertIsNone(store.get("deal-1", 3))
+        versions = store.versions("deal-1")
+        self.assertEqual([version["version"] for version in versions], [2, 1])
+        self.assertEqual(versions[0]["fingerprint"], "f2")
+        self.assertNotIn("final_summary", versions[0])
+
+    def test_in_memory_store(self):
+        self._check_store(InMemoryAnalysisReportStore())
+
+    def _check_keeps_the_last_versions(self, store):
+        for summary in ("One.", "Two.", "Three."):
+            store.save("deal-1", _report(summary))
+        store.save("deal-2", _report("Other deal."))
+        self.assertEqual([version["version"] for version in store.versions("deal-1")], [3, 2])
+        self.assertIsNone(store.get("deal-1", 1))
+        self.assertEqual(store.get("deal-1", 2)["final_summary"], "Two.")
+        self.assertEqual(store.latest("deal-2")["version"], 1)
+
+    def test_in_memory_store_keeps_the_last_versions(self):
+        self._check_keeps_the_last_versions(InMemoryAnalysisReportStore(max_versions=2))
+
+    def test_sqlite_store_keeps_the_last_versions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SQLiteAnalysisReportStore(os.path.join(directory, "reports.sqlite3"), max_versions=2)
+            self._check_keeps_the_last_versions(store)
+            # Numbering continues past pruned versions.
+            self.assertEqual(store.save("deal-1", _report("Four.")), 4)
+
+    def test_realtime_db_store_keeps_the_last_versions(self):
+        db = FakeRealtimeDB()
+        self._check_keeps_the_last_versions(RealtimeDBAnalysisReportStore(db, max_versions=2))
+        deal = db.data["analysisReports"]["deal-1"]
+        self.assertEqual(set(deal["versions"]), {"v000002", "v000003"})
+        self.assertEqual(set(deal["index"]), {"v000002", "v000003"})
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "reports.sqlite3")
+            self._check_store(SQLiteAnalysisReportStore(path))
+            # Another worker opening the same file continues the numbering.
+            self.assertEqual(SQLiteAnalysisReportStore(path).save("deal-1", _report("Third.")), 3)
+
+    def test_realtime_db_store(self):
+        db = FakeRealtimeDB()
+        self._check_store(RealtimeDBAnalysisReportStore(db))
+        self.assertEqual(set(db.data["analysisReports"]["deal-1"]["versions"]), {"v000001", "v000002"})
+
+    def test_realtime_db_latest_skips_a_version_not_yet_written(self):
+        db = FakeRealtimeDB()
+        store = RealtimeDBAnalysisReportStore(db)
+        store.save("deal-1", _report("First."))
+        # A second save allocated version 2 but has not written it (or failed).
+        db.reference("analysisReports/deal-1/latest").set(2)
+
+        self.assertEqual(store.latest("deal-1")["version"], 1)
+        self.assertIsNone(store.latest("deal-2"))
+
+
+class TestReportEndpoints(unittest.TestCase):
+    """Tests the read-only /api/v1/reports endpoints."""
+
+    def setUp(self):
+        self.store = InMemoryAnalysisReportStore()
+        self.store.save("deal-1", _report("First."))
+        self.store.save("deal-1", _report("Second."))
+        patcher = patch('app.api.routes.get_report_store', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = create_app().test_client()
+
+    def test_latest_report(self):
+        response = self.client.get('/api/v1/reports/deal-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["final_summary"], "Second.")
+
+    def test_versions(self):
+        response = self.client.get('/api/v1/reports/deal-1/versions')
+        self.assertEqual([version["version"] for version in response.get_json()["versions"]], [2, 1])
+        response = self.client.get('/api/v1/reports/deal-1/versions/1')
+        self.assertEqual(response.get_json()["final_summary"], "First.")
+
+    def test_unknown_deal_or_version(self):
+        self.assertEqual(self.client.get('/api/v1/reports/deal-9').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/reports/deal-1/versions/7').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
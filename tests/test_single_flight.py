@@ -0,0 +1,127 @@
+import threading
+import time
+import unittest
+
+from app.services.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests coalescing of identical concurrent calls."""
+
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def _slow(self, result):
+        def function(emit):
+            self.runs += 1
+            self.started.set()
+            self.release.wait(5)
+            return result
+        return function
+
+    def _in_thread(self, key, function, on_event=None):
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = self.flights.do(key, function, on_event=on_event)
+            except Exception as e:
+                outcome["error"] = e
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread, outcome
+
+    def _join_while_running(self, key, on_event=None):
+        """Starts a caller for `key` and waits until it has joined the running call."""
+        thread, outcome = self._in_thread(key, self._slow("unused"), on_event)
+        while not self._waiters(key):
+            time.sleep(0.005)
+        return thread, outcome
+
+    def _waiters(self, key):
+        with self.flights._lock:
+            flight = self.flights._flights.get(key)
+            return flight.waiters if flight else 0
+
+    def test_concurrent_callers_share_one_run(self):
+        key = ("load_deal", "1")
+        leader, leader_outcome = self._in_thread(key, self._slow({"name": "Startup 1"}))
+        self.started.wait(5)
+        follower, follower_outcome = self._join_while_running(key)
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(self.runs, 1)
+        self.assertEqual(leader_outcome["result"], {"name": "Startup 1"})
+        self.assertEqual(follower_outcome["result"], {"name": "Startup 1"})
+        self.assertEqual(self.flights.in_flight(), [])
+
+    def test_shared_results_are_copies(self):
+        key = ("load_deal", "1")
+        leader, leader_outcome = self._in_thread(key, self._slow({"tags": ["a"]}))
+        self.started.wait(5)
+        follower, follower_outcome = self._join_while_running(key)
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+
+        leader_outcome["result"]["tags"].append("b")
+        self.assertEqual(follower_outcome["result"], {"tags": ["a"]})
+        self.assertIsNot(leader_outcome["result"], follower_outcome["result"])
+
+    def test_unshared_results_are_not_copied(self):
+        result = {"name": "Startup 1"}
+        self.assertIs(self.flights.do(("load_deal", "1"), lambda emit: result), result)
+
+    def test_exceptions_reach_every_caller(self):
+        key = ("specialist", "1", "deal_memo", "abc")
+
+        def failing(emit):
+            self.started.set()
+            self.release.wait(5)
+            raise RuntimeError("quota")
+
+        leader, leader_outcome = self._in_thread(key, failing)
+        self.started.wait(5)
+        follower, follower_outcome = self._join_while_running(key)
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertIsInstance(leader_outcome["error"], RuntimeError)
+        self.assertIsInstance(follower_outcome["error"], RuntimeError)
+        # A failed call is not remembered; the next caller runs again.
+        self.assertEqual(self.flights.do(key, lambda emit: "ok"), "ok")
+
+    def test_events_are_replayed_to_late_joiners(self):
+        key = ("run_all_agents", "1", "abc")
+        leader_events, follower_events = [], []
+
+        def analysis(emit):
+            emit("agent_report", {"agent": "deal_memo"})
+            self.started.set()
+            self.release.wait(5)
+            emit("token", {"text": "Done."})
+            return {"final_summary": "Done."}
+
+        leader, _ = self._in_thread(key, analysis, lambda event, data: leader_events.append(event))
+        self.started.wait(5)
+        follower, _ = self._join_while_running(key, lambda event, data: follower_events.append(event))
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(leader_events, ["agent_report", "token"])
+        self.assertEqual(follower_events, ["agent_report", "token"])
+
+    def test_different_keys_run_independently(self):
+        self.assertEqual(self.flights.do(("load_deal", "1"), lambda emit: 1), 1)
+        self.assertEqual(self.flights.do(("load_deal", "2"), lambda emit: 2), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app.services import specialist_reports
+from app.services.specialist_reports import (
+    InMemorySpecialistReportStore,
+    SQLiteSpecialistReportStore,
+    input_fingerprint,
+    is_reusable,
+    reusable_report,
+)
+
+
+class FakeAgent:
+    model_name = "gemini-flash-latest"
+    report_version = 1
+    cache_responses = True
+    input_fields = ("sector", "Founders")
+
+    def data_version(self):
+        return None
+
+
+class TestInputFingerprint(unittest.TestCase):
+    """Tests which startup_data changes invalidate a stored specialist report."""
+
+    def test_only_the_agents_input_fields_count(self):
+        agent = FakeAgent()
+        base = {"sector": "FinTech", "Founders": ["Ada"], "keyMetrics": {"arr": 1}}
+        self.assertEqual(input_fingerprint(agent, base),
+                         input_fingerprint(agent, dict(base, keyMetrics={"arr": 2}, query="hi")))
+        self.assertNotEqual(input_fingerprint(agent, base),
+                            input_fingerprint(agent, dict(base, Founders=["Ada", "Grace"])))
+
+    def test_report_version_changes_the_fingerprint(self):
+        agent, bumped = FakeAgent(), FakeAgent()
+        bumped.report_version = 2
+        data = {"sector": "FinTech"}
+        self.assertNotEqual(input_fingerprint(agent, data), input_fingerprint(bumped, data))
+
+    def test_placeholder_reports_are_not_reusable(self):
+        self.assertTrue(is_reusable({"deal_memo": "A memo."}))
+        self.assertFalse(is_reusable({"deal_memo": "[Placeholder LLM response for: You are...]"}))
+        self.assertFalse(is_reusable({}))
+
+
+class TestSpecialistReportStores(unittest.TestCase):
+    """Tests the in-memory and SQLite specialist report stores."""
+
+    def _check_store(self, store):
+        agent = FakeAgent()
+        store.put("deal-1", "benchmarking", "abc", {"benchmarking_analysis": "Report"})
+        self.assertEqual(reusable_report(store, "deal-1", "benchmarking", agent, "abc"),
+                         {"benchmarking_analysis": "Report"})
+        self.assertIsNone(reusable_report(store, "deal-1", "benchmarking", agent, "changed"))
+        self.assertIsNone(reusable_report(store, "deal-2", "benchmarking", agent, "abc"))
+        store.clear("deal-1")
+        self.assertIsNone(store.get("deal-1", "benchmarking"))
+
+    def test_in_memory_store(self):
+        self._check_store(InMemorySpecialistReportStore())
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "reports.sqlite3")
+            self._check_store(SQLiteSpecialistReportStore(path))
+            SQLiteSpecialistReportStore(path).put("deal-3", "portfolio_fit", "f", {"portfolio_fit_analysis": "x"})
+            self.assertEqual(SQLiteSpecialistReportStore(path).get("deal-3", "portfolio_fit")["fingerprint"], "f")
+
+    def test_live_web_reports_expire(self):
+        agent = FakeAgent()
+        agent.cache_responses = False
+        store = InMemorySpecialistReportStore()
+        store.put("deal-1", "market_research", "abc", {"market_research_analysis": "Report"})
+        self.assertIsNotNone(reusable_report(store, "deal-1", "market_research", agent, "abc"))
+        with patch.object(specialist_reports, "SPECIALIST_LIVE_REPORT_MAX_AGE_SECONDS", 60), \
+                patch.object(specialist_reports.time, "time", return_value=time.time() + 120):
+            self.assertIsNone(reusable_report(store, "deal-1", "market_research", agent, "abc"))
+
+    def test_in_memory_store_is_bounded(self):
+        store = InMemorySpecialistReportStore(max_deals=2)
+        for deal_id in ("a", "b", "c"):
+            store.put(deal_id, "benchmarking", "f", {"benchmarking_analysis": deal_id})
+        self.assertIsNone(store.get("a", "benchmarking"))
+        self.assertIsNotNone(store.get("c", "benchmarking"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestStreamingAnalyzeEndpoint(unittest.TestCase):
+    """Tests the server-sent events variant of /api/v1/analyze."""
+
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_streams_progress_then_done(self):
+        def fake_run(deal_id, query, conversation_id=None, on_event=None, include_timings=False, reformat=False):
+            on_event("router", {"action": "run_all_agents"})
+            on_event("agent_report", {"agent": "benchmarking", "report": {"benchmarking_analysis": "ok"}})
+            on_event("token", {"text": "Final "})
+            on_event("token", {"text": "report."})
+            return {"conversation_id": "c1", "analysis": {"response": "Final report."}}
+
+        with patch('app.agents.ai_startup_analysis_agent.AIStartupAnalysisAgent.run', side_effect=fake_run):
+            response = self.client.post('/api/v1/analyze/1/stream', json={"query": "full analysis"})
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = _parse_sse(body)
+        self.assertEqual([event for event, _ in events], ["router", "agent_report", "token", "token", "done"])
+        self.assertEqual(events[-1][1]["analysis"]["response"], "Final report.")
+
+    def test_missing_query_is_rejected(self):
+        response = self.client.post('/api/v1/analyze/1/stream', json={})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
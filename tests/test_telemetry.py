@@ -0,0 +1,139 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import google.ai.generativelanguage as glm
+
+from app import create_app
+from app.agents.ai_startup_analysis_agent import AIStartupAnalysisAgent, SPECIALIST_AGENTS
+from app.services import telemetry
+from app.services.report_store import InMemoryAnalysisReportStore
+from app.tools.runtime import ToolRuntime
+
+
+def _response(*parts):
+    response = MagicMock()
+    response.candidates = [glm.Candidate(content=glm.Content(role="model", parts=list(parts)))]
+    response.text = " ".join(part.text for part in parts if part.text)
+    return response
+
+
+class TestTracing(unittest.TestCase):
+    """Tests the per-request span tree and the metrics it feeds."""
+
+    def test_spans_submitted_to_pools_join_the_request_trace(self):
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+
+        def work(name):
+            with telemetry.span(name, kind="agent"):
+                time.sleep(0.01)
+
+        with telemetry.trace_request("analysis") as trace:
+            with telemetry.span("specialists"):
+                futures = [telemetry.submit(pool, work, name) for name in ("a", "b")]
+                [future.result() for future in futures]
+
+        tree = trace.to_dict()
+        self.assertEqual(tree["children"][0]["name"], "specialists")
+        self.assertEqual(sorted(child["name"] for child in tree["children"][0]["children"]), ["a", "b"])
+        self.assertIsNone(telemetry.current_span())
+
+    def test_llm_calls_are_counted_with_their_action(self):
+        calls_before = telemetry.LLM_CALLS.value(agent="Test Agent", action="synthesis", status="error")
+        with telemetry.trace_request("analysis") as trace:
+            with telemetry.span("synthesis"):
+                with telemetry.llm_call("Test Agent", "test-model", "x" * 400) as call:
+                    call.error = "RuntimeError: quota"
+                with telemetry.llm_call("Test Agent", "test-model", "y" * 40) as call:
+                    telemetry.record_model_response(SimpleNamespace(
+                        usage_metadata=SimpleNamespace(prompt_token_count=12, candidates_token_count=30)))
+                    telemetry.record_response_text(call, "ignored, usage was reported")
+                telemetry.record_cache_hit("Test Agent")
+
+        summary = trace.summary()
+        self.assertEqual((summary["llm_calls"], summary["llm_errors"], summary["llm_cache_hits"]), (2, 1, 1))
+        self.assertEqual(summary["prompt_tokens"], 100 + 12)
+        self.assertEqual(summary["response_tokens"], 30)
+        self.assertIn("synthesis", summary["steps"])
+        self.assertEqual(
+            telemetry.LLM_CALLS.value(agent="Test Agent", action="synthesis", status="error"), calls_before + 1)
+
+    def test_costs_use_configured_prices(self):
+        with patch.dict(telemetry.LLM_TOKEN_PRICES, {"priced-model": [1.0, 2.0]}):
+            with telemetry.trace_request("analysis") as trace:
+                with telemetry.llm_call("Test Agent", "priced-model", "x" * 4_000) as call:
+                    telemetry.record_response_text(call, "y" * 2_000)
+        self.assertAlmostEqual(trace.summary()["cost_usd"], (1000 * 1.0 + 500 * 2.0) / 1_000_000)
+
+    def test_tool_calls_are_traced_under_their_llm_call(self):
+        def lookup(query: str) -> dict:
+            return {"answer": query}
+
+        model = MagicMock()
+        model.generate_content.side_effect = [
+            _response(glm.Part(function_call=glm.FunctionCall(name="lookup", args={"query": "arr"}))),
+            _response(glm.Part(text="Done.")),
+        ]
+        with telemetry.trace_request("analysis") as trace:
+            with telemetry.llm_call("Tool Agent", "test-model", "prompt"):
+                ToolRuntime([lookup], agent_name="Tool Agent").run(model, "prompt")
+
+        llm = trace.to_dict()["children"][0]
+        self.assertEqual((llm["tool_calls"], llm["model_calls"]), (1, 2))
+        self.assertEqual(llm["children"][0]["name"], "lookup")
+        self.assertEqual(trace.summary()["tool_calls"], 1)
+
+    def test_metrics_render_in_prometheus_text_format(self):
+        registry = telemetry.MetricsRegistry()
+        requests = registry.counter("test_requests_total", "Requests.", ("action",))
+        latency = registry.histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1))
+        requests.inc(action='say "hi"')
+        latency.observe(0.5)
+        rendered = registry.render()
+
+        self.assertIn('# TYPE test_requests_total counter', rendered)
+        self.assertIn('test_requests_total{action="say \\"hi\\""} 1', rendered)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 0', rendered)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 1', rendered)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 1', rendered)
+        self.assertIn('test_latency_seconds_count 1', rendered)
+
+
+class TestAnalysisTimings(unittest.TestCase):
+    """Tests the trace of a full analysis and the /metrics endpoint."""
+
+    def test_full_analysis_trace_covers_router_specialists_and_synthesis(self):
+        agent = AIStartupAnalysisAgent()
+        agent.report_store = InMemoryAnalysisReportStore()
+        startup_data = {"id": "1", "name": "Terra Food Co.", "company": "Terra Food Co."}
+        for agent_key in SPECIALIST_AGENTS:
+            patcher = patch.object(agent.agent_team[agent_key], "run",
+                                   return_value={f"{agent_key}_report": "done"})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with patch.object(agent, "_get_startup_data", return_value=startup_data), \
+                patch.object(agent, "_intelligent_route_query", return_value="run_all_agents"), \
+                patch.object(AIStartupAnalysisAgent, "generate_text_with_llm", return_value="Final report."), \
+                patch("app.agents.ai_startup_analysis_agent.append_conversation_turn", return_value="c1"):
+            result = agent.run("1", "full analysis", include_timings=True)
+
+        timings = result["timings"]
+        self.assertEqual(timings["trace"]["action"], "run_all_agents")
+        run_all = timings["trace"]["children"][0]
+        self.assertEqual([child["name"] for child in run_all["children"]], ["specialists", "synthesis"])
+        self.assertEqual(sorted(child["name"] for child in run_all["children"][0]["children"]),
+                         sorted(SPECIALIST_AGENTS))
+
+    def test_metrics_endpoint(self):
+        telemetry.REQUESTS.inc(action="chat", status="ok")
+        response = create_app().test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('lvx_requests_total{action="chat",status="ok"}', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import google.ai.generativelanguage as glm
+
+from app.tools.registry import ToolRegistry, UnknownToolError
+from app.tools.runtime import ToolRuntime
+
+
+def _response(*parts):
+    """Builds a model response whose content has the given parts."""
+    response = MagicMock()
+    response.candidates = [glm.Candidate(content=glm.Content(role="model", parts=list(parts)))]
+    response.text = " ".join(part.text for part in parts if part.text)
+    return response
+
+
+def _call(name, **args):
+    return glm.Part(function_call=glm.FunctionCall(name=name, args=args))
+
+
+class TestToolRegistry(unittest.TestCase):
+    """Tests tool resolution and argument coercion."""
+
+    def test_calls_registered_tools_with_coerced_arguments(self):
+        def lookup(query: str, num_neighbors: int = 5) -> dict:
+            return {"query": query, "num_neighbors": num_neighbors}
+
+        registry = ToolRegistry([lookup])
+        result = registry.call("lookup", {"query": "arr", "num_neighbors": 3.0, "unexpected": 1})
+        self.assertEqual(result, {"query": "arr", "num_neighbors": 3})
+        self.assertIsInstance(result["num_neighbors"], int)
+        with self.assertRaises(UnknownToolError):
+            registry.call("globals", {})
+
+
+class TestToolRuntime(unittest.TestCase):
+    """Tests the bounded, concurrent tool-calling loop."""
+
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+        def search(query: str) -> dict:
+            with self.lock:
+                self.calls.append(query)
+            time.sleep(0.1)
+            return {"results": [query.upper()]}
+
+        self.runtime = ToolRuntime([search], max_steps=3, time_budget_seconds=5)
+
+    def test_parallel_calls_and_accumulated_conversation(self):
+        model = MagicMock()
+        model.generate_content.side_effect = [
+            _response(_call("search", query="arr"), _call("search", query="burn")),
+            _response(glm.Part(text="ARR is $1M.")),
+        ]
+
+        started = time.perf_counter()
+        response = self.runtime.run(model, "prompt")
+
+        self.assertLess(time.perf_counter() - started, 0.19)
+        self.assertEqual(response.text, "ARR is $1M.")
+        self.assertEqual(sorted(self.calls), ["arr", "burn"])
+        contents = model.generate_content.call_args_list[1].args[0]
+        self.assertEqual([content.role for content in contents], ["user", "model", "user"])
+        replies = [part.function_response for part in contents[2].parts]
+        self.assertEqual([type(r).to_dict(r)["response"] for r in replies], [{"results": ["ARR"]}, {"results": ["BURN"]}])
+
+    def test_identical_calls_are_memoized(self):
+        model = MagicMock()
+        model.generate_content.side_effect = [
+            _response(_call("search", query="arr"), _call("search", query="arr")),
+            _response(_call("search", query="arr")),
+            _response(glm.Part(text="done")),
+        ]
+
+        self.runtime.run(model, "prompt")
+
+        self.assertEqual(self.calls, ["arr"])
+
+    def test_unknown_tool_is_reported_to_the_model(self):
+        model = MagicMock()
+        model.generate_content.side_effect = [_response(_call("delete_everything")), _response(glm.Part(text="ok"))]
+
+        self.runtime.run(model, "prompt")
+
+        reply = model.generate_content.call_args_list[1].args[0][2].parts[0].function_response
+        self.assertIn("not found", type(reply).to_dict(reply)["response"]["error"])
+
+    def test_step_budget_forces_a_final_answer_without_tools(self):
+        model = MagicMock()
+        model.generate_content.side_effect = [_response(_call("search", query=str(i))) for i in range(4)] + [
+            _response(glm.Part(text="final")),
+        ]
+
+        response = self.runtime.run(model, "prompt")
+
+        self.assertEqual(response.text, "final")
+        self.assertEqual(len(self.calls), 3)
+        last_call = model.generate_content.call_args_list[-1]
+        self.assertEqual(last_call.kwargs["tool_config"], {"function_calling_config": {"mode": "NONE"}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.tools import vector_search
+from app.tools.vector_index import VectorIndex, top_k
+
+
+def _random_vectors(count, dimension=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+
+
+class TestVectorIndex(unittest.TestCase):
+    """Tests the in-process dense vector index."""
+
+    def test_top_k_returns_best_first(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7])
+        self.assertEqual(list(top_k(scores, 3)), [1, 3, 2])
+        self.assertEqual(len(top_k(scores, 10)), 4)
+
+    def test_search_matches_brute_force_cosine(self):
+        vectors = _random_vectors(200)
+        index = VectorIndex(16)
+        index.upsert([f"doc-{i}" for i in range(200)], vectors)
+        query = vectors[42] + 0.01
+
+        results = index.search(query, k=5)
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+        self.assertEqual([row for row, _ in results], list(expected))
+        self.assertEqual(index.ids[results[0][0]], "doc-42")
+        self.assertAlmostEqual(results[0][1], 1.0, places=3)
+
+    def test_upsert_replaces_and_delete_removes(self):
+        index = VectorIndex(16)
+        vectors = _random_vectors(3)
+        index.upsert(["a", "b", "c"], vectors, [{"text": "a"}, {"text": "b"}, {"text": "c"}])
+        index.upsert(["b"], vectors[:1], [{"text": "new b"}])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.metadata[index.ids.index("b")], {"text": "new b"})
+
+        index.delete(["a", "missing"])
+        self.assertEqual(sorted(index.ids), ["b", "c"])
+        self.assertEqual(index.ids[index.search(vectors[0], k=1)[0][0]], "b")
+
+    def test_partitioned_search_finds_exact_neighbour(self):
+        vectors = _random_vectors(2000, seed=1)
+        index = VectorIndex(16)
+        index.upsert([str(i) for i in range(2000)], vectors)
+        index.build_partitions(num_lists=20)
+
+        hits = sum(index.search(vectors[i], k=1, nprobe=4)[0][0] == i for i in range(0, 2000, 40))
+        self.assertEqual(hits, 50)
+
+    def test_filtered_search_only_scores_matching_rows(self):
+        vectors = _random_vectors(300, seed=2)
+        metadata = [
+            {"deal_id": str(i % 30), "document_type": "pitch_deck" if i % 2 else "other", "page": i % 7 + 1}
+            for i in range(300)
+        ]
+        index = VectorIndex(16)
+        index.upsert([str(i) for i in range(300)], vectors, metadata)
+
+        # The best global match belongs to deal 4, but only deal 5 may be returned.
+        results = index.search(vectors[4], k=3, filters={"deal_id": "5"})
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(metadata[row]["deal_id"] == "5" for row, _ in results))
+
+        rows = index.filter_rows({"deal_id": "5", "document_type": "pitch_deck", "page_start": 2, "page_end": 4})
+        expected = [i for i, m in enumerate(metadata)
+                    if m["deal_id"] == "5" and m["document_type"] == "pitch_deck" and 2 <= m["page"] <= 4]
+        self.assertEqual(list(rows), expected)
+        self.assertEqual(index.search(vectors[0], filters={"deal_id": "unknown"}), [])
+        with self.assertRaises(ValueError):
+            index.search(vectors[0], filters={"sector": "FinTech"})
+
+    def test_save_and_load_memory_mapped(self):
+        index = VectorIndex(16)
+        vectors = _random_vectors(50)
+        index.upsert([str(i) for i in range(50)], vectors, [{"text": f"chunk {i}"} for i in range(50)])
+        index.build_partitions(num_lists=5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            index.save(directory)
+            loaded = VectorIndex.load(directory)
+
+            self.assertIsInstance(loaded.vectors, np.memmap)
+            self.assertEqual(loaded.ids, index.ids)
+            self.assertEqual(loaded.metadata[7], {"text": "chunk 7"})
+            self.assertEqual(loaded.search(vectors[7], k=1)[0][0], 7)
+            self.assertEqual(len(loaded.centroids), 5)
+
+
+class TestVectorSearchTool(unittest.TestCase):
+    """Tests the vector_search tool against a local index."""
+
+    def setUp(self):
+        vector_search.set_index(None)
+
+    def tearDown(self):
+        vector_search.set_index(None)
+
+    def test_returns_passages_with_metadata(self):
+        vectors = _random_vectors(10)
+        index = VectorIndex(16)
+        index.upsert([f"chunk-{i}" for i in range(10)], vectors,
+                     [{"text": f"passage {i}", "source": "deck.pdf"} for i in range(10)])
+        vector_search.set_index(index)
+
+        with patch.object(vector_search, "embed_query", return_value=vectors[3]):
+            response = vector_search.vector_search("who is the founder", num_neighbors=2)
+
+        first = response["search_results"][0]
+        self.assertEqual(len(response["search_results"]), 2)
+        self.assertEqual(first["id"], "chunk-3")
+        self.assertEqual(first["data"], "passage 3")
+        self.assertEqual(first["source"], "deck.pdf")
+        self.assertAlmostEqual(first["distance"], 0.0, places=3)
+
+    def test_deal_filter_is_applied(self):
+        vectors = _random_vectors(10)
+        index = VectorIndex(16)
+        index.upsert([f"chunk-{i}" for i in range(10)], vectors,
+                     [{"text": f"passage {i}", "deal_id": "1" if i < 5 else "2"} for i in range(10)])
+        vector_search.set_index(index)
+
+        with patch.object(vector_search, "embed_query", return_value=vectors[3]):
+            response = vector_search.vector_search("who is the founder", num_neighbors=10, deal_id="2")
+
+        self.assertEqual(sorted(r["id"] for r in response["search_results"]),
+                         [f"chunk-{i}" for i in range(5, 10)])
+
+    def test_missing_index_returns_no_results(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(vector_search, "VECTOR_INDEX_DIR", os.path.join(directory, "none")):
+            self.assertEqual(vector_search.vector_search("anything"), {"search_results": []})
+
+
+if __name__ == '__main__':
+    unittest.main()